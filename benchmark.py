@@ -0,0 +1,428 @@
+# -*- coding: utf-8 -*-
+
+# Thomas N. T. Pham (nhpham@uni-potsdam.de)
+# 12-Apr-2021
+# Python 3.7
+# Windows 10
+"""Benchmarks for the string matching tool."""
+
+import argparse
+import os
+import random
+import string
+import sys
+import tempfile
+import timeit
+import unicodedata
+
+from dnamatcher import DnaMatcher, PackedSequence, reverse_complement
+from stringmatcher import ALGORITHMS, StringMatcher
+from textindex import CHECKPOINT_RATE, FMIndex, SuffixArrayIndex
+
+# size (in bytes) of the synthetic files of the builtin benchmark
+SYNTHETIC_SIZE = 1 << 30
+
+
+def _random_string(length, alphabet=string.ascii_lowercase, seed=42):
+    """Creates a reproducible random string over the given alphabet."""
+    rng = random.Random(seed)
+    return ''.join(rng.choice(alphabet) for _ in range(length))
+
+
+def _best_time(stmt, repeat=5, number=1):
+    """Returns the best wall-clock time (in seconds) of several runs."""
+    return min(timeit.repeat(stmt, repeat=repeat, number=number)) / number
+
+
+def _parse_size(size):
+    """Converts a size such as '100M' or '1G' to a number of bytes."""
+    units = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+    try:
+        if size[-1:].upper() in units:
+            return int(float(size[:-1]) * units[size[-1].upper()])
+        return int(size)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid size: '{size}'")
+
+
+def _write_synthetic(file, size, alphabet, seed=42):
+    """Writes a file of the given size which repeats a random block of
+    1 MiB with a line break every 100 characters, and returns the
+    block.
+    """
+    line = 100
+    block = _random_string((1 << 20) - (1 << 20) // line, alphabet, seed)
+    block = '\n'.join(block[i:i+line-1] for i in range(0, len(block),
+                                                       line - 1)) + '\n'
+    with open(file, 'w', encoding="utf-8") as write_f:
+        for _ in range(size // len(block)):
+            write_f.write(block)
+        write_f.write(block[:size % len(block)])
+    return block
+
+
+def bench_construction():
+    """Construction time of a StringMatcher depending on the pattern
+    length, for random and for periodic (worst case) patterns, and of
+    a cached StringMatcher.compile of a random pattern.
+    """
+    print("construction time of StringMatcher(pattern)")
+    print(f"{'length':>8} {'random [ms]':>12} {'periodic [ms]':>14}"
+          f" {'compiled [ms]':>14}")
+    for m in (10, 1000, 10000, 100000):
+        random_pattern = _random_string(m)
+        periodic_pattern = "a" * (m - 1) + "b"
+        t_random = _best_time(lambda: StringMatcher(random_pattern))
+        t_periodic = _best_time(lambda: StringMatcher(periodic_pattern))
+        t_compiled = _best_time(lambda: StringMatcher.compile(
+            random_pattern))  # cached after the first run
+        print(f"{m:>8} {t_random * 1000:>12.3f} {t_periodic * 1000:>14.3f}"
+              f" {t_compiled * 1000:>14.3f}")
+
+
+def bench_serialization():
+    """Load time of a pattern written by StringMatcher.dump in
+    comparison to the construction time (recomputation of the tables)
+    depending on the pattern length.
+    """
+    print("construction time of StringMatcher(pattern) and load time of"
+          " StringMatcher.load(fp)")
+    print(f"{'length':>8} {'construct [ms]':>15} {'load [ms]':>10}"
+          f" {'speedup':>8} {'size [KiB]':>11}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file = os.path.join(tmp_dir, "pattern.bin")
+        for m in (1000, 100000, 1000000):
+            pattern = _random_string(m, string.ascii_letters + " ")
+            t_construct = _best_time(lambda: StringMatcher(pattern),
+                                     repeat=3)
+            with open(file, 'wb') as write_f:
+                StringMatcher(pattern).dump(write_f)
+
+            def load():
+                with open(file, 'rb') as read_f:
+                    return StringMatcher.load(read_f)
+            t_load = _best_time(load, repeat=3)
+            print(f"{m:>8} {t_construct * 1000:>15.2f}"
+                  f" {t_load * 1000:>10.2f}"
+                  f" {t_construct / t_load:>7.0f}x"
+                  f" {os.path.getsize(file) / 1024:>11.1f}")
+
+
+def bench_algorithms():
+    """Search time of every algorithm (and of the automatic selection)
+    depending on the pattern length and the alphabet of the text.
+    """
+    n = 200000
+    english = ''.join(open(os.path.join("testdata", file),
+                           encoding="utf-8").read()
+                      for file in sorted(os.listdir("testdata")))
+    texts = {"binary": _random_string(n, "ab"),
+             "dna": _random_string(n, "ACGT"),
+             "english": (english * (n // len(english) + 1))[:n]}
+    names = list(ALGORITHMS) + ["auto"]
+    print(f"search time [ms] in a text of length {n}")
+    print(f"{'text':>8} {'length':>6} " +
+          ' '.join(f"{name:>8}" for name in names) + f" {'chosen':>8}")
+    rng = random.Random(42)
+    for kind, text in texts.items():
+        for m in (1, 2, 4, 8, 16, 32, 64):
+            start = rng.randrange(n - m)
+            pattern = text[start:start+m]
+            times = []
+            for name in names:
+                sm = StringMatcher(pattern, algorithm=name)
+                times.append(_best_time(lambda: sm.search_text(text),
+                                        repeat=3))
+            print(f"{kind:>8} {m:>6} " +
+                  ' '.join(f"{t * 1000:>8.1f}" for t in times) +
+                  f" {sm.engine:>8}")
+
+
+def bench_adversarial():
+    """Search time of the algorithms on periodic text/pattern pairs,
+    which provoke their worst cases, in comparison to the linear time
+    of the Two-Way algorithm.
+    """
+    n = 20000
+    cases = {"a^n / a^m": lambda m: ("a" * n, "a" * m),
+             "a^n / a^m-1b": lambda m: ("a" * n, "a" * (m - 1) + "b"),
+             "a^n / ba^m-1": lambda m: ("a" * n, "b" + "a" * (m - 1)),
+             "(ab)^n / (ab)^m": lambda m: ("ab" * (n // 2),
+                                           ("ab" * m)[:m])}
+    names = ["naive", "bm", "horspool", "sunday", "twoway"]
+    print(f"search time [ms] in periodic texts of length {n}")
+    print(f"{'text / pattern':>16} {'length':>6} " +
+          ' '.join(f"{name:>8}" for name in names))
+    for case, make in cases.items():
+        for m in (10, 100, 1000):
+            text, pattern = make(m)
+            times = []
+            for name in names:
+                sm = StringMatcher(pattern, algorithm=name)
+                times.append(_best_time(lambda: sm.search_text(text),
+                                        repeat=1))
+            print(f"{case:>16} {m:>6} " +
+                  ' '.join(f"{t * 1000:>8.1f}" for t in times))
+
+
+def bench_periodic():
+    """Regression benchmark for the worst case of the Boyer-Moore
+    algorithm, i.e. periodic patterns occurring at every position,
+    e.g. 'a' * 1000 in 'a' * 10**6. Thanks to the Galil rule, the
+    search time must not grow with the pattern length.
+    """
+    n = 10 ** 6
+    print(f"search time [ms] of bm and twoway in periodic texts of"
+          f" length {n}")
+    print(f"{'text / pattern':>16} {'length':>6} {'bm':>8} {'twoway':>8}")
+    for unit in ("a", "ab"):
+        text = unit * (n // len(unit))
+        for m in (10, 100, 1000):
+            pattern = (unit * m)[:m]
+            times = [_best_time(lambda: StringMatcher(
+                pattern, algorithm=name).search_text(text), repeat=1)
+                     for name in ("bm", "twoway")]
+            base = unit if len(unit) == 1 else f"({unit})"
+            print(f"{base + '^n / ' + base + '^m':>16} {m:>6} " +
+                  ' '.join(f"{t * 1000:>8.1f}" for t in times))
+
+
+def bench_normalization():
+    """Search time of the normalization and case folding mode in
+    comparison to the plain Boyer-Moore algorithm, for texts which
+    are already canonical (fast path) and texts which are not.
+    """
+    n = 200000
+    english = ''.join(open(os.path.join("testdata", file),
+                           encoding="utf-8").read()
+                      for file in sorted(os.listdir("testdata")))
+    german = ("Die Straße führt über die Brücke zum Schloss. Größere"
+              " Häuser säumen den Weg, während Bäume Schatten spenden. ")
+    texts = {"english": (english * (n // len(english) + 1))[:n],
+             "nfc": (german.replace("ß", "ss") * (n // len(german) + 1))[:n],
+             "nfd": unicodedata.normalize("NFD", (german * (
+                 n // len(german) + 1))[:n])}
+    modes = {"NFC": dict(normalize="NFC"),
+             "casefold": dict(casefold=True),
+             "NFC+fold": dict(normalize="NFC", casefold=True),
+             "NFKC+fold": dict(normalize="NFKC", casefold=True)}
+    pattern = "schatten"
+    print(f"search time [ms] for '{pattern}' in a text of length {n}"
+          " (factor in comparison to bm)")
+    print(f"{'text':>8} {'bm':>8} " +
+          ' '.join(f"{mode:>16}" for mode in modes))
+    for kind, text in texts.items():
+        plain = StringMatcher(pattern)
+        t_plain = _best_time(lambda: plain.boyer_moore(text))
+        cells = []
+        for options in modes.values():
+            sm = StringMatcher(pattern, **options)
+            t = _best_time(lambda: sm.search_text(text))
+            cells.append(f"{t * 1000:>9.1f} ({t / t_plain:>4.1f}x)")
+        print(f"{kind:>8} {t_plain * 1000:>8.1f} " + ' '.join(cells))
+
+
+def bench_builtin():
+    """Search time of search_file with the built-in search in
+    comparison to the naive and the Boyer-Moore algorithm, on the
+    files of testdata and on synthetic files of SYNTHETIC_SIZE bytes.
+    """
+    engines = ("builtin", "naive", "bm")
+
+    def row(name, file, pattern, repeat):
+        times = []
+        for engine in engines:
+            sm = StringMatcher(pattern, algorithm=engine)
+            times.append(_best_time(lambda: sm.search_file(file),
+                                    repeat=repeat))
+        print(f"{name:>12} {len(pattern):>6} " +
+              ' '.join(f"{t * 1000:>10.2f}" for t in times) +
+              f" {min(times[1:]) / times[0]:>8.0f}x")
+
+    print("search time [ms] of search_file (speedup of builtin in"
+          " comparison to the faster of naive and bm)")
+    print(f"{'file':>12} {'length':>6} " +
+          ' '.join(f"{engine:>10}" for engine in engines) +
+          f" {'speedup':>9}")
+    for file in sorted(os.listdir("testdata")):
+        for pattern in ("the", "evaluation"):
+            row(file, os.path.join("testdata", file), pattern, repeat=5)
+    alphabets = {"english": string.ascii_lowercase + " " * 5,
+                 "dna": "ACGT"}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for kind, alphabet in alphabets.items():
+            file = os.path.join(tmp_dir, kind + ".txt")
+            block = _write_synthetic(file, SYNTHETIC_SIZE, alphabet)
+            for m in (4, 32):
+                row(f"{kind} {SYNTHETIC_SIZE >> 20}M", file,
+                    block[1000:1000+m], repeat=1)
+
+
+def bench_suffix_array():
+    """Build time of a SuffixArrayIndex of a DNA text and the latency
+    of its queries (in memory and memory-mapped by load) in comparison
+    to a Boyer-Moore search of the whole text, depending on the length
+    of the text.
+    """
+    queries = 100
+    print(f"build time [s] of SuffixArrayIndex(text), load time [ms] and"
+          f" mean latency [ms] of {queries} queries of length 12")
+    print(f"{'length':>9} {'build':>8} {'size [MiB]':>11} {'load':>8}"
+          f" {'find_all':>9} {'mapped':>9} {'bm':>9} {'speedup':>8}")
+    rng = random.Random(42)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file = os.path.join(tmp_dir, "index.bin")
+        for n in (10 ** 4, 10 ** 5, 10 ** 6):
+            text = _random_string(n, "ACGT")
+            patterns = []
+            for _ in range(queries):
+                start = rng.randrange(n - 12)
+                patterns.append(text[start:start+12])
+            t_build = _best_time(lambda: SuffixArrayIndex(text), repeat=1)
+            index = SuffixArrayIndex(text)
+            with open(file, 'wb') as write_f:
+                index.dump(write_f)
+
+            def load():
+                with open(file, 'rb') as read_f:
+                    SuffixArrayIndex.load(read_f).close()
+            t_load = _best_time(load)
+            with open(file, 'rb') as read_f:
+                mapped = SuffixArrayIndex.load(read_f)
+            times = [_best_time(lambda: [search(pattern)
+                                         for pattern in patterns],
+                                repeat=3) / queries
+                     for search in (index.find_all, mapped.find_all)]
+            mapped.close()
+            bm = [StringMatcher(pattern) for pattern in patterns[:10]]
+            t_bm = _best_time(lambda: [sm.boyer_moore(text) for sm in bm],
+                              repeat=1) / len(bm)
+            print(f"{n:>9} {t_build:>8.2f}"
+                  f" {os.path.getsize(file) / (1 << 20):>11.1f}"
+                  f" {t_load * 1000:>8.2f}" +
+                  ''.join(f" {t * 1000:>9.3f}" for t in times) +
+                  f" {t_bm * 1000:>9.2f} {t_bm / times[1]:>7.0f}x")
+
+
+def bench_fm_index():
+    """Memory/latency trade-off of an FMIndex of a DNA text depending
+    on its sample rate (and checkpoint rate), in comparison to a
+    SuffixArrayIndex of the same text.
+    """
+    n = 200000
+    queries = 100
+    text = _random_string(n, "ACGT")
+    rng = random.Random(42)
+    patterns = []
+    for _ in range(queries):
+        start = rng.randrange(n - 8)
+        patterns.append(text[start:start+8])  # about 3 occurrences
+    occurrences = sum(text.count(pattern) for pattern in patterns)
+    print(f"memory [bytes per character] of the index of a DNA text of"
+          f" length {n} and mean latency [ms] of {queries} queries of"
+          " length 8")
+    print(f"{'index':>20} {'memory':>7} {'count':>8} {'locate':>8}"
+          f" {'per hit':>8}")
+
+    def row(name, memory, count, locate):
+        t_count = _best_time(lambda: [count(pattern)
+                                      for pattern in patterns],
+                             repeat=3)
+        t_locate = _best_time(lambda: [locate(pattern)
+                                       for pattern in patterns],
+                              repeat=3)
+        print(f"{name:>20} {memory / n:>7.2f}"
+              f" {t_count * 1000 / queries:>8.3f}"
+              f" {t_locate * 1000 / queries:>8.3f}"
+              f" {t_locate * 1000 / occurrences:>8.3f}")
+
+    sa = SuffixArrayIndex(text)
+    row("suffix array", len(text) + sa.suffix_array.itemsize * 2 * n,
+        sa.count, sa.find_all)
+    settings = [(rate, CHECKPOINT_RATE) for rate in (1, 4, 16, 64, 256)]
+    settings += [(32, rate) for rate in (32, 512)]
+    for sample_rate, checkpoint_rate in settings:
+        fm = FMIndex(text, sample_rate=sample_rate,
+                     checkpoint_rate=checkpoint_rate)
+        row(f"fm {sample_rate}/{checkpoint_rate}", fm.nbytes, fm.count,
+            fm.locate)
+
+
+def bench_dna():
+    """Memory per base and search time of a DnaMatcher on a packed DNA
+    sequence in comparison to the Boyer-Moore algorithm and the
+    built-in search on the unpacked sequence, depending on the length
+    of the sequence, and the search time on both strands in a single
+    pass in comparison to two DnaMatcher searches of the unpacked
+    sequence.
+    """
+    print("memory [bytes per base] of the sequence as str and packed,"
+          " pack time and search time [ms] for a string of length 20"
+          " (R: with IUPAC codes, +-: both strands of the str in one"
+          " pass, 2x: two passes)")
+    print(f"{'length':>9} {'str':>6} {'packed':>7} {'pack':>8}"
+          f" {'dna':>8} {'dna R':>8} {'bm':>9} {'builtin':>8}"
+          f" {'speedup':>8} {'dna +-':>8} {'dna 2x':>8}")
+    for n in (10 ** 5, 10 ** 6, 10 ** 7):
+        # a quarter of the random bases, so that the sequence is built
+        # in reasonable time
+        text = _random_string(n // 4, "ACGT") * 4
+        pattern = text[n // 3:n // 3 + 20]
+        ambiguous = pattern[:5] + "R" + pattern[6:15] + "N" + pattern[16:]
+        t_pack = _best_time(lambda: PackedSequence(text), repeat=1)
+        packed = PackedSequence(text)
+        dna = DnaMatcher(pattern)
+        t_dna = _best_time(lambda: dna.search_text(packed), repeat=3)
+        dna_ambiguous = DnaMatcher(ambiguous)
+        t_ambiguous = _best_time(lambda: dna_ambiguous.search_text(packed),
+                                 repeat=3)
+        sm = StringMatcher(pattern)
+        t_bm = _best_time(lambda: sm.boyer_moore(text), repeat=1)
+        t_builtin = _best_time(lambda: sm.builtin(text), repeat=3)
+        both = DnaMatcher(pattern, both_strands=True)
+        t_both = _best_time(lambda: both.search_text(text), repeat=1)
+        reverse = DnaMatcher(reverse_complement(pattern))
+        t_two = _best_time(lambda: (dna.search_text(text),
+                                    reverse.search_text(text)), repeat=1)
+        print(f"{n:>9} {sys.getsizeof(text) / n:>6.2f}"
+              f" {packed.nbytes / n:>7.2f} {t_pack * 1000:>8.1f}"
+              f" {t_dna * 1000:>8.1f} {t_ambiguous * 1000:>8.1f}"
+              f" {t_bm * 1000:>9.1f} {t_builtin * 1000:>8.1f}"
+              f" {t_bm / t_dna:>7.0f}x"
+              f" {t_both * 1000:>8.1f} {t_two * 1000:>8.1f}")
+
+
+BENCHMARKS = {
+    "construction": bench_construction,
+    "serialization": bench_serialization,
+    "algorithms": bench_algorithms,
+    "adversarial": bench_adversarial,
+    "periodic": bench_periodic,
+    "normalization": bench_normalization,
+    "builtin": bench_builtin,
+    "suffixarray": bench_suffix_array,
+    "fmindex": bench_fm_index,
+    "dna": bench_dna,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="StringMatcher benchmarks.")
+    parser.add_argument("benchmarks",
+                        nargs="*",
+                        metavar="BENCHMARK",
+                        help="Benchmarks to run: "
+                             f"{', '.join(BENCHMARKS)}. Defaults to all.")
+    parser.add_argument("--size",
+                        type=_parse_size,
+                        default=SYNTHETIC_SIZE,
+                        help="Size of the synthetic files, e.g. 100M."
+                             " Defaults to 1G.")
+    args = parser.parse_args()
+    SYNTHETIC_SIZE = args.size
+    unknown = set(args.benchmarks) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"Unknown benchmark(s): {', '.join(sorted(unknown))}")
+    for name in args.benchmarks or BENCHMARKS:
+        BENCHMARKS[name]()
+        print('')
@@ -0,0 +1,513 @@
+# -*- coding: utf-8 -*-
+
+# Thomas N. T. Pham (nhpham@uni-potsdam.de)
+# 12-Apr-2021
+# Python 3.7
+# Windows 10
+"""DNA search on sequences packed into 2 bits per base."""
+
+import heapq
+import logging
+import re
+from array import array
+from bisect import bisect_right
+from itertools import repeat
+
+from errors import EmptyStringException
+from stringmatcher import _file_errors, _first, _group_lines
+
+# IUPAC nucleotide codes mapped to the bases they stand for
+IUPAC_CODES = {"A": "A", "C": "C", "G": "G", "T": "T",
+               "R": "AG", "Y": "CT", "S": "CG", "W": "AT",
+               "K": "GT", "M": "AC", "B": "CGT", "D": "AGT",
+               "H": "ACT", "V": "ACG", "N": "ACGT"}
+
+# strands of the hits of a DnaMatcher searching both strands: the
+# search string itself (forward) and its reverse complement (reverse)
+STRANDS = ("+", "-")
+
+# number of bases of a sequence which are packed at once
+PACK_SIZE = 1 << 20
+
+# number of start positions which are compared at once by DnaMatcher
+BLOCK_SIZE = 1 << 22
+
+# 2-bit codes of the bases; ambiguous bases are packed as A (0) and
+# kept in runs of equal codes besides the packed sequence
+_BASES = "ACGT"
+_PACK_TABLE = bytes(max(_BASES.find(chr(byte)), 0) for byte in range(256))
+_VALID_BYTES = "".join(IUPAC_CODES).encode("ascii")
+_AMBIGUOUS_RUN = re.compile(rb"([^ACGT])\1*")
+_NONZERO = re.compile(rb"[^\x00]")
+_COMPLEMENT = str.maketrans("ACGTRYSWKMBDHVN", "TGCAYRSWMKVHDBN")
+# the four bases packed into each byte, for unpacking
+_UNPACK_TABLE = ["".join(_BASES[byte >> shift & 3] for shift in (0, 2, 4, 6))
+                 for byte in range(256)]
+
+
+class PackedSequence:
+    """DNA sequence stored with 2 bits per base, i.e. a quarter of the
+    memory of an ASCII str. Lower case bases (soft-masked regions) are
+    packed as upper case bases. Ambiguous bases (N and the other IUPAC
+    codes) cannot be packed into 2 bits and are kept as runs of equal
+    codes, which costs little for the long runs of N in assembled
+    genomes.
+
+    Args:
+        sequence (str or bytes): Bases as IUPAC nucleotide codes.
+            Defaults to an empty sequence.
+
+    Raises:
+        ValueError: If the sequence contains other characters.
+    """
+    def __init__(self, sequence=""):
+        self._data = bytearray()
+        self._length = 0
+        # start, end and code of the runs of ambiguous bases
+        self._starts = array('q')
+        self._ends = array('q')
+        self._codes = bytearray()
+        self._append(_dna_bytes(sequence, 0))
+
+    @classmethod
+    def from_chunks(cls, chunks):
+        """Packs a sequence given in parts, e.g. the lines of a FASTA
+        record, without joining all of them into one string.
+
+        Args:
+            chunks (iterable): Consecutive parts (str or bytes) of
+                the sequence.
+
+        Returns:
+            PackedSequence: Packed sequence.
+        """
+        sequence = cls()
+        buffer, size = [], 0
+        for chunk in chunks:
+            buffer.append(chunk if isinstance(chunk, bytes)
+                          else chunk.encode("ascii", "replace"))
+            size += len(chunk)
+            if size >= PACK_SIZE:
+                data = _dna_bytes(b"".join(buffer), sequence._length)
+                packable = len(data) - len(data) % 4
+                sequence._append(data[:packable])
+                buffer, size = [data[packable:]], len(data) - packable
+        sequence._append(_dna_bytes(b"".join(buffer), sequence._length))
+        return sequence
+
+    @property
+    def nbytes(self):
+        """int: Number of bytes of the packed bases and of the runs of
+        ambiguous bases."""
+        return (len(self._data) + len(self._codes) +
+                self._starts.itemsize * (len(self._starts) +
+                                         len(self._ends)))
+
+    def __len__(self):
+        return self._length
+
+    def __str__(self):
+        sequence = "".join(map(_UNPACK_TABLE.__getitem__, self._data))
+        pieces, end = [], 0
+        for start, stop, code in zip(self._starts, self._ends,
+                                     self._codes):
+            pieces.append(sequence[end:start])
+            pieces.append(chr(code) * (stop - start))
+            end = stop
+        pieces.append(sequence[end:self._length])
+        return "".join(pieces)
+
+# private methods #
+    def _append(self, data):
+        """Packs validated upper case bases behind the sequence, whose
+        length has to be a multiple of 4.
+
+        Args:
+            data (bytes): Bases as IUPAC nucleotide codes.
+        """
+        codes = data.translate(_PACK_TABLE)
+        codes += bytes(-len(codes) % 4)
+        # the codes are at most 3, so shifting them by up to 6 bits
+        # never carries into the neighbouring byte
+        value = 0
+        for lane in range(4):
+            value |= int.from_bytes(codes[lane::4], "little") << 2 * lane
+        self._data += value.to_bytes(len(codes) // 4, "little")
+        for run in _AMBIGUOUS_RUN.finditer(data):
+            start = self._length + run.start()
+            end = self._length + run.end()
+            code = data[run.start()]
+            if self._codes and self._codes[-1] == code and \
+                    self._ends[-1] == start:
+                self._ends[-1] = end
+            else:
+                self._starts.append(start)
+                self._ends.append(end)
+                self._codes.append(code)
+        self._length += len(data)
+
+    def _ambiguous(self, start, end):
+        """Marks the ambiguous bases in a part of the sequence.
+
+        Args:
+            start (int): Index of the first base of the part.
+            end (int): Index after the last base of the part.
+
+        Returns:
+            dict: Mapping of the IUPAC codes (str) of the ambiguous
+                bases to bit masks (int) with bit 2 * i set for each
+                base at index start + i with that code.
+        """
+        ranges = {}
+        run = bisect_right(self._ends, start)
+        while run < len(self._starts) and self._starts[run] < end:
+            ranges.setdefault(chr(self._codes[run]), []).append(
+                (max(self._starts[run], start) - start,
+                 min(self._ends[run], end) - start))
+            run += 1
+        return {code: _lane_mask(code_ranges, end - start)
+                for code, code_ranges in ranges.items()}
+
+
+class DnaMatcher:
+    """Searches DNA sequences packed into 2 bits per base. Instead of
+    comparing the bases one by one, the packed sequence is read as one
+    large integer, and each base of the search string is compared with
+    the bases at all positions at once by a few bitwise operations on
+    whole machine words. The search string may contain IUPAC codes,
+    e.g. R for A or G; an ambiguous base of the sequence matches a code
+    of the search string if the code covers all bases it stands for,
+    so N in the sequence only matches N.
+
+    To find the string on both strands of the DNA, both_strands also
+    searches for its reverse complement in the same pass over the
+    sequence, which shares the comparisons of the bases of the sequence
+    with each base, and tags each occurrence with its strand.
+
+    Args:
+        pattern (str): Bases as IUPAC nucleotide codes which are
+            searched for. Lower and upper case are not distinguished.
+        both_strands (bool): If True, the reverse complement of the
+            string is searched for as well, and the occurrences are
+            2-tuples of starting index and strand, one of STRANDS.
+            Defaults to False.
+
+    Attributes:
+        pattern (str): Search string in upper case.
+        both_strands (bool): True if the reverse complement is searched
+            for as well.
+
+    Raises:
+        EmptyStringException: If the search string is empty.
+        ValueError: If the search string contains other characters.
+    """
+    def __init__(self, pattern, both_strands=False):
+        if len(pattern) == 0:
+            raise EmptyStringException("Invalid search string. Empty" +
+                                       " strings are everywhere." +
+                                       " Please try something with" +
+                                       " characters.")
+        self._pattern = _dna_bytes(pattern, 0).decode("ascii")
+        self._both_strands = both_strands
+        self._patterns = [self._pattern]
+        # a string which is its own reverse complement occurs on both
+        # strands at once and is reported on the forward strand only
+        reverse = reverse_complement(self._pattern)
+        if both_strands and reverse != self._pattern:
+            self._patterns.append(reverse)
+
+    @property
+    def pattern(self):
+        return self._pattern
+
+    @property
+    def both_strands(self):
+        return self._both_strands
+
+    def search_text(self, sequence, max_matches=None):
+        """Searches a DNA sequence for occurrences of the string.
+
+        Args:
+            sequence (str, bytes or PackedSequence): Sequence which is
+                searched. Unpacked sequences are packed first.
+            max_matches (int): Maximum number of occurrences. Defaults
+                to None, i.e. all.
+
+        Returns:
+            list: Contains the starting indices (int) of the
+                occurrences in ascending order, or with both_strands
+                2-tuples of starting index and strand, e.g.
+                [(12, '+'), (40, '-')]. The index of an occurrence on
+                the reverse strand is the index of its reverse
+                complement in the sequence.
+        """
+        return list(self.iter_text(sequence, max_matches=max_matches))
+
+    def iter_text(self, sequence, max_matches=None):
+        """Searches a DNA sequence lazily, block by block.
+
+        Args:
+            sequence (str, bytes or PackedSequence): Sequence which is
+                searched.
+            max_matches (int): Maximum number of occurrences. Defaults
+                to None, i.e. all.
+
+        Yields:
+            int or tuple: Starting index of an occurrence, or with
+                both_strands a 2-tuple of starting index and strand.
+        """
+        def positions():
+            for start, block_matches in self._iter_blocks(sequence):
+                if not self._both_strands:
+                    yield from _lane_positions(block_matches[0], start)
+                    continue
+                yield from heapq.merge(*(
+                    zip(_lane_positions(matches, start), repeat(strand))
+                    for matches, strand in zip(block_matches, STRANDS)))
+        return _first(positions(), max_matches)
+
+    def count(self, sequence):
+        """Counts the occurrences of the string in a DNA sequence.
+
+        Args:
+            sequence (str, bytes or PackedSequence): Sequence which is
+                searched.
+
+        Returns:
+            int: Number of occurrences, on both strands with
+                both_strands.
+        """
+        return sum(bin(matches).count("1")
+                   for _, block_matches in self._iter_blocks(sequence)
+                   for matches in block_matches)
+
+    def search_fasta(self, file, max_matches=None):
+        """Searches the records of a FASTA file for occurrences of the
+        string.
+
+        Args:
+            file (str): Path to the FASTA file.
+            max_matches (int): Maximum number of occurrences per
+                record. Defaults to None, i.e. all.
+
+        Returns:
+            list: Contains 2-tuples consisting of the name of a record
+                with occurrences and a list of their starting indices
+                (int), e.g. [("chr1", [1043, 52812]), ("chr3", [77])],
+                or with both_strands of 2-tuples of starting index and
+                strand.
+        """
+        return _group_lines(self.iter_fasta(file, max_matches=max_matches))
+
+    def iter_fasta(self, file, max_matches=None):
+        """Searches the records of a FASTA file lazily, one packed
+        record after the other.
+
+        Args:
+            file (str): Path to the FASTA file.
+            max_matches (int): Maximum number of occurrences per
+                record. Defaults to None, i.e. all.
+
+        Yields:
+            tuple: Contains the name of a record and the starting
+                index (int) of an occurrence in that record, or with
+                both_strands a 2-tuple of starting index and strand.
+        """
+        for name, sequence in read_fasta(file):
+            for position in self.iter_text(sequence,
+                                           max_matches=max_matches):
+                yield name, position
+
+# private methods #
+    def _iter_blocks(self, sequence):
+        """Compares the string (and its reverse complement) with a
+        packed sequence at BLOCK_SIZE start positions at a time.
+
+        Args:
+            sequence (str, bytes or PackedSequence): Sequence which is
+                searched.
+
+        Yields:
+            tuple: Contains the index of the first start position of
+                a block and a list with a bit mask (int) per searched
+                string, with bit 2 * i set if the string occurs at that
+                index + i.
+        """
+        if not isinstance(sequence, PackedSequence):
+            sequence = PackedSequence(sequence)
+        starts = len(sequence) - len(self._pattern) + 1
+        for start in range(0, starts, BLOCK_SIZE):
+            stop = min(start + BLOCK_SIZE, starts)
+            end = stop + len(self._pattern) - 1
+            # BLOCK_SIZE is a multiple of 4, so a block starts at the
+            # first base of a byte
+            bits = int.from_bytes(sequence._data[start >> 2:
+                                                 (end + 3) >> 2],
+                                  "little")
+            low = _low_bits(stop - start)
+            yield start, [matches & low for matches in _match_block(
+                self._patterns, bits, end - start,
+                sequence._ambiguous(start, end))]
+
+
+def read_fasta(file):
+    """Reads the records of a FASTA file and packs their sequences.
+
+    Args:
+        file (str): Path to the FASTA file.
+
+    Yields:
+        tuple: Contains the name of a record, i.e. its header line
+            without '>', and its sequence (PackedSequence).
+
+    Raises:
+        ValueError: If the file does not start with a header line or
+            a sequence contains invalid characters.
+    """
+    with _file_errors(file, "ascii"), open(file, 'rb') as read_f:
+        lines = (line.strip() for line in read_f)
+        name = None
+        for line in lines:
+            if not line or line.startswith(b";"):
+                continue
+            if not line.startswith(b">"):
+                fasta_msg = (f"'{file}' is not a FASTA file. It has to" +
+                             " start with a '>' header line.")
+                logging.error(fasta_msg)
+                raise ValueError(fasta_msg)
+            name = line[1:].decode("utf-8", "replace").strip()
+            break
+        while name is not None:
+            chunks, header = [], None
+            for line in lines:
+                if line.startswith(b">"):
+                    header = line[1:].decode("utf-8", "replace").strip()
+                    break
+                if line and not line.startswith(b";"):
+                    chunks.append(line)
+            yield name, PackedSequence.from_chunks(chunks)
+            name = header
+
+
+def reverse_complement(sequence):
+    """Returns the reverse complement of a DNA sequence, i.e. the
+    sequence of the opposite strand read in the same direction.
+
+    Args:
+        sequence (str): Bases as upper case IUPAC nucleotide codes.
+
+    Returns:
+        str: Reverse complement, e.g. 'TCYA' for 'TRGA'.
+    """
+    return sequence.translate(_COMPLEMENT)[::-1]
+
+
+def _dna_bytes(sequence, offset):
+    """Converts bases into upper case ASCII bytes and checks that they
+    are IUPAC nucleotide codes.
+
+    Args:
+        sequence (str or bytes): Bases.
+        offset (int): Index of the first base in the whole sequence,
+            for the error message.
+
+    Returns:
+        bytes: Upper case bases.
+
+    Raises:
+        ValueError: If the sequence contains other characters.
+    """
+    data = sequence.upper()
+    if isinstance(data, str):
+        data = data.encode("ascii", "replace")
+    invalid = data.translate(None, _VALID_BYTES)
+    if invalid:
+        index = data.index(invalid[:1])
+        char = sequence[index:index + 1]
+        if isinstance(char, bytes):
+            char = char.decode("latin-1")
+        dna_msg = (f"Invalid character {char!r} at index" +
+                   f" {offset + index} of a DNA sequence. Only IUPAC" +
+                   " nucleotide codes are allowed.")
+        logging.error(dna_msg)
+        raise ValueError(dna_msg)
+    return data
+
+
+def _low_bits(length):
+    """Returns a bit mask (int) with bit 2 * i set for i < length."""
+    return (int.from_bytes(b"\x55" * ((length + 3) >> 2), "little") &
+            (1 << 2 * length) - 1)
+
+
+def _lane_mask(ranges, length):
+    """Returns a bit mask (int) with bit 2 * i set for each index i in
+    the given ranges, i.e. 2-tuples of start and end index below
+    length."""
+    mask = bytearray((length + 3) >> 2)
+    for start, end in ranges:
+        # whole bytes are filled at once, the bases before and after
+        # them one by one
+        head = min(end, (start + 3) >> 2 << 2)
+        tail = max(head, end >> 2 << 2)
+        mask[head >> 2:tail >> 2] = b"\x55" * ((tail - head) >> 2)
+        for index in (*range(start, head), *range(tail, end)):
+            mask[index >> 2] |= 1 << 2 * (index & 3)
+    return int.from_bytes(mask, "little")
+
+
+def _match_block(patterns, bits, length, ambiguous):
+    """Compares strings with packed bases at all positions at once.
+
+    Args:
+        patterns (list): Strings of IUPAC nucleotide codes in upper
+            case, which share the comparisons of the bases.
+        bits (int): Packed bases with 2 bits per base.
+        length (int): Number of packed bases.
+        ambiguous (dict): Bit masks of the ambiguous bases per IUPAC
+            code, see PackedSequence._ambiguous.
+
+    Returns:
+        list: Contains a bit mask (int) per string with bit 2 * i set
+            if the string occurs at index i of the packed bases.
+    """
+    low = _low_bits(length)
+    unambiguous = low
+    for positions in ambiguous.values():
+        unambiguous &= ~positions
+    equal = {}
+    code_masks = {"N": low}
+    pattern_matches = []
+    for pattern in patterns:
+        matches = low
+        for offset, code in enumerate(pattern):
+            if code not in code_masks:
+                mask = 0
+                for base in IUPAC_CODES[code]:
+                    if base not in equal:
+                        # both bits of a base are 0 after XOR with an
+                        # equal base, so OR-ing the high bit into the
+                        # low bit leaves the low bit of equal bases unset
+                        diff = bits ^ low * _BASES.index(base)
+                        equal[base] = low & ~(diff | diff >> 1)
+                    mask |= equal[base]
+                mask &= unambiguous
+                for other, positions in ambiguous.items():
+                    if set(IUPAC_CODES[other]) <= set(IUPAC_CODES[code]):
+                        mask |= positions
+                code_masks[code] = mask
+            matches &= code_masks[code] >> 2 * offset
+            if not matches:
+                break
+        pattern_matches.append(matches)
+    return pattern_matches
+
+
+def _lane_positions(matches, start):
+    """Yields start + i for each bit 2 * i set in a bit mask."""
+    data = matches.to_bytes((matches.bit_length() + 7) >> 3, "little")
+    for nonzero in _NONZERO.finditer(data):
+        index = nonzero.start()
+        for lane in range(4):
+            if data[index] >> 2 * lane & 1:
+                yield start + 4 * index + lane
@@ -7,10 +7,19 @@
 """Command line manager."""
 
 import argparse
+import codecs
+import os
 import sys
+import time
+from itertools import groupby
+from operator import itemgetter
 
+from dnamatcher import DnaMatcher
 from errors import EmptyStringException
-from stringmatcher import StringMatcher
+from stringindex import (BLOOM_DIR, INDEX_DIR, BloomFilterCache,
+                         StringIndex)
+from stringmatcher import (ALGORITHMS, NORMALIZATION_FORMS,
+                           MultiStringMatcher, StringMatcher)
 
 
 def configure_parser():
@@ -36,63 +45,283 @@ def configure_parser():
                        help="Search all txt-files in a directory.")
 
     parser.add_argument("--search",
-                        nargs=1,
+                        action="append",
                         metavar="SEARCHSTRING",
-                        help="String pattern that is to be searched.")
+                        help="String pattern that is to be searched."
+                             " Can be repeated to search for several"
+                             " strings at once.")
+    parser.add_argument("--patterns-file",
+                        nargs=1,
+                        metavar="PATTERNFILE",
+                        help="File with one string pattern per line that"
+                             " are searched at once (in addition to"
+                             " --search).")
     parser.add_argument("--encoding",
                         nargs=1,
-                        default=["utf-8"],
                         metavar="ENC",
-                        help="File encoding. Defaults to utf-8.")
+                        help="File encoding. Defaults to utf-8, or the"
+                             " encoding of the index with --use-index.")
     parser.add_argument("-i", "--insensitive",
                         action="store_false",
                         help="If case-insensitive search is wanted.")
-    parser.add_argument("--naive",
+    parser.add_argument("--casefold",
+                        action="store_true",
+                        help="If full Unicode case folding is wanted, so"
+                             " that e.g. 'ß' matches 'SS' (implies"
+                             " --insensitive).")
+    parser.add_argument("--normalize",
+                        nargs=1,
+                        choices=NORMALIZATION_FORMS,
+                        help="Unicode normalization form, so that e.g."
+                             " precomposed and decomposed accents match"
+                             " each other.")
+    parser.add_argument("-a", "--algorithm",
+                        nargs=1,
+                        default=["bm"],
+                        choices=list(ALGORITHMS) + ["auto"],
+                        help="Search algorithm: naive, Boyer-Moore (bm),"
+                             " Boyer-Moore-Horspool (horspool), Sunday"
+                             " (sunday), Two-Way (twoway), Python's"
+                             " built-in search (builtin) or automatic"
+                             " selection (auto)."
+                             " Defaults to bm. Several strings are always"
+                             " searched with Aho-Corasick.")
+    parser.add_argument("-j", "--jobs",
+                        nargs=1,
+                        type=int,
+                        default=[1],
+                        metavar="N",
+                        help="Number of processes searching the files of"
+                             " a directory, or the parts of a single file"
+                             " (memory-mapped), in parallel. Defaults to"
+                             " 1.")
+    reading = parser.add_mutually_exclusive_group()
+    reading.add_argument("--stream",
+                         action="store_true",
+                         help="If files should be read in large chunks"
+                              " instead of line by line, which also finds"
+                              " search strings spanning several lines.")
+    reading.add_argument("--mmap",
+                         action="store_true",
+                         help="If files should be memory-mapped and"
+                              " searched on byte level without decoding"
+                              " (case-sensitive search of a single search"
+                              " string only).")
+    output = parser.add_mutually_exclusive_group()
+    output.add_argument("--count",
+                        action="store_true",
+                        help="If only the number of occurrences (per file)"
+                             " should be printed.")
+    output.add_argument("-l", "--files-with-matches",
                         action="store_true",
-                        help="If naive algorithm should be used instead"
-                             " of default Boyer-Moore.")
+                        help="If only the names of the files containing"
+                             " the search string should be printed. Each"
+                             " file is read only up to the first"
+                             " occurrence.")
+    parser.add_argument("--index",
+                        nargs=2,
+                        metavar=("{build,update}", "DIR"),
+                        help="Build a trigram index of the txt-files in a"
+                             " directory, which is stored in its"
+                             f" subdirectory {INDEX_DIR}, or update it"
+                             " by indexing only the added and changed"
+                             " files.")
+    parser.add_argument("--use-index",
+                        action="store_true",
+                        help="If only the files of the directory which"
+                             " may contain the search string according to"
+                             " its index should be searched (see"
+                             " --index).")
+    parser.add_argument("--bloom",
+                        action="store_true",
+                        help="If the files of the directory should be"
+                             " skipped when their Bloom filter rules out"
+                             " the search string. The Bloom filters are"
+                             f" kept in its subdirectory {BLOOM_DIR}."
+                             " Prints the skip ratio and the false"
+                             " positive rate.")
+    parser.add_argument("--dna",
+                        action="store_true",
+                        help="If the search string and the text or FASTA"
+                             " file (--file) are DNA sequences, which are"
+                             " searched packed into 2 bits per base. The"
+                             " search string may contain IUPAC codes such"
+                             " as N or R.")
+    parser.add_argument("--both-strands",
+                        action="store_true",
+                        help="If the reverse complement of the search"
+                             " string should be searched in the same pass"
+                             " with --dna, i.e. both strands of the DNA."
+                             " Each occurrence is tagged with its strand"
+                             " (+ or -).")
+    parser.add_argument("-m", "--max-count",
+                        nargs=1,
+                        type=int,
+                        metavar="NUM",
+                        help="Stop reading a text or file after NUM"
+                             " occurrences.")
     return parser
 
 
 def command_line_execution(args):
     """Manages interaction between command line and StringMatcher."""
-    if args.search is None:
+    encoding_given = args.encoding is not None
+    if not encoding_given:
+        args.encoding = ["utf-8"]
+    if args.index:
+        _index_command(*args.index, encoding=args.encoding[0],
+                       encoding_given=encoding_given)
+        return
+    patterns = list(args.search or [])
+    if args.patterns_file:
+        try:
+            patterns += _read_patterns(args.patterns_file[0],
+                                       args.encoding[0])
+        except (OSError, UnicodeDecodeError):
+            parser.error(sys.exc_info()[1])
+    if not patterns:
         parser.error("Missing argument: --search SEARCHSTRING\n"
                      "Please specify the string you want to look for."
                      " You may find help with '--help'.")
+    parallel_file = args.file is not None and args.jobs[0] > 1
+    normalize = args.normalize[0] if args.normalize else None
+    if ((args.mmap or parallel_file) and
+            (len(patterns) > 1 or not args.insensitive or args.stream or
+             args.casefold or normalize)):
+        parser.error("--mmap and --jobs for a single file support only a"
+                     " single search string and a case-sensitive search"
+                     " without --stream, --casefold and --normalize.")
+    if args.files_with_matches and args.text:
+        parser.error("--files-with-matches can only be used with --file"
+                     " or --dir.")
+    if (args.use_index or args.bloom) and not args.dir:
+        parser.error("--use-index and --bloom can only be used with"
+                     " --dir.")
+    if args.use_index and args.bloom:
+        parser.error("Please choose either --use-index or --bloom.")
+    if args.max_count and args.max_count[0] < 1:
+        parser.error("--max-count NUM must be a positive integer.")
+    max_matches = args.max_count[0] if args.max_count else None
+    if args.files_with_matches:
+        max_matches = 1  # the first occurrence answers the question
+    if args.both_strands and not args.dna:
+        parser.error("--both-strands can only be used with --dna.")
+    if args.dna:
+        _dna_command(args, patterns, max_matches)
+        return
     try:
-        sm = StringMatcher(args.search[0], case=args.insensitive)
+        if len(patterns) == 1:
+            sm = StringMatcher(patterns[0], case=args.insensitive,
+                               algorithm=args.algorithm[0],
+                               normalize=normalize, casefold=args.casefold)
+            patterns = None  # findings are plain indices
+        else:
+            sm = MultiStringMatcher(patterns, case=args.insensitive,
+                                    normalize=normalize,
+                                    casefold=args.casefold)
     except EmptyStringException:
         parser.error(sys.exc_info()[1])
 
-    search_func = sm.naive if args.naive else sm.boyer_moore
-    if args.text:
-        indices = search_func(args.text[0])
+    if args.text and args.count:
+        print("Number of occurrences: "
+              + str(sm.count(args.text[0], max_matches=max_matches)))
+
+    elif args.text:
+        indices = sm.search_text(args.text[0], max_matches=max_matches)
         if indices:
-            print(f"Found at indices: {', '.join([str(i) for i in indices])}")
+            print(f"Found at indices: {_format_hits(indices, patterns)}")
         else:
             print("No occurrences found.")
 
     elif args.file:
         try:
-            positions = sm.search_file(args.file[0], encoding=args.encoding[0],
-                                       naive=args.naive)
+            if parallel_file:
+                positions = sm.search_file_parallel(args.file[0],
+                                                    encoding=args.encoding[0],
+                                                    workers=args.jobs[0],
+                                                    max_matches=max_matches)
+            elif args.mmap:
+                positions = sm.search_file_mmap(args.file[0],
+                                                encoding=args.encoding[0],
+                                                resolve_lines=True,
+                                                max_matches=max_matches)
+            else:
+                positions = _group_by_line(sm.iter_file(
+                    args.file[0], encoding=args.encoding[0],
+                    stream=args.stream, max_matches=max_matches))
+            if args.count:
+                print(f"Number of occurrences: {_count_hits(positions)}")
+                return
+            if args.files_with_matches:
+                found = any(True for _ in positions)
+                if found:
+                    print(args.file[0])
+            else:
+                found = _print_file_output(positions, patterns)
+                print('')
         except (FileNotFoundError, PermissionError, UnicodeDecodeError):
             parser.error(sys.exc_info()[1])
-        print(_prettify_file_output(positions))
-        if not positions:
+        if not found:
             print("No occurrences found.")
 
     elif args.dir:
         try:
-            locations = sm.search_dir(args.dir[0], encoding=args.encoding[0],
-                                      naive=args.naive)
-        except (FileNotFoundError, NotADirectoryError):
+            encoding = args.encoding[0]
+            files = None  # all txt-files
+            cache = None
+            if args.use_index:
+                index = StringIndex(args.dir[0])
+                if encoding_given:
+                    _check_index_encoding(index, encoding)
+                encoding = index.encoding
+                files = index.candidates(sm)
+            elif args.bloom:
+                cache = BloomFilterCache(args.dir[0], encoding=encoding)
+                files = cache.candidates(sm)
+            if args.mmap:
+                locations = sm.search_dir(args.dir[0],
+                                          encoding=encoding,
+                                          memory_map=True,
+                                          workers=args.jobs[0],
+                                          max_matches=max_matches,
+                                          files=files).items()
+            elif args.jobs[0] > 1:
+                locations = sm.search_dir(args.dir[0],
+                                          encoding=encoding,
+                                          stream=args.stream,
+                                          workers=args.jobs[0],
+                                          max_matches=max_matches,
+                                          files=files).items()
+            else:
+                locations = (
+                    (doc, _group_by_line((line, finding) for _, line, finding
+                                         in doc_findings))
+                    for doc, doc_findings in groupby(
+                        sm.iter_dir(args.dir[0], encoding=encoding,
+                                    stream=args.stream,
+                                    max_matches=max_matches, files=files),
+                        key=itemgetter(0)))
+            found = False
+            matched = []
+            for doc, positions in locations:
+                matched.append(doc)
+                if args.count:
+                    print(f"{doc}: {_count_hits(positions)}")
+                    found = True
+                elif args.files_with_matches:
+                    print(doc)
+                    found = True
+                else:
+                    print(f"{doc}:")
+                    found = _print_file_output(positions, patterns) or found
+                    print('')
+        except (FileNotFoundError, NotADirectoryError, ValueError):
             parser.error(sys.exc_info()[1])
-        for doc, positions in locations.items():
-            print(f"{doc}:\n{_prettify_file_output(positions)}")
-        if not locations:
+        if not found:
             print("No occurrences found.")
+        if cache is not None:
+            cache.record(matched)
+            _print_bloom_stats(cache.stats)
 
     else:
         parser.error("Missing argument: '--text STRING' OR '--file FILE' OR"
@@ -101,14 +330,158 @@ def command_line_execution(args):
                      " for the string.")
 
 
-def _prettify_file_output(positions):
-    """Prettifies output string in command line for lists containing
-    2-tuples of line number and a list of indices.
+def _index_command(action, dir, encoding, encoding_given=False):
+    """Builds or updates the index of a directory and reports the
+    number of indexed files and the time taken.
+    """
+    if action not in ("build", "update"):
+        parser.error(f"Unknown index command '{action}'. Choose one of:"
+                     " build, update.")
+    start = time.perf_counter()
+    try:
+        if action == "build":
+            index = StringIndex.build(dir, encoding=encoding)
+        else:
+            index = StringIndex(dir)
+            if encoding_given:
+                _check_index_encoding(index, encoding)
+            added, changed, removed = index.update()
+    except (FileNotFoundError, NotADirectoryError, UnicodeDecodeError,
+            ValueError):
+        parser.error(sys.exc_info()[1])
+    seconds = time.perf_counter() - start
+    if action == "build":
+        print(f"Indexed {len(index.files)} files in"
+              f" {os.path.join(dir, INDEX_DIR)} in {seconds:.2f} s.")
+    else:
+        print(f"Updated {os.path.join(dir, INDEX_DIR)} in {seconds:.2f} s:"
+              f" {len(added) + len(changed) + len(removed)} files touched"
+              f" ({len(added)} added, {len(changed)} changed,"
+              f" {len(removed)} removed).")
+
+
+def _dna_command(args, patterns, max_matches):
+    """Searches a DNA sequence or the records of a FASTA file with a
+    DnaMatcher.
     """
-    output = ""
+    if (len(patterns) > 1 or args.dir or not args.insensitive or
+            args.casefold or args.normalize or args.stream or args.mmap or
+            args.jobs[0] > 1 or args.use_index or args.bloom):
+        parser.error("--dna supports only a single search string in a"
+                     " text or a FASTA file, without --insensitive,"
+                     " --casefold, --normalize, --stream, --mmap, --jobs,"
+                     " --use-index and --bloom.")
+    try:
+        dm = DnaMatcher(patterns[0], both_strands=args.both_strands)
+        if args.text:
+            if args.count:
+                print("Number of occurrences: " +
+                      str(len(dm.search_text(args.text[0],
+                                             max_matches=max_matches))))
+                return
+            indices = dm.search_text(args.text[0], max_matches=max_matches)
+            if indices:
+                print(f"Found at indices: {_format_strands(indices)}")
+                return
+        elif args.file:
+            records = dm.search_fasta(args.file[0], max_matches=max_matches)
+            if args.count:
+                print(f"Number of occurrences: {_count_hits(records)}")
+                return
+            if records and args.files_with_matches:
+                print(args.file[0])
+                return
+            for name, indices in records:
+                print(f"{name}: {_format_strands(indices)}")
+            if records:
+                return
+        else:
+            parser.error("Missing argument: '--text STRING' OR"
+                         " '--file FILE'\n"
+                         "Please choose where you want to look for the"
+                         " DNA sequence.")
+    except (EmptyStringException, FileNotFoundError, ValueError):
+        parser.error(sys.exc_info()[1])
+    print("No occurrences found.")
+
+
+def _check_index_encoding(index, encoding):
+    """Rejects an encoding given by --encoding which differs from the
+    encoding the index was built with.
+    """
+    try:
+        same = codecs.lookup(encoding).name == codecs.lookup(
+            index.encoding).name
+    except LookupError:
+        same = False
+    if not same:
+        parser.error(f"--encoding {encoding} differs from the encoding"
+                     f" {index.encoding} of the index of {index.dir}."
+                     " Please omit --encoding or build the index again"
+                     f" with --encoding {encoding}.")
+
+
+def _print_bloom_stats(stats):
+    """Prints the skip ratio and the false positive rate of a search
+    with Bloom filters.
+    """
+    if stats["false_positives"] is None:
+        print(f"Bloom filters: the search string cannot be tested, all"
+              f" {stats['files']} files searched.")
+        return
+    print(f"Bloom filters: {stats['skipped']} of {stats['files']} files"
+          f" skipped ({stats['skip_ratio']:.1%}), false positive rate"
+          f" {stats['false_positive_rate']:.1%} ({stats['false_positives']}"
+          " searched files without occurrences).")
+
+
+def _print_file_output(positions, patterns=None):
+    """Prints findings in command line line by line, as soon as they
+    are found, for iterables of 2-tuples of line number and a list of
+    indices. Returns True if there are any findings.
+    """
+    found = False
     for line, shifts in positions:
-        output += f"line {line}: {', '.join([str(i) for i in shifts])}\n"
-    return output
+        print(f"line {line}: {_format_hits(shifts, patterns)}")
+        found = True
+    return found
+
+
+def _count_hits(positions):
+    """Counts the findings of iterables of 2-tuples of line number and
+    a list of indices.
+    """
+    return sum(len(shifts) for _, shifts in positions)
+
+
+def _group_by_line(line_findings):
+    """Lazily groups 2-tuples of line number and index by line."""
+    for line, group in groupby(line_findings, key=itemgetter(0)):
+        yield line, [finding for _, finding in group]
+
+
+def _format_hits(hits, patterns=None):
+    """Joins indices, or 2-tuples of pattern id and index if the
+    searched patterns are given, to a comma-separated string.
+    """
+    if patterns is None:
+        return ', '.join([str(i) for i in hits])
+    return ', '.join([f"{i} ({patterns[pattern_id]})"
+                      for pattern_id, i in hits])
+
+
+def _format_strands(hits):
+    """Joins indices, or 2-tuples of index and strand, to a
+    comma-separated string.
+    """
+    return ', '.join([str(i) if isinstance(i, int) else f"{i[0]} ({i[1]})"
+                      for i in hits])
+
+
+def _read_patterns(file, encoding):
+    """Reads the non-empty lines of a file as string patterns."""
+    with open(file, 'r', encoding=encoding) as read_f:
+        return [line.rstrip("\n") for line in read_f if line.rstrip("\n")]
 
 
 if __name__ == "__main__":
@@ -0,0 +1,840 @@
+# -*- coding: utf-8 -*-
+
+# Thomas N. T. Pham (nhpham@uni-potsdam.de)
+# 12-Apr-2021
+# Python 3.7
+# Windows 10
+"""Trigram index and Bloom filters for the directory search."""
+
+import hashlib
+import io
+import logging
+import math
+import os
+import struct
+import sys
+import zlib
+from array import array
+
+from tqdm import tqdm
+
+from stringmatcher import (_file_errors, _fold_case, _pack_chars,
+                           _read_array, _read_blob, _txt_files,
+                           _unpack_chars, _write_array, _write_blob)
+
+# subdirectory of an indexed directory which contains the index
+INDEX_DIR = ".stringindex"
+
+# number of segments above which an update merges all segments
+MAX_SEGMENTS = 8
+
+# binary formats of the manifest and the segment files: magic and
+# version
+_MANIFEST_HEADER = struct.Struct("<4sH")
+_MANIFEST_MAGIC = b"STRI"
+_MANIFEST_VERSION = 2
+_SEGMENT_HEADER = struct.Struct("<4sH")
+_SEGMENT_MAGIC = b"STRS"
+_SEGMENT_VERSION = 1
+
+# size (in bytes) of the content hashes in the manifest
+_HASH_SIZE = 16
+
+# subdirectory of a directory which contains the Bloom filter sidecars
+BLOOM_DIR = ".stringbloom"
+
+# false positive rate of a Bloom filter for a single trigram, and its
+# number of hash functions, which determine its number of bits per
+# trigram (about 10.5 bits for 4 hash functions and 1 %)
+BLOOM_ERROR_RATE = 0.01
+BLOOM_HASHES = 4
+
+# binary format of a Bloom filter sidecar: magic, version, size and
+# modification time of the file, number of hash functions
+_BLOOM_HEADER = struct.Struct("<4sHqqB")
+_BLOOM_MAGIC = b"STRB"
+_BLOOM_VERSION = 1
+
+
+class StringIndex:
+    """Trigram index of the txt-files of a directory, in the style of
+    code search tools: for every trigram (3 consecutive characters) of
+    the case-folded file contents, a posting list holds the files in
+    which it occurs. A query only searches the files which contain
+    every trigram of the search string, since all others cannot
+    contain the search string.
+
+    The index is stored in the subdirectory INDEX_DIR of the indexed
+    directory and consists of segments, each of which indexes some of
+    the files, and a manifest recording size, modification time and
+    content hash of every indexed file and the segment indexing it.
+    The posting lists remain on disk and are read on demand. The index
+    reflects the files at the time it was built or updated, so update
+    it when files are added, changed or removed. An update keeps the
+    segments it no longer needs until the next update, and an index
+    whose segments were removed in the meantime reads the manifest
+    again, so that searches see either the old or the new index.
+
+    Args:
+        dir (str): Path to a directory indexed by StringIndex.build.
+
+    Attributes:
+        dir (str): Path to the indexed directory.
+        encoding (str): Encoding of the txt-files in the directory.
+        files (list): Names of the indexed txt-files in sorted order.
+        segments (list): Names of the segment files in INDEX_DIR.
+        entries (dict): Mapping of the names of the indexed files to
+            tuples of their size, modification time (in nanoseconds),
+            content hash (bytes), segment and file id in the segment.
+    """
+    def __init__(self, dir):
+        self._dir = dir
+        self._encoding, self._segments, self._entries = _read_manifest(dir)
+
+    @classmethod
+    def build(cls, dir, encoding="utf-8"):
+        """Indexes every txt-file in a directory (excluding
+        subdirectories) and writes the index to the subdirectory
+        INDEX_DIR, replacing a previous index.
+
+        Args:
+            dir (str): Path to the directory which is indexed.
+            encoding (str): Encoding of the txt-files in the directory.
+                Defaults to utf-8.
+
+        Returns:
+            StringIndex: Index of the directory.
+        """
+        index = cls.__new__(cls)
+        index._dir = dir
+        index._encoding = encoding
+        index._segments = []
+        index._entries = dict()
+        index.update()
+        return index
+
+    @property
+    def dir(self):
+        """str: Path to the indexed directory."""
+        return self._dir
+
+    @property
+    def encoding(self):
+        """str: Encoding of the txt-files in the directory."""
+        return self._encoding
+
+    @property
+    def files(self):
+        """list: Names of the indexed txt-files in sorted order."""
+        return sorted(self._entries)
+
+    def update(self):
+        """Brings the index up to date with the directory. Only the
+        added files and the files whose content changed are indexed,
+        in a new segment, and removed files are dropped. Files whose
+        size and modification time did not change are not read at
+        all. The new segment and the manifest are written to temporary
+        files first and swapped in atomically, so that a failed update
+        leaves the previous index intact. If there are more than
+        MAX_SEGMENTS segments, they are merged into one. Segments which
+        are no longer referenced are deleted by the next update only,
+        since searches may still read them.
+
+        Returns:
+            tuple: Contains the lists of the names (str) of the added,
+                the changed and the removed files.
+        """
+        files = sorted(_txt_files(self._dir))
+        present = set(files)
+        removed = [file for file in sorted(self._entries)
+                   if file not in present]
+        added, changed = [], []
+        entries = {file: self._entries[file] for file in files
+                   if file in self._entries}
+        index_dir = os.path.join(self._dir, INDEX_DIR)
+        os.makedirs(index_dir, exist_ok=True)
+        previous = []  # segments of the manifest before the update
+        if os.path.exists(os.path.join(index_dir, "manifest.bin")):
+            try:
+                previous = _read_manifest(self._dir)[1]
+            except ValueError:
+                pass  # replaced by the new index
+        segment = _segment_name(index_dir)
+        postings = dict()
+        indexed = []
+        for file in tqdm(files, desc="update index...", leave=False):
+            path = os.path.join(self._dir, file)
+            stat = os.stat(path)
+            entry = entries.get(file)
+            if (entry is not None and entry[0] == stat.st_size and
+                    entry[1] == stat.st_mtime_ns):
+                continue  # unchanged
+            with _file_errors(path, self._encoding), \
+                    open(path, 'rb') as read_f:
+                data = read_f.read()
+                content_hash = hashlib.blake2b(
+                    data, digest_size=_HASH_SIZE).digest()
+                if entry is not None and entry[2] == content_hash:
+                    entries[file] = ((stat.st_size, stat.st_mtime_ns) +
+                                     entry[2:])  # touched only
+                    continue
+                text = io.TextIOWrapper(io.BytesIO(data),
+                                        encoding=self._encoding).read()
+            for trigram in _trigrams(_fold_case(text)):
+                postings.setdefault(trigram, []).append(len(indexed))
+            entries[file] = (stat.st_size, stat.st_mtime_ns, content_hash,
+                             segment, len(indexed))
+            indexed.append(file)
+            (changed if entry is not None else added).append(file)
+        if indexed:
+            _write_segment(os.path.join(index_dir, segment), indexed,
+                           postings)
+        used = {entry[3] for entry in entries.values()}
+        segments = [name for name in self._segments + [segment]
+                    if name in used]
+        if len(segments) > MAX_SEGMENTS:
+            segments = [self._merge(entries, segments)]
+        _write_manifest(index_dir, self._encoding, segments, entries)
+        keep = set(segments + previous + ["manifest.bin"])
+        for name in os.listdir(index_dir):  # no longer referenced
+            if name not in keep:
+                try:
+                    os.remove(os.path.join(index_dir, name))
+                except OSError:
+                    pass  # still open (Windows), removed next time
+        self._segments = segments
+        self._entries = entries
+        logging.info(f"Updated the index of {self._dir}: {len(added)}"
+                     f" added, {len(changed)} changed and {len(removed)}"
+                     " removed files.")
+        return added, changed, removed
+
+    def candidates(self, matcher):
+        """Determines the files which may contain the search string(s)
+        of a matcher, i.e. the files containing all trigrams of a
+        search string. Search strings shorter than 3 characters, bytes
+        and matchers with normalization or full case folding cannot be
+        looked up, so every file is a candidate then.
+
+        Args:
+            matcher (StringMatcher or MultiStringMatcher): Matcher
+                whose search string(s) are looked up.
+
+        Returns:
+            list: Contains the names (str) of the candidate files in
+                sorted order.
+        """
+        patterns = _query_patterns(matcher)
+        if patterns is None:
+            return self.files
+        try:
+            return self._lookup(patterns)
+        except OSError:
+            # the segments were replaced by a later update, whose
+            # manifest refers to the current ones
+            self._encoding, self._segments, self._entries = (
+                _read_manifest(self._dir))
+        try:
+            return self._lookup(patterns)
+        except OSError as ose:
+            segment_msg = (f"Index segment of {self._dir} cannot be" +
+                           f" read ({ose.strerror}). Please update the" +
+                           " index.")
+            logging.error(segment_msg)
+            raise ValueError(segment_msg) from None
+
+    def search(self, matcher, algorithm=None, **kwargs):
+        """Searches the candidate files of the directory for
+        occurrences of the search string(s) of a matcher.
+
+        Args:
+            matcher (StringMatcher or MultiStringMatcher): Matcher
+                which searches the candidate files.
+            algorithm (str): Search algorithm of a StringMatcher, one
+                of the keys of ALGORITHMS. Defaults to None, i.e.
+                the algorithm the matcher was constructed with.
+            **kwargs: Further arguments of the matcher's search_dir,
+                e.g. stream or max_matches.
+
+        Returns:
+            dict: Findings per file, like search_dir.
+        """
+        return _search_files(matcher, self._dir, self._encoding,
+                             self.candidates(matcher), algorithm, kwargs)
+
+# private methods #
+    def _lookup(self, patterns):
+        """Looks up the files containing all trigrams of one of the
+        patterns in every segment.
+
+        Args:
+            patterns (list): Case-folded search strings (str).
+
+        Returns:
+            list: Contains the names (str) of the candidate files in
+                sorted order.
+        """
+        files = set()
+        for segment in self._segments:
+            with _Segment(os.path.join(self._dir, INDEX_DIR,
+                                       segment)) as reader:
+                for pattern in patterns:
+                    for file_id in reader.lookup(pattern):
+                        file = reader.files[file_id]
+                        entry = self._entries.get(file)
+                        if entry is not None and entry[3:] == (segment,
+                                                               file_id):
+                            files.add(file)  # not superseded
+        return sorted(files)
+
+    def _merge(self, entries, segments):
+        """Merges the posting lists of the indexed files of several
+        segments into a new segment, without reading the files again.
+        The entries are changed to refer to the new segment.
+
+        Args:
+            entries (dict): Entries of the indexed files (see
+                StringIndex).
+            segments (list): Names of the segments which are merged.
+
+        Returns:
+            str: Name of the new segment.
+        """
+        index_dir = os.path.join(self._dir, INDEX_DIR)
+        merged = _segment_name(index_dir)
+        files = []
+        postings = dict()
+        for segment in segments:
+            with _Segment(os.path.join(index_dir, segment)) as reader:
+                new_ids = dict()
+                for file_id, file in enumerate(reader.files):
+                    entry = entries.get(file)
+                    if entry is not None and entry[3:] == (segment,
+                                                           file_id):
+                        new_ids[file_id] = len(files)
+                        entries[file] = entry[:3] + (merged, len(files))
+                        files.append(file)
+                for trigram, file_ids in reader.postings():
+                    file_ids = [new_ids[file_id] for file_id in file_ids
+                                if file_id in new_ids]
+                    if file_ids:
+                        postings.setdefault(trigram, []).extend(file_ids)
+        _write_segment(os.path.join(index_dir, merged), files, postings)
+        return merged
+
+
+class BloomFilterCache:
+    """Lightweight alternative to StringIndex, which keeps a small
+    Bloom filter of the trigrams of every txt-file of a directory in a
+    sidecar file. Before a file is searched, the trigrams of the search
+    string are tested against its Bloom filter, and the file is skipped
+    if one of them definitely does not occur in it. A Bloom filter may
+    claim trigrams which do not occur (false positives), but never
+    misses one, so no occurrence is missed.
+
+    The sidecars are stored in the subdirectory BLOOM_DIR of the
+    directory. A sidecar is (re)built when its file is searched for
+    the first time or when the size or modification time of the file
+    changed, which takes several times as long as searching the file;
+    sidecars of removed files are deleted.
+
+    Args:
+        dir (str): Path to the directory.
+        encoding (str): Encoding of the txt-files in the directory.
+            Defaults to utf-8.
+
+    Attributes:
+        dir (str): Path to the directory.
+        encoding (str): Encoding of the txt-files in the directory.
+        stats (dict): Statistics of the last search (see stats).
+    """
+    def __init__(self, dir, encoding="utf-8"):
+        self._dir = dir
+        self._encoding = encoding
+        self._candidates = None  # of the last search, if filtered
+        self._stats = dict(files=0, skipped=0, searched=0,
+                           false_positives=None)
+
+    @property
+    def dir(self):
+        """str: Path to the directory."""
+        return self._dir
+
+    @property
+    def encoding(self):
+        """str: Encoding of the txt-files in the directory."""
+        return self._encoding
+
+    @property
+    def stats(self):
+        """dict: Statistics of the last search, i.e. the number of
+        'files' in the directory, of 'skipped' files and of 'searched'
+        files, the 'skip_ratio' (skipped files per file), the number of
+        'false_positives' (searched files without occurrences) and the
+        'false_positive_rate' (false positives per file without
+        occurrences). The false positives are None until the results
+        are recorded, and if the search strings cannot be tested.
+        """
+        stats = dict(self._stats)
+        files, skipped = stats["files"], stats["skipped"]
+        false_positives = stats["false_positives"]
+        stats["skip_ratio"] = skipped / files if files else 0.0
+        if false_positives is None:
+            stats["false_positive_rate"] = None
+        else:
+            negatives = false_positives + skipped
+            stats["false_positive_rate"] = (false_positives / negatives
+                                            if negatives else 0.0)
+        return stats
+
+    def candidates(self, matcher):
+        """Determines the files which may contain the search string(s)
+        of a matcher, i.e. the files whose Bloom filter contains all
+        trigrams of a search string. Missing and outdated sidecars are
+        built on the way. Search strings which StringIndex cannot look
+        up cannot be tested either, so every file is a candidate then.
+
+        Args:
+            matcher (StringMatcher or MultiStringMatcher): Matcher
+                whose search string(s) are tested.
+
+        Returns:
+            list: Contains the names (str) of the candidate files in
+                sorted order.
+        """
+        files = sorted(_txt_files(self._dir))
+        bloom_dir = os.path.join(self._dir, BLOOM_DIR)
+        os.makedirs(bloom_dir, exist_ok=True)
+        present = {file + ".bloom" for file in files}
+        for name in os.listdir(bloom_dir):  # sidecars of removed files
+            if name not in present:
+                os.remove(os.path.join(bloom_dir, name))
+        patterns = _query_patterns(matcher)
+        if patterns is not None and any(len(pattern) < 3
+                                        for pattern in patterns):
+            patterns = None  # without trigrams
+        if patterns is None:
+            candidates = files
+        else:
+            hashes = [_bloom_hashes(_trigrams(pattern))
+                      for pattern in patterns]
+            candidates = []
+            for file in tqdm(files, desc="check Bloom filters...",
+                             leave=False):
+                bits, k = self._bloom_filter(file)
+                if any(_bloom_contains(bits, k, pattern_hashes)
+                       for pattern_hashes in hashes):
+                    candidates.append(file)
+        self._candidates = candidates if patterns is not None else None
+        self._stats = dict(files=len(files),
+                           skipped=len(files) - len(candidates),
+                           searched=len(candidates), false_positives=None)
+        return candidates
+
+    def record(self, matched):
+        """Records the files with occurrences found by the last search
+        of the candidate files, from which the false positives of the
+        statistics are determined.
+
+        Args:
+            matched (iterable): Names (str) of the files in which the
+                search string(s) occur.
+        """
+        if self._candidates is not None:
+            self._stats["false_positives"] = len(set(self._candidates) -
+                                                 set(matched))
+
+    def search(self, matcher, algorithm=None, **kwargs):
+        """Searches the candidate files of the directory for
+        occurrences of the search string(s) of a matcher and records
+        the statistics.
+
+        Args:
+            matcher (StringMatcher or MultiStringMatcher): Matcher
+                which searches the candidate files.
+            algorithm (str): Search algorithm of a StringMatcher, one
+                of the keys of ALGORITHMS. Defaults to None, i.e.
+                the algorithm the matcher was constructed with.
+            **kwargs: Further arguments of the matcher's search_dir,
+                e.g. stream or max_matches.
+
+        Returns:
+            dict: Findings per file, like search_dir.
+        """
+        results = _search_files(matcher, self._dir, self._encoding,
+                                self.candidates(matcher), algorithm,
+                                kwargs)
+        self.record(results)
+        return results
+
+# private methods #
+    def _bloom_filter(self, file):
+        """Reads the Bloom filter of a file from its sidecar, or builds
+        the filter and writes the sidecar if it is missing or outdated.
+
+        Args:
+            file (str): Name of the txt-file.
+
+        Returns:
+            tuple: Contains the bits (bytes) of the Bloom filter and its
+                number of hash functions (int).
+        """
+        path = os.path.join(self._dir, file)
+        sidecar = os.path.join(self._dir, BLOOM_DIR, file + ".bloom")
+        stat = os.stat(path)
+        encoding = self._encoding.encode("ascii")
+        try:
+            with open(sidecar, 'rb') as read_f:
+                magic, version, size, mtime_ns, k = _BLOOM_HEADER.unpack(
+                    read_f.read(_BLOOM_HEADER.size))
+                if (magic == _BLOOM_MAGIC and version == _BLOOM_VERSION and
+                        size == stat.st_size and
+                        mtime_ns == stat.st_mtime_ns and
+                        _read_blob(read_f) == encoding):
+                    return _read_blob(read_f), k
+        except (OSError, ValueError, struct.error):
+            pass  # missing or invalid, so it is built again
+        with _file_errors(path, self._encoding), \
+                open(path, 'r', encoding=self._encoding) as read_f:
+            trigrams = _trigrams(_fold_case(read_f.read()))
+        bits, k = _build_bloom_filter(trigrams)
+        with open(sidecar + ".tmp", 'wb') as write_f:
+            write_f.write(_BLOOM_HEADER.pack(_BLOOM_MAGIC, _BLOOM_VERSION,
+                                             stat.st_size, stat.st_mtime_ns,
+                                             k))
+            _write_blob(write_f, encoding)
+            _write_blob(write_f, bits)
+        os.replace(sidecar + ".tmp", sidecar)
+        return bits, k
+
+
+class _Segment:
+    """Reader of a segment file, which contains the names of the files
+    indexed by the segment, their sorted trigrams and the posting list
+    of each trigram. The posting lists are read on demand.
+
+    Args:
+        path (str): Path to the segment file.
+
+    Attributes:
+        files (list): Names of the indexed files. The index of a name
+            in this list is its file id.
+        trigrams (str): Sorted trigrams concatenated to a string.
+        offsets (array): Start of the posting list of each trigram in
+            the postings, followed by the number of postings.
+    """
+    def __init__(self, path):
+        self._read_f = open(path, 'rb')
+        try:
+            magic, version = _SEGMENT_HEADER.unpack(
+                self._read_f.read(_SEGMENT_HEADER.size))
+            if magic != _SEGMENT_MAGIC or version != _SEGMENT_VERSION:
+                raise ValueError("unknown format")
+            self.files = _split_names(_read_blob(self._read_f))
+            self.trigrams = _unpack_chars(_read_blob(self._read_f), False)
+            self.offsets = _read_array(self._read_f)
+            self._postings_start = self._read_f.tell()
+        except (ValueError, struct.error):
+            self._read_f.close()
+            segment_msg = (f"Invalid index segment {path}. Please build" +
+                           " the index again.")
+            logging.error(segment_msg)
+            raise ValueError(segment_msg) from None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self._read_f.close()
+
+    def lookup(self, pattern):
+        """Intersects the posting lists of the trigrams of a pattern,
+        starting with the shortest one.
+
+        Args:
+            pattern (str): Case-folded search string.
+
+        Returns:
+            set: Contains the ids (int) of the candidate files.
+        """
+        ranges = []
+        for trigram in _trigrams(pattern):
+            key = _find_trigram(self.trigrams, trigram)
+            if key is None:
+                return set()  # trigram occurs in no file
+            ranges.append((self.offsets[key + 1] - self.offsets[key],
+                           self.offsets[key]))
+        if not ranges:  # too short for trigrams
+            return set(range(len(self.files)))
+        file_ids = None
+        for count, start in sorted(ranges):
+            postings = self._read_postings(start, count)
+            file_ids = (set(postings) if file_ids is None else
+                        file_ids.intersection(postings))
+            if not file_ids:
+                break
+        return file_ids
+
+    def postings(self):
+        """Yields every trigram together with its posting list.
+
+        Yields:
+            tuple: Contains a trigram (str) and an array of the ids
+                (int) of the files in which it occurs.
+        """
+        all_postings = self._read_postings(0, self.offsets[-1])
+        for key in range(len(self.offsets) - 1):
+            yield (self.trigrams[3*key:3*key+3],
+                   all_postings[self.offsets[key]:self.offsets[key+1]])
+
+    def _read_postings(self, start, count):
+        """Reads count postings from the given position on."""
+        self._read_f.seek(self._postings_start + 4 * start)
+        postings = array('i')
+        postings.frombytes(self._read_f.read(4 * count))
+        if sys.byteorder == "big":
+            postings.byteswap()
+        return postings
+
+
+def _read_manifest(dir):
+    """Reads the manifest of the index of a directory.
+
+    Args:
+        dir (str): Path to the indexed directory.
+
+    Returns:
+        tuple: Contains the encoding (str), the names of the segments
+            (list) and the entries of the indexed files (dict, see
+            StringIndex).
+    """
+    path = os.path.join(dir, INDEX_DIR, "manifest.bin")
+    try:
+        with open(path, 'rb') as read_f:
+            magic, version = _MANIFEST_HEADER.unpack(
+                read_f.read(_MANIFEST_HEADER.size))
+            if magic != _MANIFEST_MAGIC or version != _MANIFEST_VERSION:
+                raise ValueError("unknown format")
+            encoding = _read_blob(read_f).decode("ascii")
+            segments = _split_names(_read_blob(read_f))
+            files = _split_names(_read_blob(read_f))
+            hashes = _read_blob(read_f)
+            sizes, mtimes, segment_ids, file_ids = (
+                _read_array(read_f) for _ in range(4))
+    except FileNotFoundError as fnf:
+        fnf_msg = dir + " is not indexed. Please build the index first."
+        logging.error(fnf_msg)
+        raise FileNotFoundError(fnf_msg).with_traceback(fnf.__traceback__)
+    except (ValueError, struct.error):
+        index_msg = (f"Invalid index in {dir}. Please build the index" +
+                     " again.")
+        logging.error(index_msg)
+        raise ValueError(index_msg) from None
+    entries = {file: (sizes[i], mtimes[i],
+                      hashes[_HASH_SIZE*i:_HASH_SIZE*(i+1)],
+                      segments[segment_ids[i]], file_ids[i])
+               for i, file in enumerate(files)}
+    return encoding, segments, entries
+
+
+def _query_patterns(matcher):
+    """Retrieves the case-folded search strings of a matcher which are
+    looked up in an index.
+
+    Args:
+        matcher (StringMatcher or MultiStringMatcher): Matcher whose
+            search strings are looked up.
+
+    Returns:
+        list: Contains the case-folded search strings (str), or None
+            if they cannot be looked up, i.e. for bytes and matchers
+            with normalization or full case folding.
+    """
+    patterns = getattr(matcher, "_patterns", None)
+    if patterns is None:
+        patterns = [matcher._pattern]
+    if (matcher._normalize or matcher._casefold or
+            any(not isinstance(pattern, str) for pattern in patterns)):
+        return None
+    return [_fold_case(pattern) for pattern in patterns]
+
+
+def _search_files(matcher, dir, encoding, files, algorithm, kwargs):
+    """Searches the given txt-files of a directory with the search_dir
+    of a matcher, passing the algorithm to a StringMatcher only, since
+    a MultiStringMatcher always uses Aho-Corasick.
+    """
+    if not hasattr(matcher, "_patterns"):
+        kwargs = dict(kwargs, algorithm=algorithm)
+    return matcher.search_dir(dir, encoding=encoding, files=files,
+                              **kwargs)
+
+
+def _trigrams(text):
+    """Collects the distinct trigrams of a text.
+
+    Args:
+        text (str): Case-folded text.
+
+    Returns:
+        set: Contains the trigrams (str) of the text.
+    """
+    return set(map(''.join, zip(text, text[1:], text[2:])))
+
+
+def _find_trigram(trigrams, trigram):
+    """Binary search for a trigram in the concatenated sorted trigrams.
+
+    Args:
+        trigrams (str): Sorted trigrams concatenated to a string.
+        trigram (str): Trigram which is looked up.
+
+    Returns:
+        int: Position of the trigram in the sorted trigrams, or None
+            if it is not indexed.
+    """
+    low, high = 0, len(trigrams) // 3
+    while low < high:
+        middle = (low + high) // 2
+        key = trigrams[3*middle:3*middle+3]
+        if key < trigram:
+            low = middle + 1
+        elif key > trigram:
+            high = middle
+        else:
+            return middle
+    return None
+
+
+def _segment_name(index_dir):
+    """Names a new segment file, numbered after the existing ones."""
+    numbers = [int(name[8:-4]) for name in os.listdir(index_dir)
+               if name.startswith("segment-") and name.endswith(".bin") and
+               name[8:-4].isdigit()]
+    return f"segment-{max(numbers, default=0) + 1}.bin"
+
+
+def _bloom_hashes(trigrams):
+    """Computes a hash of every trigram, from which the bits of the
+    Bloom filters are derived by double hashing. Unlike hash, it does
+    not depend on the hash randomization of str, so the sidecars remain
+    valid across program runs.
+
+    Args:
+        trigrams (iterable): Trigrams (str).
+
+    Returns:
+        list: Contains the hashes (int) of the trigrams.
+    """
+    return [zlib.crc32(trigram.encode("utf-8", "surrogatepass")) *
+            0x9E3779B97F4A7C15 for trigram in trigrams]  # spread bits
+
+
+def _bloom_positions(trigram_hash, k, m):
+    """Derives the k bit positions of a trigram in a Bloom filter of m
+    bits from its hash.
+    """
+    position, step = trigram_hash % m, (trigram_hash >> 32) % m | 1
+    positions = []
+    for _ in range(k):
+        positions.append(position)
+        position = (position + step) % m
+    return positions
+
+
+def _build_bloom_filter(trigrams):
+    """Builds a Bloom filter of trigrams with BLOOM_HASHES hash
+    functions and BLOOM_ERROR_RATE.
+
+    Args:
+        trigrams (set): Trigrams (str) of a file.
+
+    Returns:
+        tuple: Contains the bits (bytes) of the Bloom filter and its
+            number of hash functions (int).
+    """
+    k = BLOOM_HASHES
+    m = max(8, math.ceil(-k * len(trigrams) /
+                         math.log(1 - BLOOM_ERROR_RATE ** (1 / k)) / 8) * 8)
+    bits = bytearray(m // 8)
+    for trigram_hash in _bloom_hashes(trigrams):  # _bloom_positions
+        position, step = trigram_hash % m, (trigram_hash >> 32) % m | 1
+        for _ in range(k):
+            bits[position >> 3] |= 1 << (position & 7)
+            position = (position + step) % m
+    return bytes(bits), k
+
+
+def _bloom_contains(bits, k, hashes):
+    """Tests whether a Bloom filter may contain all trigrams of a
+    search string, given their hashes.
+    """
+    m = 8 * len(bits)
+    return all(bits[position >> 3] >> (position & 7) & 1
+               for trigram_hash in hashes
+               for position in _bloom_positions(trigram_hash, k, m))
+
+
+def _split_names(data):
+    """Converts a blob of names separated by null characters back to a
+    list of names (str).
+    """
+    names = _unpack_chars(data, False)
+    return names.split("\0") if names else []
+
+
+def _write_segment(path, files, postings):
+    """Writes a segment file, which only appears under its name when it
+    is complete.
+
+    Args:
+        path (str): Path to the segment file.
+        files (list): Names (str) of the indexed files.
+        postings (dict): Mapping of trigrams (str) to lists of the ids
+            (int) of the files in which they occur.
+    """
+    trigrams = sorted(postings)
+    offsets = array('q', [0])
+    all_postings = array('i')
+    for trigram in trigrams:
+        all_postings.extend(postings[trigram])
+        offsets.append(len(all_postings))
+    if sys.byteorder == "big":
+        all_postings.byteswap()
+    with open(path + ".tmp", 'wb') as write_f:
+        write_f.write(_SEGMENT_HEADER.pack(_SEGMENT_MAGIC,
+                                           _SEGMENT_VERSION))
+        _write_blob(write_f, _pack_chars("\0".join(files)))
+        _write_blob(write_f, _pack_chars(''.join(trigrams)))
+        _write_array(write_f, offsets)
+        write_f.write(all_postings.tobytes())
+    os.replace(path + ".tmp", path)
+
+
+def _write_manifest(index_dir, encoding, segments, entries):
+    """Writes the manifest, which replaces the previous one atomically,
+    so that the index switches to the new segments at once.
+
+    Args:
+        index_dir (str): Path to the index directory.
+        encoding (str): Encoding of the indexed files.
+        segments (list): Names (str) of the segment files.
+        entries (dict): Entries of the indexed files (see StringIndex).
+    """
+    files = sorted(entries)
+    segment_ids = {segment: i for i, segment in enumerate(segments)}
+    path = os.path.join(index_dir, "manifest.bin")
+    with open(path + ".tmp", 'wb') as write_f:
+        write_f.write(_MANIFEST_HEADER.pack(_MANIFEST_MAGIC,
+                                            _MANIFEST_VERSION))
+        _write_blob(write_f, encoding.encode("ascii"))
+        _write_blob(write_f, _pack_chars("\0".join(segments)))
+        _write_blob(write_f, _pack_chars("\0".join(files)))
+        _write_blob(write_f, b''.join(entries[file][2] for file in files))
+        for values in (array('q', (entries[file][0] for file in files)),
+                       array('q', (entries[file][1] for file in files)),
+                       array('i', (segment_ids[entries[file][3]]
+                                   for file in files)),
+                       array('i', (entries[file][4] for file in files))):
+            _write_array(write_f, values)
+    os.replace(path + ".tmp", path)
@@ -6,8 +6,22 @@
 # Windows 10
 """String matching tool."""
 
+import codecs
+import heapq
 import logging
+import mmap
 import os
+import re
+import struct
+import sys
+import unicodedata
+import warnings
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager, nullcontext
+from functools import lru_cache, partial
+from itertools import groupby, islice, takewhile
 
 from tqdm import tqdm
 
@@ -18,132 +32,868 @@ logging.basicConfig(filename="stringmatcher_log.log",
                     level=logging.INFO,
                     format="%(levelname)s:%(asctime)s:%(message)s")
 
+# selectable search algorithms mapped to the implementing method
+ALGORITHMS = {"naive": "naive",
+              "bm": "boyer_moore",
+              "horspool": "horspool",
+              "sunday": "sunday",
+              "twoway": "two_way",
+              "builtin": "builtin"}
+
+# number of characters read at once when streaming a file
+CHUNK_SIZE = 1 << 20
+
+# default number of preprocessed patterns kept by StringMatcher.compile
+CACHE_SIZE = 4096
+
+# binary format of StringMatcher.dump: magic, version, flags,
+# normalization form, critical position and period of the pattern
+_DUMP_HEADER = struct.Struct("<4sHHBqq")
+_DUMP_MAGIC = b"STRM"
+_DUMP_VERSION = 1
+
+# Unicode normalization forms supported by the normalize parameter
+NORMALIZATION_FORMS = ("NFC", "NFKC")
+
+# runs of characters which are normalized independently of each other:
+# ASCII characters neither compose with preceding characters nor change
+# under normalization, but may compose with following combining marks
+_SEGMENT_PATTERN = re.compile(r"[\x00-\x7f]+(?![^\x00-\x7f])"
+                              r"|[\x00-\x7f]?[^\x00-\x7f]+")
+_ASCII_PATTERN = re.compile(r"[\x00-\x7f]")
+# matches up to the last ASCII character of a string
+_LAST_ASCII_PATTERN = re.compile(r".*[\x00-\x7f]", re.DOTALL)
+
 
 class StringMatcher:
-    """Provides two string search algorithms to determine the positions
-    in a text.
+    """Provides several string search algorithms to determine the
+    positions in a text.
 
     Args:
-        pattern (str): String that is searched for.
+        pattern (str or bytes): String that is searched for. A bytes
+            pattern is searched for in bytes-like texts (e.g. bytes or
+            memoryview) and files are read in binary mode, so binary
+            files and files of any encoding can be searched without
+            decoding. Normalization and full case folding apply to str
+            patterns only.
         case (bool): Case-sensitive string search if True,
-            else case-insensitive.
+            else case-insensitive (ASCII letters only for bytes).
+        algorithm (str): Search algorithm used by search_text,
+            search_file and search_dir, one of the keys of ALGORITHMS
+            or 'auto' to let the matcher choose the fastest one on the
+            basis of the pattern and the first searched text.
+            Defaults to 'bm'.
+        normalize (str): Unicode normalization form, one of
+            NORMALIZATION_FORMS, so that e.g. precomposed and
+            decomposed accents match each other. Defaults to None,
+            i.e. no normalization.
+        casefold (bool): Full Unicode case folding, so that e.g. 'ß'
+            matches 'SS' and final sigma matches sigma. Implies a
+            case-insensitive search. Defaults to False.
+
+    Normalization and case folding are applied by search_text,
+    iter_text, count, contains and the file and directory searches
+    (except for memory-mapped ones), while the engine methods (e.g.
+    boyer_moore) search the text as it is. The text is normalized
+    block by block and the positions are mapped back to the original
+    text.
 
     Attributes:
-        pattern (str): String that is searched for.
+        pattern (str or bytes): String that is searched for.
+        accepted (list): Mapping of each index of the pattern to the
+            characters (str) matching it, i.e. the pattern's character
+            and, in case-insensitive search, its case variants.
         bad_char_heuristic (dict): Mapping of characters (str) as keys
             to indices (int) of their rightmost occurrence in the
-            pattern.
+            pattern, including case variants in case-insensitive
+            search. For bytes patterns, a flat array of 256 indices
+            (-1 for bytes not in the pattern) indexed by byte value.
+        horspool_heuristic (dict): Like bad_char_heuristic, but
+            without considering the pattern's last character.
         good_suffix_heuristic (list): Mapping of mismatch index to
             number of shifts that can be made, on the basis of an
             already matching suffix (= good suffix), without missing
-            possible alignments.
+            possible alignments. An array for bytes patterns.
+        critical_position (int): Index of the last character of the
+            left part of the pattern's critical factorization, used by
+            the Two-Way algorithm.
+        period (int): Period of the pattern if it is periodic with
+            respect to the critical factorization, else a lower bound
+            of the shift in case of a match of the right part.
+        periodic (bool): True if the left part of the critical
+            factorization reoccurs period characters later.
         case (bool): Case-sensitive string search if True,
             else case-insensitive.
+        engine (str): Search algorithm used by search_text (key of
+            ALGORITHMS). With algorithm 'auto', it is provisional
+            until the first text is searched.
+        auto (bool): True if the engine still has to be confirmed on
+            the first searched text.
+        normalize (str): Unicode normalization form or None.
+        casefold (bool): Full Unicode case folding if True.
     """
-    def __init__(self, pattern, case=True):
+    def __init__(self, pattern, case=True, algorithm="bm", normalize=None,
+                 casefold=False):
         if len(pattern) == 0:
             raise EmptyStringException("Invalid search string. Empty" +
                                        " strings are everywhere." +
                                        " Please try something with" +
                                        " characters.")
-        if not case:
-            pattern = pattern.lower()
+        _check_normalization(normalize)
+        _check_str_options(pattern, normalize, casefold)
+        if normalize or casefold:
+            pattern = _canonical(pattern, normalize, casefold)[0]
+        case = case and not casefold
+        if case or casefold:  # the text is case folded if casefold
+            accepted = [pattern[j:j+1] for j in range(len(pattern))]
+        else:
+            pattern = _fold_case(pattern)
+            accepted = [_case_variants(pattern[j:j+1])
+                        for j in range(len(pattern))]
 
+        flat = isinstance(pattern, bytes)  # tables indexed by byte value
         self._pattern = pattern
-        self._bad_char_heuristic = self._rightmost_index_table(pattern)
+        self._accepted = accepted
+        self._bad_char_heuristic = self._rightmost_index_table(accepted,
+                                                               flat)
+        self._horspool_heuristic = self._rightmost_index_table(
+            accepted[:-1], flat)
         self._good_suffix_heuristic = self._good_suffix_shifts(pattern)
+        if flat:
+            self._good_suffix_heuristic = array(
+                'i', self._good_suffix_heuristic)
+        (self._critical_position, self._period,
+         self._periodic) = self._critical_factorization(pattern)
         self._case = case
+        self._normalize = normalize
+        self._casefold = casefold
+        self._init_engine(algorithm)
+        self._byte_matchers = dict()  # encoded patterns by codec
+
+    @classmethod
+    def compile(cls, pattern, case=True, algorithm="bm", normalize=None,
+                casefold=False):
+        """Constructs a matcher like the constructor, but takes the
+        preprocessed tables from a cache of the most recently compiled
+        patterns, like re.compile. The tables are shared by matchers
+        of the same pattern and are never modified.
+
+        Args:
+            pattern (str or bytes): String that is searched for.
+            case (bool): Case-sensitive string search if True,
+                else case-insensitive.
+            algorithm (str): Search algorithm (see StringMatcher).
+                Defaults to 'bm'.
+            normalize (str): Unicode normalization form or None.
+            casefold (bool): Full Unicode case folding if True.
+
+        Returns:
+            StringMatcher: Matcher of the pattern.
+        """
+        template = _preprocessed(pattern, case, normalize, casefold)
+        matcher = cls.__new__(cls)
+        matcher.__dict__.update(template.__dict__)
+        matcher._init_engine(algorithm)
+        matcher._byte_matchers = dict()
+        return matcher
+
+    @staticmethod
+    def cache_info():
+        """Reports the statistics of the cache used by compile.
+
+        Returns:
+            functools._CacheInfo: Named tuple of hits, misses, maxsize
+                and currsize, like functools.lru_cache.
+        """
+        return _preprocessed.cache_info()
+
+    @staticmethod
+    def set_cache_size(maxsize=CACHE_SIZE):
+        """Sets the maximum number of patterns kept by the cache used by
+        compile, where the least recently used patterns are evicted
+        first. The cache and its statistics are cleared.
+
+        Args:
+            maxsize (int): Maximum number of patterns, None for an
+                unbounded cache. Defaults to CACHE_SIZE.
+        """
+        global _preprocessed
+        _preprocessed = lru_cache(maxsize, typed=True)(
+            _preprocessed.__wrapped__)
+
+    @staticmethod
+    def purge():
+        """Clears the cache used by compile and its statistics."""
+        _preprocessed.cache_clear()
+
+    def dump(self, fp):
+        """Writes the preprocessed pattern, i.e. the pattern and its
+        tables, in a compact binary format to a file, which load reads
+        without preprocessing the pattern again. The format starts
+        with a versioned header, followed by the tables as arrays.
+
+        Args:
+            fp (file): File opened for writing in binary mode.
+        """
+        flat = isinstance(self._pattern, bytes)
+        exact = self._case or self._casefold  # accepted is the pattern
+        flags = (flat | self._case << 1 | self._casefold << 2 |
+                 self._periodic << 3 | self._auto << 4)
+        form = (NORMALIZATION_FORMS.index(self._normalize) + 1
+                if self._normalize else 0)
+        fp.write(_DUMP_HEADER.pack(_DUMP_MAGIC, _DUMP_VERSION, flags, form,
+                                   self._critical_position, self._period))
+        _write_blob(fp, self._engine.encode("ascii"))
+        _write_blob(fp, _pack_chars(self._pattern))
+        _write_array(fp, array('i', self._good_suffix_heuristic))
+        if not exact:
+            _write_blob(fp, _pack_chars(self._pattern[:0].join(
+                self._accepted)))
+            _write_array(fp, array('i', map(len, self._accepted)))
+        for table in (self._bad_char_heuristic, self._horspool_heuristic):
+            if flat:
+                _write_array(fp, table)
+            else:
+                _write_blob(fp, _pack_chars(''.join(table)))
+                _write_array(fp, array('i', table.values()))
+
+    @classmethod
+    def load(cls, fp):
+        """Reads a preprocessed pattern written by dump.
+
+        Args:
+            fp (file): File opened for reading in binary mode.
+
+        Returns:
+            StringMatcher: Matcher of the pattern.
+        """
+        try:
+            (magic, version, flags, form, critical_position,
+             period) = _DUMP_HEADER.unpack(fp.read(_DUMP_HEADER.size))
+            if magic != _DUMP_MAGIC or version != _DUMP_VERSION:
+                raise ValueError
+            flat = bool(flags & 1)
+            matcher = cls.__new__(cls)
+            matcher._case = bool(flags & 2)
+            matcher._casefold = bool(flags & 4)
+            matcher._periodic = bool(flags & 8)
+            matcher._auto = bool(flags & 16)
+            matcher._normalize = (NORMALIZATION_FORMS[form - 1] if form
+                                  else None)
+            matcher._critical_position = critical_position
+            matcher._period = period
+            matcher._engine = _read_blob(fp).decode("ascii")
+            if matcher._engine not in ALGORITHMS:
+                raise ValueError
+            pattern = _unpack_chars(_read_blob(fp), flat)
+            matcher._pattern = pattern
+            good_suffix = _read_array(fp)
+            matcher._good_suffix_heuristic = (good_suffix if flat else
+                                              good_suffix.tolist())
+            if matcher._case or matcher._casefold:
+                accepted = (list(pattern) if not flat else
+                            [pattern[j:j+1] for j in range(len(pattern))])
+            else:
+                chars = _unpack_chars(_read_blob(fp), flat)
+                accepted = []
+                start = 0
+                for length in _read_array(fp):
+                    accepted.append(chars[start:start+length])
+                    start += length
+            matcher._accepted = accepted
+            tables = []
+            for _ in range(2):
+                if flat:
+                    tables.append(_read_array(fp))
+                else:
+                    keys = _unpack_chars(_read_blob(fp), flat)
+                    tables.append(dict(zip(keys, _read_array(fp))))
+            matcher._bad_char_heuristic, matcher._horspool_heuristic = tables
+        except (ValueError, IndexError, struct.error):
+            load_msg = ("Invalid file. Please load a pattern written by" +
+                        " StringMatcher.dump.")
+            logging.error(load_msg)
+            raise ValueError(load_msg) from None
+        matcher._byte_matchers = dict()
+        return matcher
+
+    @property
+    def engine(self):
+        """str: Search algorithm used by search_text."""
+        return self._engine
+
+    def search_text(self, text, max_matches=None):
+        """Searches a text with the algorithm the matcher was
+        constructed with. In case of algorithm 'auto', the engine is
+        confirmed on the first call, taking the text into account.
+
+        Args:
+            text (str): Text that is searched for a pattern.
+            max_matches (int): Maximum number of occurrences, after
+                which the search stops. Defaults to None, i.e. all.
+
+        Returns:
+            list: Contains the indices of the pattern's occurrences.
+        """
+        return list(_first(self.iter_text(text), max_matches))
+
+    def count(self, text, max_matches=None):
+        """Counts the occurrences of the pattern in a text without
+        collecting their indices.
+
+        Args:
+            text (str): Text that is searched for a pattern.
+            max_matches (int): Maximum number of occurrences, after
+                which the counting stops. Defaults to None, i.e. all.
+
+        Returns:
+            int: Number of occurrences.
+        """
+        return sum(1 for _ in _first(self.iter_text(text), max_matches))
+
+    def contains(self, text):
+        """Checks whether the pattern occurs in a text. The search
+        stops at the first occurrence.
+
+        Args:
+            text (str): Text that is searched for a pattern.
+
+        Returns:
+            bool: True if the pattern occurs in the text, else False.
+        """
+        return next(self.iter_text(text), None) is not None
 
-    def naive(self, text):
+    def iter_text(self, text):
+        """Lazy counterpart of search_text, which yields the indices of
+        the pattern's occurrences as soon as they are found.
+
+        Args:
+            text (str): Text that is searched for a pattern.
+
+        Yields:
+            int: Index of an occurrence of the pattern.
+        """
+        if self._auto:
+            self._confirm_engine(text)
+        search_func = self._search_function(self._engine, lazy=True)
+        return self._canonical_search(search_func)(text)
+
+    def naive(self, text, max_matches=None):
         """Naive string matching algorithm (brute force).
 
         Args:
             text (str): Text that is searched for a pattern.
+            max_matches (int): Maximum number of occurrences, after
+                which the search stops. Defaults to None, i.e. all.
 
         Returns:
             list: Contains the indices of the pattern's occurrences.
         """
-        if not self._case:
-            text = text.lower()
+        return list(_first(self.iter_naive(text), max_matches))
+
+    def iter_naive(self, text):
+        """Lazy counterpart of naive.
+
+        Args:
+            text (str): Text that is searched for a pattern.
+
+        Yields:
+            int: Index of an occurrence of the pattern.
+        """
         m = len(self._pattern)
-        positions = []
-        for shift in range(len(text) - m + 1):
-            if self._pattern == text[shift:shift+m]:
-                positions.append(shift)
-        return positions
+        if self._case or self._casefold:
+            for shift in range(len(text) - m + 1):
+                if self._pattern == text[shift:shift+m]:
+                    yield shift
+        else:
+            accepted = self._accepted
+            for shift in range(len(text) - m + 1):
+                j = 0
+                while j < m and text[shift+j] in accepted[j]:
+                    j += 1
+                if j == m:
+                    yield shift
 
-    def boyer_moore(self, text):
+    def boyer_moore(self, text, max_matches=None):
         """Boyer-Moore (BM) string matching algorithm according to the
         description by Cormen et al. (1990). In contrast to the naive
         algorithm, this BM algorithm reads the pattern from right to
         left and makes use of the pattern's inner structure to skip
-        shifts and reduce the number of comparisons to be made.
+        shifts and reduce the number of comparisons to be made. After
+        a complete match, the prefix that is known to match is not
+        compared again (Galil rule), which bounds the number of
+        comparisons to O(n) also for periodic patterns.
 
         Args:
             text (str): Text that is searched for a pattern.
+            max_matches (int): Maximum number of occurrences, after
+                which the search stops. Defaults to None, i.e. all.
 
         Returns:
             list: Contains the indices of the pattern's occurrences.
         """
-        if not self._case:
-            text = text.lower()
+        return list(_first(self.iter_boyer_moore(text), max_matches))
+
+    def iter_boyer_moore(self, text):
+        """Lazy counterpart of boyer_moore.
+
+        Args:
+            text (str): Text that is searched for a pattern.
+
+        Yields:
+            int: Index of an occurrence of the pattern.
+        """
+        accepted = self._accepted
+        good_suffix = self._good_suffix_heuristic
+        bad_char = self._bad_char_heuristic
         m = len(self._pattern)
+        period = good_suffix[0]  # shift after a complete match
+        memory = 0  # length of the prefix known to match (Galil rule)
         shift = 0
-        positions = []
+        if isinstance(bad_char, array):  # bytes indexing the table
+            while shift <= len(text) - m:
+                j = m - 1
+                while j >= memory and text[shift+j] in accepted[j]:
+                    j -= 1
+                if j < memory:
+                    yield shift
+                    shift += period
+                    memory = m - period
+                else:
+                    shift += max(good_suffix[j],
+                                 j - bad_char[text[shift+j]])
+                    memory = 0
+            return
         while shift <= len(text) - m:
             j = m - 1  # last character in pattern
-            while j > -1 and self._pattern[j] == text[shift+j]:
+            while j >= memory and text[shift+j] in accepted[j]:
                 j -= 1
-            if j == -1:  # complete match found
-                positions.append(shift)
-                shift += self._good_suffix_heuristic[0]
+            if j < memory:  # complete match found
+                yield shift
+                shift += period
+                # the pattern's border now matches the end of the match
+                memory = m - period
             else:  # mismatch at index j
-                shift += max(
-                    self._good_suffix_heuristic[j],
-                    j - self._bad_char_heuristic.get(text[shift+j], -1)
-                    )
-        return positions
+                shift += max(good_suffix[j],
+                             j - bad_char.get(text[shift+j], -1))
+                memory = 0
+
+    def horspool(self, text, max_matches=None):
+        """Boyer-Moore-Horspool string matching algorithm. Only the
+        text character aligned with the pattern's last character
+        determines the shift, which saves work per alignment in
+        comparison to the two heuristics of the BM algorithm.
+
+        Args:
+            text (str): Text that is searched for a pattern.
+            max_matches (int): Maximum number of occurrences, after
+                which the search stops. Defaults to None, i.e. all.
+
+        Returns:
+            list: Contains the indices of the pattern's occurrences.
+        """
+        return list(_first(self.iter_horspool(text), max_matches))
+
+    def iter_horspool(self, text):
+        """Lazy counterpart of horspool.
+
+        Args:
+            text (str): Text that is searched for a pattern.
+
+        Yields:
+            int: Index of an occurrence of the pattern.
+        """
+        accepted = self._accepted
+        horspool = self._horspool_heuristic
+        m = len(self._pattern)
+        last = m - 1
+        shift = 0
+        if isinstance(horspool, array):  # bytes indexing the table
+            while shift <= len(text) - m:
+                j = last
+                while j > -1 and text[shift+j] in accepted[j]:
+                    j -= 1
+                if j == -1:
+                    yield shift
+                shift += last - horspool[text[shift+last]]
+            return
+        while shift <= len(text) - m:
+            j = last
+            while j > -1 and text[shift+j] in accepted[j]:
+                j -= 1
+            if j == -1:  # complete match found
+                yield shift
+            shift += last - horspool.get(text[shift+last], -1)
+
+    def sunday(self, text, max_matches=None):
+        """Sunday (Quick Search) string matching algorithm. The shift
+        is determined by the text character right behind the current
+        alignment, which allows shifts by up to m + 1 characters.
+
+        Args:
+            text (str): Text that is searched for a pattern.
+            max_matches (int): Maximum number of occurrences, after
+                which the search stops. Defaults to None, i.e. all.
+
+        Returns:
+            list: Contains the indices of the pattern's occurrences.
+        """
+        return list(_first(self.iter_sunday(text), max_matches))
+
+    def iter_sunday(self, text):
+        """Lazy counterpart of sunday.
+
+        Args:
+            text (str): Text that is searched for a pattern.
+
+        Yields:
+            int: Index of an occurrence of the pattern.
+        """
+        accepted = self._accepted
+        bad_char = self._bad_char_heuristic
+        m = len(self._pattern)
+        n = len(text)
+        shift = 0
+        if isinstance(bad_char, array):  # bytes indexing the table
+            while shift <= n - m:
+                j = 0
+                while j < m and text[shift+j] in accepted[j]:
+                    j += 1
+                if j == m:
+                    yield shift
+                if shift + m == n:
+                    break
+                shift += m - bad_char[text[shift+m]]
+            return
+        while shift <= n - m:
+            j = 0
+            while j < m and text[shift+j] in accepted[j]:
+                j += 1
+            if j == m:  # complete match found
+                yield shift
+            if shift + m == n:  # no character behind the alignment
+                break
+            shift += m - bad_char.get(text[shift+m], -1)
+
+    def two_way(self, text, max_matches=None):
+        """Two-Way string matching algorithm according to Crochemore &
+        Perrin (1991). The pattern is split at its critical
+        factorization. The right part is compared from left to right,
+        the left part from right to left afterwards. Apart from the
+        factorization, no tables are needed and the text is searched
+        in linear time, also for periodic patterns.
+
+        Args:
+            text (str): Text that is searched for a pattern.
+            max_matches (int): Maximum number of occurrences, after
+                which the search stops. Defaults to None, i.e. all.
+
+        Returns:
+            list: Contains the indices of the pattern's occurrences.
+        """
+        return list(_first(self.iter_two_way(text), max_matches))
+
+    def iter_two_way(self, text):
+        """Lazy counterpart of two_way.
+
+        Args:
+            text (str): Text that is searched for a pattern.
+
+        Yields:
+            int: Index of an occurrence of the pattern.
+        """
+        accepted = self._accepted
+        ell = self._critical_position
+        period = self._period
+        m = len(self._pattern)
+        n = len(text)
+        shift = 0
+        if self._periodic:
+            memory = -1  # prefix known to match after a shift by period
+            while shift <= n - m:
+                i = max(ell, memory) + 1
+                while i < m and text[shift+i] in accepted[i]:
+                    i += 1
+                if i >= m:  # right part matches, check the left part
+                    i = ell
+                    while i > memory and text[shift+i] in accepted[i]:
+                        i -= 1
+                    if i <= memory:  # complete match found
+                        yield shift
+                    shift += period
+                    memory = m - period - 1
+                else:
+                    shift += i - ell
+                    memory = -1
+        else:
+            while shift <= n - m:
+                i = ell + 1
+                while i < m and text[shift+i] in accepted[i]:
+                    i += 1
+                if i >= m:  # right part matches, check the left part
+                    i = ell
+                    while i >= 0 and text[shift+i] in accepted[i]:
+                        i -= 1
+                    if i < 0:  # complete match found
+                        yield shift
+                    shift += period
+                else:
+                    shift += i - ell
+
+    def builtin(self, text, max_matches=None, overlapping=True):
+        """Delegates the search to the built-in find method of the text
+        (e.g. str.find), which runs in C and is much faster than the
+        algorithms above. In case-insensitive search, a case-folded
+        copy of the text is searched.
+
+        Args:
+            text (str): Text that is searched for a pattern.
+            max_matches (int): Maximum number of occurrences, after
+                which the search stops. Defaults to None, i.e. all.
+            overlapping (bool): If False, the search resumes behind an
+                occurrence, so that occurrences do not overlap.
+                Defaults to True.
 
-    def search_file(self, file, encoding="utf-8", naive=False):
+        Returns:
+            list: Contains the indices of the pattern's occurrences.
+        """
+        return list(_first(self.iter_builtin(text, overlapping),
+                           max_matches))
+
+    def iter_builtin(self, text, overlapping=True):
+        """Lazy counterpart of builtin.
+
+        Args:
+            text (str): Text that is searched for a pattern.
+            overlapping (bool): If False, occurrences do not overlap.
+                Defaults to True.
+
+        Yields:
+            int: Index of an occurrence of the pattern.
+        """
+        pattern = self._pattern
+        step = 1 if overlapping else len(pattern)
+        if not hasattr(text, "find"):  # e.g. memoryview
+            flags = 0 if self._case else re.IGNORECASE  # ASCII for bytes
+            regex = re.compile(re.escape(pattern), flags)
+            match = regex.search(text)
+            while match:
+                yield match.start()
+                match = regex.search(text, match.start() + step)
+            return
+        if not (self._case or self._casefold):
+            # character by character, like the accepted case variants
+            # of the other engines (str.lower would apply the final
+            # sigma rule and lower 'İ' to 2 characters)
+            text = _fold_case(text)
+        index = text.find(pattern)
+        while index != -1:
+            yield index
+            index = text.find(pattern, index + step)
+
+    def search_file(self, file, encoding="utf-8", naive=False,
+                    algorithm=None, stream=False, max_matches=None):
         """Searches text file for occurrences of a string.
 
         Args:
             file (str): Path to the text file which is to be searched
                 for a particular string.
             encoding (str): File encoding. Defaults to utf-8.
-            naive (bool): Naive search algorithm is used if True, else
-                BM algorithm. Defaults to False.
+            naive (bool): Deprecated, use algorithm='naive' instead.
+                Defaults to False.
+            algorithm (str): Search algorithm, one of the keys of
+                ALGORITHMS. Defaults to None, i.e. the
+                algorithm the matcher was constructed with.
+            stream (bool): If True, the file is searched in chunks of
+                CHUNK_SIZE characters instead of line by line, so that
+                strings containing newline characters are found as
+                well. Defaults to False.
+            max_matches (int): Maximum number of occurrences, after
+                which the file is not read any further. Defaults to
+                None, i.e. all.
 
         Returns:
             list: Contains 2-tuples consisting of a line number and a
                 list of positions (int) in that line, e.g. for findings
                 in line 2 and 56: [(2, [23, 41, 75]), (56, [45])].
+                Findings spanning several lines belong to the line
+                where they start.
+        """
+        algorithm = _naive_algorithm(naive, algorithm)
+        return _group_lines(self.iter_file(file, encoding=encoding,
+                                           algorithm=algorithm,
+                                           stream=stream,
+                                           max_matches=max_matches))
+
+    def iter_file(self, file, encoding="utf-8", algorithm=None,
+                  stream=False, max_matches=None):
+        """Lazy counterpart of search_file, which yields the findings
+        as soon as they are found, so the search can be stopped early.
+
+        Args:
+            file (str): Path to the text file which is to be searched
+                for a particular string.
+            encoding (str): File encoding. Defaults to utf-8.
+            algorithm (str): Search algorithm, one of the keys of
+                ALGORITHMS. Defaults to None, i.e. the
+                algorithm the matcher was constructed with.
+            stream (bool): If True, the file is searched in chunks
+                (see search_file). Defaults to False.
+            max_matches (int): Maximum number of occurrences, after
+                which the file is not read any further. Defaults to
+                None, i.e. all.
+
+        Yields:
+            tuple: Contains the line number and the position (int) of
+                an occurrence in that line, e.g. (2, 23).
         """
-        search_func = self.naive if naive else self.boyer_moore
+        if algorithm is None:
+            search_func = self.iter_text
+        else:
+            search_func = self._canonical_search(
+                self._search_function(algorithm, lazy=True))
+        if isinstance(self._pattern, bytes):
+            encoding = None  # read in binary mode
+        if stream:
+            line_findings = _iter_chunks(search_func, file, encoding,
+                                         overlap=len(self._pattern) - 1,
+                                         form=self._normalize,
+                                         casefold=self._casefold)
+        else:
+            line_findings = _iter_lines(search_func, file, encoding)
+        return _first(line_findings, max_matches)
+
+    def search_file_mmap(self, file, encoding="utf-8", algorithm=None,
+                         resolve_lines=False, max_matches=None):
+        """Searches a memory-mapped file for occurrences of a string
+        on byte level, i.e. the file content is neither decoded nor
+        copied. The string is encoded once per encoding instead.
+
+        Args:
+            file (str): Path to the file which is to be searched for a
+                particular string.
+            encoding (str): File encoding. Defaults to utf-8.
+            algorithm (str): Search algorithm, one of the keys of
+                ALGORITHMS. Defaults to None, i.e. the
+                algorithm the matcher was constructed with.
+            resolve_lines (bool): If True, the byte offsets are mapped
+                to line numbers and positions in the line, like in
+                search_file. Defaults to False.
+            max_matches (int): Maximum number of occurrences, after
+                which the search stops. Defaults to None, i.e. all.
+
+        Returns:
+            list: Contains the byte offsets (int) of the string's
+                occurrences in the file, or, if resolve_lines is True,
+                2-tuples consisting of a line number and a list of
+                positions (int) in that line.
+        """
+        self._check_memory_map()
+        with _file_errors(file, encoding), open(file, 'rb') as read_f:
+            if os.fstat(read_f.fileno()).st_size == 0:
+                return []  # empty files cannot be mapped
+            with mmap.mmap(read_f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if isinstance(self._pattern, bytes):  # one char per byte
+                    codec, data_start = "latin-1", 0
+                else:
+                    codec, data_start = _byte_codec(encoding, mm[:4])
+                matcher = self._byte_matcher(codec)
+                if algorithm is None:
+                    search_func = matcher.iter_text
+                else:
+                    search_func = matcher._search_function(algorithm,
+                                                           lazy=True)
+                unit = len(_encode("\n", codec))  # bytes per code unit
+                with memoryview(mm) as view:
+                    offsets = (data_start + offset
+                               for offset in search_func(view[data_start:])
+                               if offset % unit == 0)
+                    offsets = list(_first(offsets, max_matches))
+                if resolve_lines:
+                    return _byte_lines(mm, offsets, codec, data_start)
+                return offsets
+
+    def search_file_parallel(self, file, encoding="utf-8", algorithm=None,
+                             workers=None, max_matches=None):
+        """Searches a single (large) file with several processes. The
+        file is split into byte ranges which are memory-mapped and
+        searched in parallel like in search_file_mmap. Consecutive
+        ranges overlap by the length of the encoded string minus 1.
+
+        Args:
+            file (str): Path to the file which is to be searched for a
+                particular string.
+            encoding (str): File encoding. Defaults to utf-8.
+            algorithm (str): Search algorithm, one of the keys of
+                ALGORITHMS. Defaults to None, i.e. the
+                algorithm the matcher was constructed with.
+            workers (int): Number of processes. Defaults to None, i.e.
+                the number of CPUs.
+            max_matches (int): Maximum number of occurrences, after
+                which further byte ranges are not searched.
+                Defaults to None, i.e. all.
+
+        Returns:
+            list: Contains 2-tuples consisting of a line number and a
+                list of positions (int) in that line, like search_file.
+        """
+        self._check_memory_map()
+        if algorithm is not None:
+            self._search_function(algorithm)  # fail before reading files
+        workers = workers or os.cpu_count() or 1
         line_positions = []
-        try:
-            with open(file, 'r', encoding=encoding) as read_f:
-                for num, line in enumerate(read_f, start=1):
-                    positions = search_func(line)
-                    if positions:
-                        line_positions.append((num, positions))
-            return line_positions
-        except FileNotFoundError as fnf:
-            fnf_msg = file + " does not exist. Valid file path needed."
-            logging.error(fnf_msg)
-            raise FileNotFoundError(fnf_msg).with_traceback(fnf.__traceback__)
-        except PermissionError as pe:
-            pe_msg = file + " does not lead to a file."
-            logging.error(pe_msg)
-            raise FileNotFoundError(pe_msg).with_traceback(pe.__traceback__)
-        except UnicodeDecodeError as ud:
-            ud_msg = (f"{encoding} codec not proper for '{file}'." +
-                      " Make sure it is a plain text file.")
-            logging.error(ud_msg)
-            raise UnicodeDecodeError(ud.encoding, ud.object, ud.start, ud.end,
-                                     ud_msg).with_traceback(ud.__traceback__)
-
-    def search_dir(self, dir, encoding="utf-8", naive=False):
+        with _file_errors(file, encoding), open(file, 'rb') as read_f:
+            size = os.fstat(read_f.fileno()).st_size
+            if size == 0:
+                return []  # empty files cannot be mapped
+            with mmap.mmap(read_f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if isinstance(self._pattern, bytes):  # one char per byte
+                    codec, data_start = "latin-1", 0
+                else:
+                    codec, data_start = _byte_codec(encoding, mm[:4])
+                matcher = self._byte_matcher(codec)
+                ranges = iter(_byte_ranges(data_start, size,
+                                           len(_encode("\n", codec)),
+                                           4 * workers))
+                task = partial(_search_byte_range, file, matcher, codec,
+                               data_start, algorithm)
+                with ProcessPoolExecutor(workers, initializer=_init_worker,
+                                         initargs=(task,)) as executor:
+                    # ranges are submitted lazily, so that the search can
+                    # stop early once max_matches is reached
+                    pending = deque(executor.submit(_run_worker_task, r)
+                                    for r in islice(ranges, 2 * workers))
+                    line = 1
+                    line_start = data_start
+                    remaining = max_matches
+                    while pending:
+                        findings, (newlines, last_start) = \
+                            pending.popleft().result()
+                        byte_range = next(ranges, None)
+                        if byte_range is not None:
+                            pending.append(executor.submit(
+                                _run_worker_task, byte_range))
+                        if remaining is not None:
+                            findings = findings[:remaining]
+                            remaining -= len(findings)
+                        for before, position, offset in findings:
+                            if position is None:  # line starts earlier
+                                position = _char_count(mm, line_start,
+                                                       offset, codec)
+                            _add_finding(line_positions, line + before,
+                                         position)
+                        if remaining == 0:
+                            for future in pending:
+                                future.cancel()
+                            break
+                        line += newlines
+                        if last_start is not None:
+                            line_start = last_start
+        return line_positions
+
+    def search_dir(self, dir, encoding="utf-8", naive=False,
+                   algorithm=None, stream=False, memory_map=False,
+                   workers=None, max_matches=None, files=None):
         """Searches every txt-file in a directory for occurrences of a
         string. txt-files in subdirectories are excluded.
 
@@ -152,8 +902,26 @@ class StringMatcher:
                 txt-file is searched for a particular string.
             encoding (str): Encoding of the txt-files in the directory.
                 Defaults to utf-8.
-            naive (bool): Naive search algorithm is used if True, else
-                BM algorithm. Defaults to False.
+            naive (bool): Deprecated, use algorithm='naive' instead.
+                Defaults to False.
+            algorithm (str): Search algorithm, one of the keys of
+                ALGORITHMS. Defaults to None, i.e. the
+                algorithm the matcher was constructed with.
+            stream (bool): If True, the files are searched in chunks
+                instead of line by line (see search_file).
+                Defaults to False.
+            memory_map (bool): If True, the files are memory-mapped and
+                searched on byte level (see search_file_mmap).
+                Defaults to False.
+            workers (int): Number of processes searching files in
+                parallel. Defaults to None, i.e. the files are searched
+                one after another in this process.
+            max_matches (int): Maximum number of occurrences per file,
+                after which the file is not read any further.
+                Defaults to None, i.e. all.
+            files (list): Names of the txt-files in the directory which
+                are searched, e.g. the candidates of a StringIndex.
+                Defaults to None, i.e. all.
 
         Returns:
             dict: Each key is a filename and each value a list of
@@ -163,50 +931,284 @@ class StringMatcher:
                 {'essay.txt': [(2, [23, 41, 75]), (56, [45])],
                  'next_article.txt': ...}
         """
-        doc_line_positions = dict()
-        try:
-            file_list = os.listdir(dir)
-        except FileNotFoundError as fnf:
-            fnf_msg = dir + " does not exist. Valid directory path needed."
-            logging.error(fnf_msg)
-            raise FileNotFoundError(fnf_msg).with_traceback(fnf.__traceback__)
-        except NotADirectoryError as nad:
-            nad_msg = dir + " does not lead to a directory."
-            logging.error(nad_msg)
-            raise NotADirectoryError(nad_msg).with_traceback(nad.__traceback__)
-        for file in tqdm(file_list, desc="search directory...", leave=False):
-            if file.endswith(".txt"):
-                filepath = os.path.join(dir, file)
-                location = self.search_file(filepath, encoding=encoding,
-                                            naive=naive)
-                if location:
-                    doc_line_positions[file] = location
-        return doc_line_positions
+        algorithm = _naive_algorithm(naive, algorithm)
+        if algorithm is not None:
+            self._search_function(algorithm)  # fail before reading files
+        if memory_map:
+            search_file = partial(self.search_file_mmap, encoding=encoding,
+                                  algorithm=algorithm, resolve_lines=True,
+                                  max_matches=max_matches)
+        else:
+            search_file = partial(self.search_file, encoding=encoding,
+                                  algorithm=algorithm, stream=stream,
+                                  max_matches=max_matches)
+        return _search_files(search_file, dir, workers, files)
+
+    def iter_dir(self, dir, encoding="utf-8", algorithm=None, stream=False,
+                 max_matches=None, files=None):
+        """Lazy counterpart of search_dir, which yields the findings
+        as soon as they are found, one file after another.
+
+        Args:
+            dir (str): Path to the directory of which every containing
+                txt-file is searched for a particular string.
+            encoding (str): Encoding of the txt-files in the directory.
+                Defaults to utf-8.
+            algorithm (str): Search algorithm, one of the keys of
+                ALGORITHMS. Defaults to None, i.e. the
+                algorithm the matcher was constructed with.
+            stream (bool): If True, the files are searched in chunks
+                (see search_file). Defaults to False.
+            max_matches (int): Maximum number of occurrences per file,
+                after which the file is not read any further.
+                Defaults to None, i.e. all.
+            files (list): Names of the txt-files in the directory which
+                are searched (see search_dir). Defaults to None, i.e.
+                all.
+
+        Yields:
+            tuple: Contains the filename, the line number and the
+                position (int) of an occurrence in that line, e.g.
+                ('essay.txt', 2, 23).
+        """
+        if algorithm is not None:
+            self._search_function(algorithm)  # fail before reading files
+        return _iter_files(partial(self.iter_file, encoding=encoding,
+                                   algorithm=algorithm, stream=stream,
+                                   max_matches=max_matches), dir, files)
 
 # private methods #
+    def _init_engine(self, algorithm):
+        """Sets the engine of search_text.
+
+        Args:
+            algorithm (str): Search algorithm (see StringMatcher).
+        """
+        self._auto = algorithm == "auto"
+        if self._auto:
+            self._engine = self._select_algorithm(
+                len(self._pattern), len(set(self._pattern)),
+                builtin=self._case or self._casefold)
+        else:
+            self._search_function(algorithm)  # validates the name
+            self._engine = algorithm
+
+    def _check_memory_map(self):
+        """Raises a ValueError if the matcher cannot search memory-mapped
+        files, i.e. in case-insensitive search or with normalization,
+        which need the decoded text.
+        """
+        if not self._case or self._normalize:
+            case_msg = ("Memory-mapped search is case-sensitive and" +
+                        " without normalization only.")
+            logging.error(case_msg)
+            raise ValueError(case_msg)
+
+    def _search_function(self, algorithm, lazy=False):
+        """Retrieves the search method implementing an algorithm.
+
+        Args:
+            algorithm (str): Name of the search algorithm, one of the
+                keys of ALGORITHMS.
+            lazy (bool): If True, the lazy counterpart is retrieved.
+                Defaults to False.
+
+        Returns:
+            method: Takes a text (str) and returns a list of indices,
+                or an iterator over the indices if lazy.
+        """
+        try:
+            return getattr(self, ("iter_" if lazy else "") +
+                           ALGORITHMS[algorithm])
+        except KeyError:
+            alg_msg = (f"Unknown search algorithm '{algorithm}'. Choose" +
+                       f" one of: {', '.join(ALGORITHMS)}.")
+            logging.error(alg_msg)
+            raise ValueError(alg_msg) from None
+
+    def _canonical_search(self, search_func):
+        """Extends a lazy search function by normalization and case
+        folding of the text, if the matcher was constructed with them.
+
+        Args:
+            search_func (method): Takes a text (str) and returns an
+                iterator over the indices.
+
+        Returns:
+            function: Takes a text (str) and returns an iterator over
+                the indices in the original text.
+        """
+        if not (self._normalize or self._casefold):
+            return search_func
+        return partial(_iter_canonical, search_func, form=self._normalize,
+                       casefold=self._casefold,
+                       overlap=len(self._pattern) - 1)
+
+    def _byte_matcher(self, codec):
+        """Retrieves the matcher for the pattern encoded with a codec,
+        which is constructed on first use.
+
+        Args:
+            codec (str): Encoding without byte order mark.
+
+        Returns:
+            StringMatcher: Matcher of the encoded pattern (bytes), or
+                the matcher itself if the pattern consists of bytes.
+        """
+        if isinstance(self._pattern, bytes):
+            return self
+        if codec not in self._byte_matchers:
+            self._byte_matchers[codec] = StringMatcher(
+                _encode(self._pattern, codec),
+                algorithm="auto" if self._auto else self._engine)
+        return self._byte_matchers[codec]
+
+    def _confirm_engine(self, text):
+        """Confirms the provisional engine of the 'auto' algorithm on
+        the basis of the first searched text and logs the choice.
+
+        Args:
+            text (str): First text that is searched for the pattern.
+        """
+        m = len(self._pattern)
+        sample = text[:1024] if self._case else _fold_case(text[:1024])
+        alphabet_size = len(set(sample) | set(self._pattern))
+        # the built-in search of a case-insensitive matcher would fold
+        # a copy of every text
+        builtin = ((self._case or self._casefold) and
+                   (hasattr(text, "find") or isinstance(text, memoryview)))
+        self._engine = self._select_algorithm(m, alphabet_size, len(text),
+                                              builtin)
+        self._auto = False
+        logging.info(f"auto: '{self._engine}' chosen for a pattern of" +
+                     f" length {m}, alphabet size {alphabet_size} and" +
+                     f" text length {len(text)}.")
+
     @staticmethod
-    def _rightmost_index_table(pattern):
+    def _select_algorithm(m, alphabet_size, n=None, builtin=True):
+        """Selects the presumably fastest search algorithm, according
+        to the algorithms benchmark (see benchmark.py). The built-in
+        search wins for every pattern, but requires a string-like text
+        and a case-sensitive (or case-folded) search, since it would
+        fold a copy of the text in case-insensitive search. Among the
+        other algorithms, the naive algorithm compares whole alignments
+        at once and wins for short patterns over small alphabets, where
+        the shifts of the other algorithms stay small.
+
+        Args:
+            m (int): Pattern length.
+            alphabet_size (int): Number of distinct characters.
+            n (int): Text length if known. Defaults to None.
+            builtin (bool): True if the text can be searched by the
+                built-in search without folding it, e.g. str or bytes
+                in case-sensitive search. Defaults to True.
+
+        Returns:
+            str: Key of ALGORITHMS.
+        """
+        if builtin:
+            return "builtin"
+        if m == 1 or (n is not None and n <= m):
+            return "naive"
+        if alphabet_size <= 2:  # e.g. binary strings
+            return "bm" if m >= 16 else "naive"
+        if alphabet_size <= 4:  # e.g. DNA
+            return "sunday" if m >= 8 else "naive"
+        return "sunday"
+
+    @staticmethod
+    def _rightmost_index_table(accepted, flat=False):
         """Retrieves rightmost index of each character which occurs in
         the pattern, e.g. for 'bob' the rightmost index of 'b' is 2 and
-        of 'o' is 1.
+        of 'o' is 1. Case variants get the index of the pattern's
+        character they match.
 
         Args:
-            pattern (str): String of which the characters's rightmost
-                indices are retrieved.
+            accepted (list): Characters matching each index of the
+                pattern (see attribute accepted).
+            flat (bool): If True, the pattern consists of bytes and
+                the table is a flat array of all 256 byte values.
+                Defaults to False.
 
         Return:
             dict: Contains characters (str) as keys and indices (int)
-                as values.
+                as values, or an array if flat.
         """
-        char_index_table = dict()
-        for j in range(len(pattern)):
-            char_index_table[pattern[j]] = j
+        char_index_table = array('i', [-1]) * 256 if flat else dict()
+        for j in range(len(accepted)):
+            for char in accepted[j]:
+                char_index_table[char] = j
         return char_index_table
 
-    def _good_suffix_shifts(self, pattern):
+    @staticmethod
+    def _critical_factorization(pattern):
+        """Computes the critical factorization of the pattern from the
+        maximal suffixes for both orderings of the alphabet (cf.
+        Charras & Lecroq (2004)).
+
+        Args:
+            pattern (str): String that is factorized.
+
+        Returns:
+            tuple: Contains the critical position (int), the period
+                (int) and whether the pattern is periodic (bool), see
+                the attributes of the class.
+        """
+        m = len(pattern)
+        ell, period = StringMatcher._maximal_suffix(pattern, reverse=False)
+        ell_reverse, period_reverse = StringMatcher._maximal_suffix(
+            pattern, reverse=True)
+        if ell_reverse > ell:
+            ell, period = ell_reverse, period_reverse
+        if pattern[:ell+1] == pattern[period:period+ell+1]:
+            return ell, period, True
+        return ell, max(ell + 1, m - ell - 1) + 1, False
+
+    @staticmethod
+    def _maximal_suffix(pattern, reverse=False):
+        """Computes the start of the lexicographically maximal suffix
+        of the pattern and its period.
+
+        Args:
+            pattern (str): String of which the maximal suffix is
+                computed.
+            reverse (bool): If True, the alphabet is ordered
+                reversely. Defaults to False.
+
+        Returns:
+            tuple: Contains the index (int) in front of the maximal
+                suffix and the suffix's period (int).
+        """
+        m = len(pattern)
+        ms = -1  # index in front of the current maximal suffix
+        j = 0
+        k = period = 1
+        while j + k < m:
+            a = pattern[j + k]
+            b = pattern[ms + k]
+            if (a > b) if reverse else (a < b):  # suffix is smaller
+                j += k
+                k = 1
+                period = j - ms
+            elif a == b:
+                if k != period:
+                    k += 1
+                else:
+                    j += period
+                    k = 1
+            else:  # suffix starting at j is larger
+                ms = j
+                j = ms + 1
+                k = period = 1
+        return ms, period
+
+    @staticmethod
+    def _good_suffix_shifts(pattern):
         """Maps mismatch index to number of shifts that can be made
         without missing possible alignments of the already matching
-        suffix (= good suffix).
+        suffix (= good suffix). Built in linear time from the suffix
+        lengths of the pattern (strong good suffix rule, cf.
+        Charras & Lecroq (2004)).
 
         Args:
             pattern (str): String of which the possible shifts are
@@ -215,58 +1217,1153 @@ class StringMatcher:
         Returns:
             list: Contains integer > 0.
         """
-        shifts = []
         m = len(pattern)
-        for j in range(m - 1):
-            good_suffix = pattern[j+1:]  # at least one character
-            rightmost_occ = self._rightmost_substr_start(good_suffix,
-                                                         pattern[:-1])
-            if rightmost_occ == -1:  # not found
-                shifts.append(self._start_of_longest_sfx_as_pfx(good_suffix,
-                                                                pattern))
-            else:
-                shifts.append(j + 1 - rightmost_occ)
-        shifts.append(1)  # if mismatch at last index (no good suffix)
+        suffix_lengths = StringMatcher._suffix_lengths(pattern)
+        shifts = [m] * m
+        # good suffix does not reoccur, but a suffix of it is a prefix
+        j = 0
+        for i in range(m - 1, -1, -1):
+            if suffix_lengths[i] == i + 1:  # pattern[:i+1] is a border
+                while j < m - 1 - i:
+                    if shifts[j] == m:
+                        shifts[j] = m - 1 - i
+                    j += 1
+        # good suffix reoccurs in the pattern (rightmost occurrence)
+        for i in range(m - 1):
+            shifts[m - 1 - suffix_lengths[i]] = m - 1 - i
         return shifts
 
     @staticmethod
-    def _rightmost_substr_start(subpattern, pattern):
-        """Finds starting index of rightmost occurrence of substring
-        in pattern if existing.
+    def _suffix_lengths(pattern):
+        """Determines for each index i the length of the longest
+        substring ending at i which is also a suffix of the pattern,
+        e.g. for 'abab' the lengths are [0, 2, 0, 4].
 
         Args:
-            subpattern (str): Substring that is searched for.
-            pattern (str): String that is searched.
+            pattern (str): String of which the suffix lengths are
+                determined.
 
         Returns:
-            int: Starting index of rightmost occurrence if existing,
-                else -1.
+            list: Contains integer >= 0.
         """
-        m = len(subpattern)
-        for i in range(len(pattern) - m, -1, -1):  # naive string search
-            if subpattern == pattern[i:i+m]:
-                return i
-        return -1
+        m = len(pattern)
+        lengths = [0] * m
+        lengths[m - 1] = m
+        g = m - 1  # leftmost index reached by a comparison so far
+        f = m - 1  # index at which that comparison was started
+        for i in range(m - 2, -1, -1):
+            if i > g and lengths[i + m - 1 - f] < i - g:
+                lengths[i] = lengths[i + m - 1 - f]
+            else:
+                g = min(g, i)
+                f = i
+                while g >= 0 and pattern[g] == pattern[g + m - 1 - f]:
+                    g -= 1
+                lengths[i] = f - g
+        return lengths
+
+
+def _naive_algorithm(naive, algorithm):
+    """Maps the deprecated naive flag of search_file and search_dir to
+    the search algorithm.
+
+    Args:
+        naive (bool): Naive search algorithm if True.
+        algorithm (str): Search algorithm or None.
+
+    Returns:
+        str: Search algorithm or None.
+    """
+    if not naive:
+        return algorithm
+    warnings.warn("naive=True is deprecated, use algorithm='naive'" +
+                  " instead.", DeprecationWarning, stacklevel=3)
+    if algorithm not in (None, "naive"):
+        naive_msg = (f"naive=True contradicts algorithm='{algorithm}'." +
+                     " Please use only algorithm.")
+        logging.error(naive_msg)
+        raise ValueError(naive_msg)
+    return "naive"
 
-    @staticmethod
-    def _start_of_longest_sfx_as_pfx(suffix, pattern):
-        """Determines starting index of longest suffix (of suffix) which
-        is also a prefix of the pattern.
+
+@lru_cache(CACHE_SIZE, typed=True)
+def _preprocessed(pattern, case, normalize, casefold):
+    """Constructs the matcher whose tables StringMatcher.compile
+    shares with the matchers of the same pattern.
+    """
+    return StringMatcher(pattern, case=case, normalize=normalize,
+                         casefold=casefold)
+
+
+class MultiStringMatcher:
+    """Searches for several strings at once by means of the
+    Aho-Corasick algorithm, i.e. every text is read only once,
+    no matter how many strings are searched for.
+
+    Args:
+        patterns (list): Strings (str or bytes) that are searched for.
+            The index of a string in this list is its pattern id.
+        case (bool): Case-sensitive string search if True,
+            else case-insensitive (ASCII letters only for bytes).
+        normalize (str): Unicode normalization form, one of
+            NORMALIZATION_FORMS (see StringMatcher), for str patterns
+            only. Defaults to None.
+        casefold (bool): Full Unicode case folding (see
+            StringMatcher). Defaults to False.
+
+    Attributes:
+        patterns (list): Strings (str) that are searched for.
+        transitions (list): Mapping of each state (int) of the
+            automaton to a dict of characters (str) as keys and
+            following states (int) as values.
+        failure (list): Mapping of each state to the state of its
+            longest proper suffix which is also a state.
+        output (list): Mapping of each state to a tuple of pattern
+            ids (int) of all patterns which end in that state.
+        case (bool): Case-sensitive string search if True,
+            else case-insensitive.
+        normalize (str): Unicode normalization form or None.
+        casefold (bool): Full Unicode case folding if True.
+    """
+    def __init__(self, patterns, case=True, normalize=None, casefold=False):
+        if len(patterns) == 0 or any(len(p) == 0 for p in patterns):
+            raise EmptyStringException("Invalid search strings. Empty" +
+                                       " strings are everywhere." +
+                                       " Please try something with" +
+                                       " characters.")
+        _check_normalization(normalize)
+        for pattern in patterns:
+            _check_str_options(pattern, normalize, casefold)
+        self._patterns = list(patterns)
+        if normalize or casefold:
+            patterns = [_canonical(pattern, normalize, casefold)[0]
+                        for pattern in patterns]
+        case = case and not casefold
+        if not case and not casefold:
+            patterns = [_fold_case(pattern) for pattern in patterns]
+        self._lengths = [len(pattern) for pattern in patterns]
+        self._case = case
+        self._normalize = normalize
+        self._casefold = casefold
+        self._build_automaton(patterns)
+
+    @property
+    def patterns(self):
+        """list: Strings (str) that are searched for."""
+        return self._patterns
+
+    def search_text(self, text, max_matches=None):
+        """Aho-Corasick string matching algorithm. The text is read
+        once from left to right, while the automaton keeps track of
+        all patterns that may end at the current character.
 
         Args:
-            suffix (str): Suffix of pattern of which the longest suffix
-                is ascertained.
-            pattern (str): String of which the starting index is
-                determined.
+            text (str): Text that is searched for the patterns.
+            max_matches (int): Maximum number of occurrences, after
+                which the search stops. Defaults to None, i.e. all.
+
+        Returns:
+            list: Contains 2-tuples consisting of a pattern id and the
+                index of the pattern's occurrence, sorted by index,
+                e.g. [(0, 3), (1, 3), (0, 8)].
+        """
+        return list(_first(self.iter_text(text), max_matches))
+
+    def count(self, text, max_matches=None):
+        """Counts the occurrences of all patterns in a text without
+        collecting their indices.
+
+        Args:
+            text (str): Text that is searched for the patterns.
+            max_matches (int): Maximum number of occurrences, after
+                which the counting stops. Defaults to None, i.e. all.
+
+        Returns:
+            int: Number of occurrences.
+        """
+        return sum(1 for _ in _first(self.iter_text(text), max_matches))
+
+    def contains(self, text):
+        """Checks whether any of the patterns occurs in a text. The
+        search stops at the first occurrence.
+
+        Args:
+            text (str): Text that is searched for the patterns.
 
         Returns:
-            int: Starting index in the pattern of longest suffix.
+            bool: True if a pattern occurs in the text, else False.
         """
+        return next(self.iter_text(text), None) is not None
+
+    def iter_text(self, text):
+        """Lazy counterpart of search_text. Occurrences are held back
+        only until no occurrence with a smaller index can follow, i.e.
+        for at most the length of the longest pattern.
+
+        Args:
+            text (str): Text that is searched for the patterns.
+
+        Yields:
+            tuple: Contains a pattern id and the index of the
+                pattern's occurrence, e.g. (0, 3).
+        """
+        if self._normalize or self._casefold:
+            return _iter_canonical(self._iter_automaton, text,
+                                   form=self._normalize,
+                                   casefold=self._casefold,
+                                   overlap=max(self._lengths) - 1)
+        return self._iter_automaton(text)
+
+    def search_file(self, file, encoding="utf-8", stream=False,
+                    max_matches=None):
+        """Searches text file for occurrences of the strings.
+
+        Args:
+            file (str): Path to the text file which is to be searched
+                for the strings.
+            encoding (str): File encoding. Defaults to utf-8.
+            stream (bool): If True, the file is searched in chunks
+                instead of line by line (see StringMatcher.search_file).
+                Defaults to False.
+            max_matches (int): Maximum number of occurrences, after
+                which the file is not read any further. Defaults to
+                None, i.e. all.
+
+        Returns:
+            list: Contains 2-tuples consisting of a line number and a
+                list of hits in that line, each a 2-tuple of a pattern
+                id and a position, e.g. for findings in line 2 and 56:
+                [(2, [(0, 23), (1, 41)]), (56, [(1, 45)])].
+        """
+        return _group_lines(self.iter_file(file, encoding=encoding,
+                                           stream=stream,
+                                           max_matches=max_matches))
+
+    def iter_file(self, file, encoding="utf-8", stream=False,
+                  max_matches=None):
+        """Lazy counterpart of search_file.
+
+        Args:
+            file (str): Path to the text file which is to be searched
+                for the strings.
+            encoding (str): File encoding. Defaults to utf-8.
+            stream (bool): If True, the file is searched in chunks
+                (see search_file). Defaults to False.
+            max_matches (int): Maximum number of occurrences, after
+                which the file is not read any further. Defaults to
+                None, i.e. all.
+
+        Yields:
+            tuple: Contains the line number and a 2-tuple of pattern id
+                and position in that line, e.g. (2, (0, 23)).
+        """
+        if stream:
+            line_findings = _iter_chunks(self.iter_text, file, encoding,
+                                         overlap=max(self._lengths) - 1,
+                                         form=self._normalize,
+                                         casefold=self._casefold)
+        else:
+            line_findings = _iter_lines(self.iter_text, file, encoding)
+        return _first(line_findings, max_matches)
+
+    def search_dir(self, dir, encoding="utf-8", stream=False, workers=None,
+                   max_matches=None, files=None):
+        """Searches every txt-file in a directory for occurrences of
+        the strings. txt-files in subdirectories are excluded.
+
+        Args:
+            dir (str): Path to the directory of which every containing
+                txt-file is searched for the strings.
+            encoding (str): Encoding of the txt-files in the directory.
+                Defaults to utf-8.
+            stream (bool): If True, the files are searched in chunks
+                instead of line by line (see search_file).
+                Defaults to False.
+            workers (int): Number of processes searching files in
+                parallel. Defaults to None, i.e. the files are searched
+                one after another in this process.
+            max_matches (int): Maximum number of occurrences per file,
+                after which the file is not read any further.
+                Defaults to None, i.e. all.
+            files (list): Names of the txt-files in the directory which
+                are searched, e.g. the candidates of a StringIndex.
+                Defaults to None, i.e. all.
+
+        Returns:
+            dict: Each key is a filename and each value a list of
+                2-tuples as returned by search_file, e.g.
+                {'essay.txt': [(2, [(0, 23), (1, 41)]), (56, [(1, 45)])],
+                 'next_article.txt': ...}
+        """
+        search_file = partial(self.search_file, encoding=encoding,
+                              stream=stream, max_matches=max_matches)
+        return _search_files(search_file, dir, workers, files)
+
+    def iter_dir(self, dir, encoding="utf-8", stream=False,
+                 max_matches=None, files=None):
+        """Lazy counterpart of search_dir.
+
+        Args:
+            dir (str): Path to the directory of which every containing
+                txt-file is searched for the strings.
+            encoding (str): Encoding of the txt-files in the directory.
+                Defaults to utf-8.
+            stream (bool): If True, the files are searched in chunks
+                (see search_file). Defaults to False.
+            max_matches (int): Maximum number of occurrences per file,
+                after which the file is not read any further.
+                Defaults to None, i.e. all.
+            files (list): Names of the txt-files in the directory which
+                are searched (see search_dir). Defaults to None, i.e.
+                all.
+
+        Yields:
+            tuple: Contains the filename, the line number and a 2-tuple
+                of pattern id and position in that line, e.g.
+                ('essay.txt', 2, (0, 23)).
+        """
+        return _iter_files(partial(self.iter_file, encoding=encoding,
+                                   stream=stream, max_matches=max_matches),
+                           dir, files)
+
+# private methods #
+    def _iter_automaton(self, text):
+        """Runs the automaton over a text (see iter_text).
+
+        Args:
+            text (str): Text that is searched for the patterns.
+
+        Yields:
+            tuple: Contains a pattern id and the index of the
+                pattern's occurrence, e.g. (0, 3).
+        """
+        transitions = self._transitions
+        failure = self._failure
+        output = self._output
+        lengths = self._lengths
+        longest = max(lengths)
+        pending = []  # heap of (index, pattern id)
+        state = 0
+        for i, char in enumerate(text):
+            while state and char not in transitions[state]:
+                state = failure[state]
+            state = transitions[state].get(char, 0)
+            for pattern_id in output[state]:
+                heapq.heappush(pending,
+                               (i - lengths[pattern_id] + 1, pattern_id))
+            # later occurrences start after index i - longest + 1
+            while pending and pending[0][0] <= i - longest + 1:
+                index, pattern_id = heapq.heappop(pending)
+                yield pattern_id, index
+        while pending:
+            index, pattern_id = heapq.heappop(pending)
+            yield pattern_id, index
+
+    def _build_automaton(self, patterns):
+        """Builds the Aho-Corasick automaton, i.e. a trie of the
+        patterns with failure links computed in breadth-first order.
+
+        Args:
+            patterns (list): Strings (str) that are searched for, case
+                folded in case-insensitive search.
+        """
+        transitions = [dict()]
+        own_output = [[]]
+        for pattern_id, pattern in enumerate(patterns):
+            state = 0
+            for char in pattern:
+                if char not in transitions[state]:
+                    transitions.append(dict())
+                    own_output.append([])
+                    transitions[state][char] = len(transitions) - 1
+                state = transitions[state][char]
+            own_output[state].append(pattern_id)
+
+        failure = [0] * len(transitions)
+        output = [tuple(ids) for ids in own_output]
+        queue = deque(transitions[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in transitions[state].items():
+                fallback = failure[state]
+                while fallback and char not in transitions[fallback]:
+                    fallback = failure[fallback]
+                if state:  # children of the root fall back to the root
+                    failure[next_state] = transitions[fallback].get(char, 0)
+                output[next_state] += output[failure[next_state]]
+                queue.append(next_state)
+        if not (self._case or self._casefold):  # variants, same states
+            for table in transitions:
+                for char, next_state in list(table.items()):
+                    if isinstance(char, int):  # byte of a bytes pattern
+                        char = bytes([char])  # its variants yield ints
+                    for variant in _case_variants(char):
+                        table[variant] = next_state
+
+        self._transitions = transitions
+        self._failure = failure
+        self._output = output
+
+
+def _fold_case(string):
+    """Maps every character of a string to its lowercase form, as long
+    as it is a single character, so that indices are kept.
+
+    Args:
+        string (str or bytes-like): String that is case folded.
+
+    Returns:
+        str or bytes: Case-folded string of the same length.
+    """
+    if not isinstance(string, str):  # bytes-like
+        return bytes(string).lower()  # ASCII only
+    if string.isascii():
+        return string.lower()
+    return ''.join([char if len(char.lower()) != 1 else char.lower()
+                    for char in string])
+
+
+# characters whose lowercase form is another single character, but
+# which are neither its uppercase nor its titlecase form (e.g. the
+# Kelvin sign), by that lowercase form
+_EXTRA_CASE_VARIANTS = {"k": "\u212a", "\xdf": "\u1e9e", "\xe5": "\u212b",
+                        "\u03b8": "\u03f4", "\u03c9": "\u2126"}
+
+
+@lru_cache(maxsize=None)
+def _case_variants(char):
+    """Retrieves all characters that are case folded to a character,
+    e.g. 'kK\u212a' for 'k' (including the Kelvin sign). Only the
+    uppercase and titlecase forms of the character and the few
+    characters of _EXTRA_CASE_VARIANTS can be folded to it, so the
+    variants are found without scanning all of Unicode.
+
+    Args:
+        char (str or bytes): Case-folded character.
+
+    Returns:
+        str or bytes: The character followed by its case variants.
+    """
+    if isinstance(char, bytes):
+        return char if char.upper() == char else char + char.upper()
+    candidates = set(char.upper() + char.title() +
+                     _EXTRA_CASE_VARIANTS.get(char, ''))
+    return char + ''.join(sorted(variant for variant in candidates
+                                 if variant != char and
+                                 variant.lower() == char))
+
+
+def _check_normalization(normalize):
+    """Raises a ValueError for unknown Unicode normalization forms."""
+    if normalize is not None and normalize not in NORMALIZATION_FORMS:
+        form_msg = (f"Unknown normalization form '{normalize}'. Choose" +
+                    f" one of: {', '.join(NORMALIZATION_FORMS)}.")
+        logging.error(form_msg)
+        raise ValueError(form_msg)
+
+
+def _check_str_options(pattern, normalize, casefold):
+    """Raises a ValueError if a bytes pattern is to be normalized or
+    case folded, which is defined for str only.
+    """
+    if isinstance(pattern, bytes) and (normalize or casefold):
+        bytes_msg = ("Normalization and full case folding require a str" +
+                     " search string. Please decode the bytes first.")
+        logging.error(bytes_msg)
+        raise ValueError(bytes_msg)
+
+
+def _canonical(text, form=None, casefold=False):
+    """Normalizes and/or case folds a text. Case folding is enclosed
+    by normalization, since folded characters may be unnormalized.
+
+    Args:
+        text (str): Text that is canonicalized.
+        form (str): Unicode normalization form or None.
+        casefold (bool): Full Unicode case folding if True.
+
+    Returns:
+        tuple: Contains the canonical text (str) and True if every
+            character was mapped to exactly one character, else False.
+    """
+    canonical = unicodedata.normalize(form, text) if form else text
+    one_to_one = canonical == text
+    if casefold:
+        folded = canonical.casefold()
+        one_to_one = one_to_one and len(folded) == len(canonical)
+        canonical = unicodedata.normalize(form, folded) if form else folded
+        one_to_one = one_to_one and canonical == folded
+    return canonical, one_to_one
+
+
+def _canonical_offsets(text, base, form=None, casefold=False):
+    """Canonicalizes a text and maps each character of the result to
+    the offset of the character it originates from. Characters are
+    canonicalized together with their combining marks, or with
+    neighbouring characters they interact with (e.g. Hangul jamo).
+
+    Args:
+        text (str): Text that is canonicalized.
+        base (int): Offset of the text.
+        form (str): Unicode normalization form or None.
+        casefold (bool): Full Unicode case folding if True.
+
+    Returns:
+        tuple: Contains the canonical text (str) and the offsets
+            (range or array of int) of its characters.
+    """
+    canonical, one_to_one = _canonical(text, form, casefold)
+    if one_to_one:  # fast path for most texts
+        return canonical, range(base, base + len(text))
+    pieces = []
+    offsets = array('q')
+    for segment in _SEGMENT_PATTERN.finditer(text):
+        start = base + segment.start()
+        piece, one_to_one = _canonical(segment.group(), form, casefold)
+        pieces.append(piece)
+        if one_to_one:
+            offsets.extend(range(start, start + len(piece)))
+            continue
+        # clusters of a character and its combining marks, merged with
+        # the preceding cluster as long as they interact
+        clusters = []  # 3-tuples of start, text and canonical text
+        segment_text = segment.group()
+        cluster_start = 0
+        for i in range(1, len(segment_text) + 1):
+            if (i < len(segment_text) and
+                    unicodedata.combining(segment_text[i]) != 0):
+                continue
+            cluster = segment_text[cluster_start:i]
+            canonical = _canonical(cluster, form, casefold)[0]
+            if clusters:
+                merged = clusters[-1][1] + cluster
+                merged_canonical = _canonical(merged, form, casefold)[0]
+                if merged_canonical != clusters[-1][2] + canonical:
+                    clusters[-1] = (clusters[-1][0], merged,
+                                    merged_canonical)
+                    cluster_start = i
+                    continue
+            clusters.append((cluster_start, cluster, canonical))
+            cluster_start = i
+        if ''.join([canonical for _, _, canonical in clusters]) == piece:
+            for cluster_start, _, canonical in clusters:
+                offsets.extend([start + cluster_start] * len(canonical))
+        else:
+            offsets.extend([start] * len(piece))
+    return ''.join(pieces), offsets
+
+
+def _iter_canonical(search_func, text, form=None, casefold=False,
+                    overlap=0):
+    """Searches the canonical form of a text block by block, like
+    _iter_chunks, and maps the findings back to the original text.
+    Findings which are mapped to the same offset (e.g. 's' in 'ß' for
+    the case-folded 'ss') are reported once.
+
+    Args:
+        search_func (function): Takes a canonical text (str) and
+            returns an iterator over the findings, i.e. indices or
+            2-tuples of pattern id and index, in ascending order of
+            the indices.
+        text (str): Text that is searched.
+        form (str): Unicode normalization form or None.
+        casefold (bool): Full Unicode case folding if True.
+        overlap (int): Number of characters shared by consecutive
+            blocks, i.e. the length of the longest canonical pattern
+            minus 1.
+
+    Yields:
+        int or tuple: Finding with its index in the original text.
+    """
+    def blocks():
+        """Yields the canonical blocks together with their offsets.
+        Blocks end in front of ASCII characters, which are not
+        affected by normalization of the preceding characters.
+        """
+        start = 0
+        while start < len(text):
+            end = len(text)
+            if start + CHUNK_SIZE < end:
+                ascii_char = _ASCII_PATTERN.search(text, start + CHUNK_SIZE)
+                if ascii_char:
+                    end = ascii_char.start()
+            yield _canonical_offsets(text[start:end], start, form,
+                                     casefold)
+            start = end
+
+    def mapped_findings():
+        """Yields the original offset and the mapped finding."""
+        tail = ""
+        tail_offsets = range(0)
+        for block, block_offsets in blocks():
+            buffer = tail + block
+            if (isinstance(tail_offsets, range) and
+                    isinstance(block_offsets, range) and
+                    tail_offsets.stop == block_offsets.start):
+                offsets = range(tail_offsets.start, block_offsets.stop)
+            else:
+                offsets = array('q', tail_offsets) + array('q',
+                                                           block_offsets)
+            keep = len(buffer) - overlap
+            if keep > 0:
+                # findings starting in the new tail are reported later
+                for finding in takewhile(
+                        lambda finding: _finding_index(finding) < keep,
+                        search_func(buffer)):
+                    yield offsets[_finding_index(finding)], finding
+                buffer = buffer[keep:]
+                offsets = offsets[keep:]
+            tail = buffer
+            tail_offsets = offsets
+        if tail:
+            for finding in search_func(tail):
+                yield tail_offsets[_finding_index(finding)], finding
+
+    for offset, group in groupby(mapped_findings(), key=lambda x: x[0]):
+        findings = [finding for _, finding in group]
+        if isinstance(findings[0], tuple):
+            for pattern_id in sorted(set(pattern_id for pattern_id, _
+                                         in findings)):
+                yield pattern_id, offset
+        else:
+            yield offset
+
+
+@contextmanager
+def _file_errors(file, encoding):
+    """Translates errors while reading a text file into errors with
+    helpful messages which are logged as well.
+
+    Args:
+        file (str): Path to the text file which is read.
+        encoding (str): File encoding.
+    """
+    try:
+        yield
+    except FileNotFoundError as fnf:
+        fnf_msg = file + " does not exist. Valid file path needed."
+        logging.error(fnf_msg)
+        raise FileNotFoundError(fnf_msg).with_traceback(fnf.__traceback__)
+    except (PermissionError, IsADirectoryError) as pe:
+        pe_msg = file + " does not lead to a file."
+        logging.error(pe_msg)
+        raise FileNotFoundError(pe_msg).with_traceback(pe.__traceback__)
+    except UnicodeDecodeError as ud:
+        ud_msg = (f"{encoding} codec not proper for '{file}'." +
+                  " Make sure it is a plain text file.")
+        logging.error(ud_msg)
+        raise UnicodeDecodeError(ud.encoding, ud.object, ud.start, ud.end,
+                                 ud_msg).with_traceback(ud.__traceback__)
+
+
+def _iter_lines(search_func, file, encoding):
+    """Searches a text file line by line.
+
+    Args:
+        search_func (function): Takes a line (str or bytes) and
+            returns an iterator over the findings.
+        file (str): Path to the text file.
+        encoding (str): File encoding, or None to read bytes.
+
+    Yields:
+        tuple: Contains a line number and a finding in that line.
+    """
+    with _file_errors(file, encoding), \
+            open(file, 'rb' if encoding is None else 'r',
+                 encoding=encoding) as read_f:
+        for num, line in enumerate(read_f, start=1):
+            for finding in search_func(line):
+                yield num, finding
+
+
+def _iter_chunks(search_func, file, encoding, overlap, form=None,
+                 casefold=False):
+    """Searches a text file chunk by chunk. Consecutive chunks overlap
+    by the given number of characters so that no finding is missed at
+    the chunk borders. Offsets are mapped back to line numbers and
+    positions in the line by counting the newline characters.
+
+    If the search function normalizes or case folds the text, chunks
+    end and overlap in front of ASCII characters only (see
+    _canonical_borders), so that no character is canonicalized apart
+    from its combining marks.
+
+    Args:
+        search_func (function): Takes a text (str) and returns an
+            iterator over the findings, i.e. indices or 2-tuples of
+            pattern id and index, in ascending order of the indices.
+        file (str): Path to the text file.
+        encoding (str): File encoding, or None to read bytes.
+        overlap (int): Number of characters shared by consecutive
+            chunks, i.e. the length of the longest pattern minus 1.
+        form (str): Unicode normalization form of the search function
+            or None.
+        casefold (bool): Full Unicode case folding of the search
+            function if True.
+
+    Yields:
+        tuple: Contains a line number and a finding starting in that
+            line.
+    """
+    def line_findings(findings, buffer, base, line, line_start):
+        """Maps findings in the buffer starting at offset base, where
+        the given line starts at offset line_start, to their lines.
+        """
+        cursor = 0
+        for finding in findings:
+            index = _finding_index(finding)
+            newlines = buffer.count(newline, cursor, index)
+            if newlines:
+                line += newlines
+                line_start = base + buffer.rfind(newline, cursor, index) + 1
+            cursor = index
+            position = base + index - line_start
+            if isinstance(finding, tuple):
+                yield line, (finding[0], position)
+            else:
+                yield line, position
+
+    base = 0  # offset of the buffer in the file
+    line = 1  # line number at offset base
+    line_start = 0  # offset of the start of that line
+    newline = "\n" if encoding is not None else b"\n"
+    tail = newline[:0]
+    with _file_errors(file, encoding), \
+            open(file, 'rb' if encoding is None else 'r',
+                 encoding=encoding) as read_f:
         while True:
-            suffix = suffix[1:]
-            # at the latest fulfilled in case of empty string
-            if pattern.startswith(suffix):
-                return len(pattern) - len(suffix)
+            chunk = read_f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            buffer = tail + chunk
+            end = len(buffer)  # end of the part searched now
+            keep = end - overlap
+            if form or casefold:
+                end, keep = _canonical_borders(buffer, overlap, form,
+                                               casefold)
+            if keep <= 0:  # too short for any finding yet
+                tail = buffer
+                continue
+            # findings starting in the new tail are reported later
+            findings = takewhile(
+                lambda finding: _finding_index(finding) < keep,
+                search_func(buffer if end == len(buffer)
+                            else buffer[:end]))
+            yield from line_findings(findings, buffer, base, line,
+                                     line_start)
+            newlines = buffer.count(newline, 0, keep)
+            if newlines:
+                line += newlines
+                line_start = base + buffer.rfind(newline, 0, keep) + 1
+            base += keep
+            tail = buffer[keep:]
+    if tail:
+        yield from line_findings(search_func(tail), tail, base, line,
+                                 line_start)
+
+
+def _canonical_borders(buffer, overlap, form=None, casefold=False):
+    """Determines the part of a stream buffer which is searched with
+    normalization or case folding, and the tail which is searched
+    again with the next chunk. Both end in front of ASCII characters,
+    which are not affected by normalization of the preceding
+    characters, and the tail holds at least overlap canonical
+    characters of the searched part.
+
+    Args:
+        buffer (str): Tail of the previous buffer and the next chunk.
+        overlap (int): Minimum number of canonical characters of the
+            searched part in the tail.
+        form (str): Unicode normalization form or None.
+        casefold (bool): Full Unicode case folding if True.
+
+    Returns:
+        tuple: Contains the end of the searched part and the start of
+            the tail (int), which are 0 if the buffer has no such
+            ASCII characters yet.
+    """
+    last_ascii = _LAST_ASCII_PATTERN.match(buffer)
+    if last_ascii is None:
+        return 0, 0
+    end = last_ascii.end() - 1
+    limit = end - overlap + 1  # tail starts in front of limit
+    while limit > 0:
+        last_ascii = _LAST_ASCII_PATTERN.match(buffer, 0, limit)
+        if last_ascii is None:
+            break
+        keep = last_ascii.end() - 1
+        if len(_canonical(buffer[keep:end], form, casefold)[0]) >= overlap:
+            return end, keep
+        limit = keep
+    return end, 0
+
+
+def _group_lines(line_findings):
+    """Groups findings by their line.
+
+    Args:
+        line_findings (iterable): 2-tuples of line number and finding
+            in ascending order of the line numbers.
+
+    Returns:
+        list: Contains 2-tuples consisting of a line number and the
+            non-empty list of findings in that line.
+    """
+    line_positions = []
+    for line, finding in line_findings:
+        _add_finding(line_positions, line, finding)
+    return line_positions
+
+
+def _encode(text, codec):
+    """Encodes a text without byte order mark."""
+    return text.encode(codec)[len("".encode(codec)):]
+
+
+def _byte_codec(encoding, head):
+    """Determines the codec for the content of a file independent of
+    its byte order mark, as well as the size of that mark.
+
+    Args:
+        encoding (str): File encoding.
+        head (bytes): First bytes of the file.
+
+    Returns:
+        tuple: Contains the codec (str) and the number of bytes (int)
+            of the byte order mark at the start of the file.
+    """
+    name = codecs.lookup(encoding).name
+    boms = {"utf-16": (codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE),
+            "utf-32": (codecs.BOM_UTF32_LE, codecs.BOM_UTF32_BE)}
+    if name in boms:
+        for bom, codec in zip(boms[name], ("-le", "-be")):
+            if head.startswith(bom):
+                return name + codec, len(bom)
+        # without mark, the platform's byte order is assumed like in open
+        return name + ("-le" if sys.byteorder == "little" else "-be"), 0
+    if name == "utf-8-sig" and head.startswith(codecs.BOM_UTF8):
+        return "utf-8", len(codecs.BOM_UTF8)
+    if name == "utf-8-sig":
+        return "utf-8", 0
+    return name, 0
+
+
+def _byte_lines(mm, offsets, codec, data_start=0):
+    """Maps byte offsets in a file to line numbers and positions in
+    the line, i.e. numbers of characters in front of the offset.
+
+    Args:
+        mm (mmap.mmap): Memory-mapped file.
+        offsets (list): Byte offsets (int) in ascending order.
+        codec (str): Encoding of the file without byte order mark.
+        data_start (int): Offset of the text after the byte order
+            mark. Defaults to 0.
+
+    Returns:
+        list: Contains 2-tuples consisting of a line number and a list
+            of positions (int) in that line.
+    """
+    line_positions = []
+    scan = _line_starts(mm, offsets, codec, data_start)
+    for offset, (newlines, line_start) in zip(offsets, scan):
+        if line_start is None:  # first line
+            line_start = data_start
+        _add_finding(line_positions, 1 + newlines,
+                     _char_count(mm, line_start, offset, codec))
+    return line_positions
+
+
+def _line_starts(mm, offsets, codec, data_start=0, cursor=None):
+    """Scans a memory-mapped file for newline characters in front of
+    byte offsets.
+
+    Args:
+        mm (mmap.mmap): Memory-mapped file.
+        offsets (list): Byte offsets (int) in ascending order.
+        codec (str): Encoding of the file without byte order mark.
+        data_start (int): Offset of the text after the byte order
+            mark. Defaults to 0.
+        cursor (int): Offset where the scan starts. Defaults to None,
+            i.e. data_start.
+
+    Yields:
+        tuple: For each offset, the number of newline characters
+            between the start of the scan and the offset, and the
+            offset of the start of the offset's line, which is None
+            if the line starts in front of the scan.
+    """
+    newline = _encode("\n", codec)
+    unit = len(newline)
+    cursor = data_start if cursor is None else cursor
+    newlines = 0
+    line_start = None
+    for offset in offsets:
+        if unit == 1:  # every newline byte is a newline character
+            newlines += _count_bytes(mm, newline, cursor, offset)
+            newline_at = mm.rfind(newline, cursor, offset)
+            if newline_at != -1:
+                line_start = newline_at + 1
+        else:  # skip newline bytes which are not aligned to code units
+            while True:
+                newline_at = mm.find(newline, cursor, offset)
+                if newline_at == -1:
+                    break
+                cursor = newline_at + 1
+                if (newline_at - data_start) % unit == 0:
+                    newlines += 1
+                    line_start = cursor = newline_at + unit
+        cursor = max(cursor, offset)
+        yield newlines, line_start
+
+
+def _char_count(mm, start, end, codec):
+    """Counts the characters between two byte offsets of a
+    memory-mapped file.
+    """
+    return len(mm[start:end].decode(codec, errors="replace"))
+
+
+def _count_bytes(mm, sub, start, end, block_size=1 << 20):
+    """Counts the occurrences of a single byte in a memory-mapped file
+    between two offsets, copying at most one block at a time.
+    """
+    return sum(mm[i:min(i + block_size, end)].count(sub)
+               for i in range(start, end, block_size))
+
+
+def _byte_ranges(start, end, unit, count, min_size=1 << 20):
+    """Splits the bytes between two offsets into ranges aligned to the
+    size of the code units.
+
+    Args:
+        start (int): Start offset.
+        end (int): End offset.
+        unit (int): Number of bytes per code unit.
+        count (int): Maximum number of ranges.
+        min_size (int): Minimum number of bytes per range.
+            Defaults to 1 MiB.
+
+    Returns:
+        list: Contains 2-tuples of start and end offset (int).
+    """
+    size = max(-(-(end - start) // count), min_size)
+    size += -size % unit
+    return [(i, min(i + size, end)) for i in range(start, end, size)]
+
+
+def _search_byte_range(file, matcher, codec, data_start, algorithm,
+                       byte_range):
+    """Searches a byte range of a memory-mapped file. The range is
+    extended by the length of the encoded pattern minus 1, but only
+    findings starting within the range are kept.
+
+    Args:
+        file (str): Path to the file.
+        matcher (StringMatcher): Matcher of the encoded pattern.
+        codec (str): Encoding of the file without byte order mark.
+        data_start (int): Offset of the text after the byte order mark.
+        algorithm (str): Search algorithm or None for the matcher's.
+        byte_range (tuple): Start and end offset (int) of the range.
+
+    Returns:
+        tuple: Contains a list of 3-tuples for the findings, i.e. the
+            number of newline characters in the range in front of the
+            finding, its position in the line (None if the line starts
+            in front of the range) and its byte offset, as well as
+            the number of newline characters in the range and the
+            start of the range's last line (None if in front of it).
+    """
+    start, end = byte_range
+    if algorithm is None:
+        search_func = matcher.search_text
+    else:
+        search_func = matcher._search_function(algorithm)
+    unit = len(_encode("\n", codec))
+    with open(file, 'rb') as read_f, \
+            mmap.mmap(read_f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        stop = min(end + len(matcher._pattern) - 1, len(mm))
+        with memoryview(mm) as view:
+            offsets = search_func(view[start:stop])
+        offsets = [start + offset for offset in offsets
+                   if offset < end - start and
+                   (start + offset - data_start) % unit == 0]
+        scan = list(_line_starts(mm, offsets + [end], codec, data_start,
+                                 cursor=start))
+        findings = []
+        for offset, (newlines, line_start) in zip(offsets, scan):
+            if line_start is not None:
+                position = _char_count(mm, line_start, offset, codec)
+            else:
+                position = None
+            findings.append((newlines, position, offset))
+    return findings, scan[-1]
+
+
+def _add_finding(line_positions, line, finding):
+    """Adds a finding to the list of findings per line, which is in
+    ascending order of the line numbers.
+    """
+    if line_positions and line_positions[-1][0] == line:
+        line_positions[-1][1].append(finding)
+    else:
+        line_positions.append((line, [finding]))
+
+
+def _first(iterable, max_matches=None):
+    """Limits an iterable to its first max_matches items, if given."""
+    if max_matches is None:
+        return iterable
+    return islice(iterable, max_matches)
+
+
+def _finding_index(finding):
+    """Returns the index of a finding, which is either the index itself
+    or a 2-tuple of pattern id and index.
+    """
+    return finding[1] if isinstance(finding, tuple) else finding
+
+
+def _search_files(search_file, dir, workers=None, files=None):
+    """Searches every txt-file in a directory, optionally in parallel
+    processes. The search function, including the matcher's tables,
+    is sent to each process only once.
+
+    Args:
+        search_file (function): Takes a file path (str) and returns a
+            list of findings per line.
+        dir (str): Path to the directory.
+        workers (int): Number of processes. Defaults to None, i.e. the
+            files are searched one after another in this process.
+        files (list): Names of the txt-files which are searched.
+            Defaults to None, i.e. all.
+
+    Returns:
+        dict: Each key is a filename and each value the non-empty
+            findings in that file.
+    """
+    if files is None:
+        files = _txt_files(dir)
+    filepaths = [os.path.join(dir, file) for file in files]
+    parallel = workers is not None and workers > 1
+    doc_line_positions = dict()
+    with (ProcessPoolExecutor(workers, initializer=_init_worker,
+                              initargs=(search_file,))
+          if parallel else nullcontext()) as executor:
+        if parallel:
+            chunksize = max(1, len(filepaths) // (4 * workers))
+            locations = executor.map(_run_worker_task, filepaths,
+                                     chunksize=chunksize)
+        else:
+            locations = map(search_file, filepaths)
+        for file, location in zip(files, tqdm(locations, total=len(files),
+                                              desc="search directory...",
+                                              leave=False)):
+            if location:
+                doc_line_positions[file] = location
+    return doc_line_positions
+
+
+_worker_task = None  # function executed by a worker process
+
+
+def _init_worker(task):
+    """Stores the function to be executed in a worker process."""
+    global _worker_task
+    _worker_task = task
+
+
+def _run_worker_task(argument):
+    """Executes the function of the worker process."""
+    return _worker_task(argument)
+
+
+def _iter_files(iter_file, dir, files=None):
+    """Searches every txt-file in a directory, one after another.
+
+    Args:
+        iter_file (function): Takes a file path (str) and returns an
+            iterator over 2-tuples of line number and finding.
+        dir (str): Path to the directory.
+        files (list): Names of the txt-files which are searched.
+            Defaults to None, i.e. all.
+
+    Yields:
+        tuple: Contains the filename, the line number and a finding.
+    """
+    if files is None:
+        files = _txt_files(dir)
+    for file in files:
+        for line, finding in iter_file(os.path.join(dir, file)):
+            yield file, line, finding
+
+
+def _txt_files(dir):
+    """Lists the txt-files of a directory (excluding subdirectories).
+
+    Args:
+        dir (str): Path to the directory.
+
+    Returns:
+        list: Contains the filenames (str) ending with .txt.
+    """
+    try:
+        file_list = os.listdir(dir)
+    except FileNotFoundError as fnf:
+        fnf_msg = dir + " does not exist. Valid directory path needed."
+        logging.error(fnf_msg)
+        raise FileNotFoundError(fnf_msg).with_traceback(fnf.__traceback__)
+    except NotADirectoryError as nad:
+        nad_msg = dir + " does not lead to a directory."
+        logging.error(nad_msg)
+        raise NotADirectoryError(nad_msg).with_traceback(nad.__traceback__)
+    return [file for file in file_list if file.endswith(".txt")]
+
+
+def _pack_chars(chars):
+    """Converts a string to bytes for dump (bytes are kept)."""
+    if isinstance(chars, bytes):
+        return chars
+    return chars.encode("utf-8", "surrogatepass")
+
+
+def _unpack_chars(data, flat):
+    """Converts bytes written by _pack_chars back to a string, unless
+    the pattern consists of bytes (flat).
+    """
+    return data if flat else data.decode("utf-8", "surrogatepass")
+
+
+def _write_blob(fp, data):
+    """Writes bytes preceded by their length."""
+    fp.write(struct.pack("<q", len(data)))
+    fp.write(data)
+
+
+def _read_blob(fp):
+    """Reads bytes written by _write_blob."""
+    size, = struct.unpack("<q", fp.read(8))
+    data = fp.read(size)
+    if len(data) != size:
+        raise ValueError("truncated file")
+    return data
+
+
+def _write_array(fp, values):
+    """Writes an array of int in little-endian byte order."""
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    _write_blob(fp, values.typecode.encode("ascii") + values.tobytes())
+
+
+def _read_array(fp):
+    """Reads an array written by _write_array."""
+    data = _read_blob(fp)
+    values = array(data[:1].decode("ascii"))
+    values.frombytes(data[1:])
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
 
 
 if __name__ == "__main__":
@@ -288,12 +2385,31 @@ if __name__ == "__main__":
     print(">>> print(sm1.boyer_moore(text))")
     print(sm1.boyer_moore(text))
     print('')
+    print("The Horspool and Sunday variants of Boyer-Moore are available," +
+          " too:")
+    print(">>> print(sm1.horspool(text))")
+    print(sm1.horspool(text))
+    print(">>> print(sm1.sunday(text))")
+    print(sm1.sunday(text))
+    print('')
     print("How about a case-insensitive search?")
     print(f">>> sm_insensitive = StringMatcher('{pattern1}', case=False)")
     print(">>> print(sm_insensitive.boyer_moore(text))")
     sm_insensitive = StringMatcher(pattern1, case=False)
     print(sm_insensitive.boyer_moore(text))
+    print('')
+    print("Not sure which algorithm fits best? Let the matcher decide:")
+    print(f">>> sm_auto = StringMatcher('{pattern1}', algorithm='auto')")
+    print(">>> print(sm_auto.search_text(text), sm_auto.engine)")
+    sm_auto = StringMatcher(pattern1, algorithm="auto")
+    print(sm_auto.search_text(text), sm_auto.engine)
 
+    print('')
+    print("Only interested in the first occurrence? The iter_* methods" +
+          " yield\nthe occurrences one by one, so the search can stop" +
+          " early:")
+    print(">>> print(next(sm1.iter_boyer_moore(text)))")
+    print(next(sm1.iter_boyer_moore(text)))
     print('')
     print("################## Find occurrences in one file ##################")
     print(f"Let us find the positions of '{pattern2}' in a text file,\n" +
@@ -302,14 +2418,14 @@ if __name__ == "__main__":
     print(f">>> sm2 = StringMatcher('{pattern2}')")
     print(">>> print(sm2.search_file(file_path, encoding='utf-8'))")
     sm2 = StringMatcher(pattern2)
-    print(sm2.search_file(file_path, encoding="utf-8", naive=False))
+    print(sm2.search_file(file_path, encoding="utf-8", algorithm="bm"))
     print("Hooray, this means we have occurrences in line 8 at index 11,\n" +
           "as well as in line 9 at index 12 and 24!")
     print('')
     print("How about using the naive algorithm instead?")
     print(">>> print(sm2.search_file(file_path, encoding='utf-8'," +
-          " naive=True))")
-    print(sm2.search_file(file_path, encoding="utf-8", naive=True))
+          " algorithm='naive'))")
+    print(sm2.search_file(file_path, encoding="utf-8", algorithm="naive"))
 
     print('')
     print("######## Find occurrences in all txt-files of a directory ########")
@@ -319,14 +2435,25 @@ if __name__ == "__main__":
     print(f">>> dir_path = '{dir_path}'")
     print(f">>> sm2 = StringMatcher('{pattern2}')")
     print(">>> print(sm2.search_dir(dir_path, encoding='utf-8'))")
-    print(sm2.search_dir(dir_path, encoding="utf-8", naive=False))
+    print(sm2.search_dir(dir_path, encoding="utf-8", algorithm="bm"))
     print("Nice, we have found some occurrences in 'essay1.txt' in line 8\n" +
           "at index 11, in line 9 at index 12 and 24, and in 'paper1.txt'\n" +
           "in line 14 at index 73.")
     print('')
-    print("If preferred, the naive algorithm can also be used of course!")
-    print(">>> print(sm2.search_dir(dir_path, encoding='utf-8', naive=True))")
-    print(sm2.search_dir(dir_path, encoding="utf-8", naive=True))
+    print("If preferred, the other algorithms can also be used of course!")
+    print(">>> print(sm2.search_dir(dir_path, encoding='utf-8'," +
+          " algorithm='sunday'))")
+    print(sm2.search_dir(dir_path, encoding="utf-8", algorithm="sunday"))
+    print('')
+    print("################## Find several strings at once ##################")
+    print("Let us find the positions of several strings in all txt-files\n" +
+          "of a directory, reading every file only once (Aho-Corasick):")
+    print(">>> msm = MultiStringMatcher(['evaluation', 'people'])")
+    print(">>> print(msm.search_dir(dir_path, encoding='utf-8'))")
+    msm = MultiStringMatcher(["evaluation", "people"])
+    print(msm.search_dir(dir_path, encoding="utf-8"))
+    print("Each finding consists of the pattern id (0 for 'evaluation'" +
+          " and\n1 for 'people') and the index in the line.")
     print('')
     print("For more information please take a look at the Readme. Have fun!")
     print("############################ END DEMO ############################")
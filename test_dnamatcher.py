@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+
+# Thomas N. T. Pham (nhpham@uni-potsdam.de)
+# 12-Apr-2021
+# Python 3.7
+# Windows 10
+"""Tests of the DNA search on packed sequences."""
+
+import os
+import random
+import tempfile
+import unittest
+from unittest import mock
+
+import dnamatcher
+from dnamatcher import (IUPAC_CODES, STRANDS, DnaMatcher, PackedSequence,
+                        read_fasta, reverse_complement)
+from errors import EmptyStringException
+
+# records of testdata/records.fasta
+RECORDS = [("chr1 test record", "ACGTACGTNNNNACGTRYACGTGATTACAGATTACA"),
+           ("chr2", "NNNNNACGTTTAAACGTTTAACCGGWSKM"),
+           ("empty", ""),
+           ("chr3 palindromes", "GAATTCGAATTCGGATCC")]
+
+
+def _reference(pattern, sequence):
+    """Finds a string of IUPAC codes in a sequence base by base: a base
+    of the sequence matches a code of the string if the code covers all
+    bases it stands for."""
+    pattern, sequence = pattern.upper(), sequence.upper()
+    return [i for i in range(len(sequence) - len(pattern) + 1)
+            if all(set(IUPAC_CODES[base]) <= set(IUPAC_CODES[code])
+                   for base, code in zip(sequence[i:], pattern))]
+
+
+def _reference_strands(pattern, sequence):
+    """Finds a string and its reverse complement in a sequence, like
+    _reference, and tags the occurrences with their strand. A string
+    which is its own reverse complement is found on the forward strand
+    only."""
+    forward = [(i, STRANDS[0]) for i in _reference(pattern, sequence)]
+    reverse = reverse_complement(pattern.upper())
+    if reverse == pattern.upper():
+        return forward
+    return sorted(forward + [(i, STRANDS[1])
+                             for i in _reference(reverse, sequence)])
+
+
+def _random_sequence(rng, length):
+    """Draws a random sequence of mostly unambiguous bases (in both
+    cases) with a few runs of ambiguous bases."""
+    chars = []
+    while len(chars) < length:
+        if rng.random() < 0.1:
+            chars += rng.choice("NNRYSWKMBDHV") * rng.randint(1, 6)
+        else:
+            chars.append(rng.choice("ACGTACGTacgt"))
+    return ''.join(chars[:length])
+
+
+def _random_pattern(rng, length):
+    """Draws a random search string of mostly unambiguous bases."""
+    return ''.join(rng.choice("ACGTACGTACGTRYN" if rng.random() < 0.8
+                              else "ACGTRYSWKMBDHVN")
+                   for _ in range(length))
+
+
+class PackedSequenceTest(unittest.TestCase):
+    """Packing keeps the bases, also when packed in parts."""
+
+    def test_round_trip(self):
+        rng = random.Random(24)
+        for length in (0, 1, 3, 4, 5, 31, 64, 257):
+            sequence = _random_sequence(rng, length)
+            for data in (sequence, sequence.encode("ascii")):
+                packed = PackedSequence(data)
+                with self.subTest(sequence=sequence):
+                    self.assertEqual(len(packed), length)
+                    self.assertEqual(str(packed), sequence.upper())
+
+    def test_two_bits_per_base(self):
+        packed = PackedSequence("ACGT" * 1000)
+        self.assertEqual(packed.nbytes, 1000)
+        self.assertEqual(str(packed), "ACGT" * 1000)
+
+    def test_from_chunks(self):
+        rng = random.Random(2)
+        for pack_size in (1, 2, 3, 4, 5, 9, 16):
+            for _ in range(20):
+                sequence = _random_sequence(rng, rng.randint(0, 80))
+                chunks, start = [], 0
+                while start < len(sequence):
+                    end = start + rng.randint(1, 7)
+                    chunks.append(sequence[start:end])
+                    start = end
+                with self.subTest(sequence=sequence, pack_size=pack_size), \
+                        mock.patch.object(dnamatcher, "PACK_SIZE",
+                                          pack_size):
+                    packed = PackedSequence.from_chunks(chunks)
+                    self.assertEqual(str(packed), sequence.upper())
+                    self.assertEqual(
+                        DnaMatcher("ACN").search_text(packed),
+                        _reference("ACN", sequence))
+
+    def test_invalid_characters_raise_value_error(self):
+        with self.assertRaises(ValueError):
+            PackedSequence("ACGTX")
+        with self.assertRaises(ValueError):
+            PackedSequence.from_chunks(["ACGT", "AC-T"])
+        with self.assertRaises(ValueError):
+            DnaMatcher("ACU")
+        with self.assertRaises(EmptyStringException):
+            DnaMatcher("")
+
+
+class DnaMatcherTest(unittest.TestCase):
+    """The bit-parallel search finds the same occurrences as comparing
+    the IUPAC codes base by base."""
+
+    def test_iupac_codes(self):
+        self.assertEqual(DnaMatcher("R").search_text("ACGTRN"), [0, 2, 4])
+        self.assertEqual(DnaMatcher("N").search_text("ACGTRN"),
+                         [0, 1, 2, 3, 4, 5])
+        self.assertEqual(DnaMatcher("A").search_text("ACGTRN"), [0])
+        self.assertEqual(DnaMatcher("V").search_text("ACGTRYN"),
+                         [0, 1, 2, 4])
+        self.assertEqual(DnaMatcher("gattaca").search_text(
+            "GATTACAgattacaGATTRCA"), [0, 7])
+
+    def test_random_sequences(self):
+        rng = random.Random(24)
+        for _ in range(300):
+            sequence = _random_sequence(rng, rng.randint(0, 120))
+            pattern = _random_pattern(rng, rng.randint(1, 10))
+            matcher = DnaMatcher(pattern)
+            expected = _reference(pattern, sequence)
+            with self.subTest(pattern=pattern, sequence=sequence):
+                self.assertEqual(matcher.search_text(sequence), expected)
+                self.assertEqual(matcher.count(sequence), len(expected))
+                self.assertEqual(matcher.search_text(sequence, 2),
+                                 expected[:2])
+
+    def test_block_seams(self):
+        # matches which start in one block and end in the next one
+        rng = random.Random(4)
+        for block_size in (4, 8, 12):
+            for _ in range(60):
+                sequence = _random_sequence(rng, rng.randint(0, 60))
+                pattern = _random_pattern(rng, rng.randint(1, 9))
+                with self.subTest(pattern=pattern, sequence=sequence,
+                                  block_size=block_size), \
+                        mock.patch.object(dnamatcher, "BLOCK_SIZE",
+                                          block_size):
+                    matcher = DnaMatcher(pattern)
+                    self.assertEqual(matcher.search_text(sequence),
+                                     _reference(pattern, sequence))
+                    self.assertEqual(matcher.count(sequence),
+                                     len(_reference(pattern, sequence)))
+
+
+class BothStrandsTest(unittest.TestCase):
+    """Searching both strands finds the reverse complement as well and
+    palindromes once."""
+
+    def test_reverse_complement(self):
+        self.assertEqual(reverse_complement("TRGA"), "TCYA")
+        self.assertEqual(reverse_complement("ACGTRYSWKMBDHVN"),
+                         "NBDHVKMWSRYACGT")
+
+    def test_reverse_strand(self):
+        matcher = DnaMatcher("AAC", both_strands=True)
+        self.assertEqual(matcher.search_text("AACGTTAA"),
+                         [(0, "+"), (3, "-")])
+        self.assertEqual(matcher.count("AACGTT"), 2)
+
+    def test_palindromes_once(self):
+        matcher = DnaMatcher("GAATTC", both_strands=True)
+        self.assertEqual(matcher.search_text("GAATTCGAATTC"),
+                         [(0, "+"), (6, "+")])
+        self.assertEqual(matcher.count("GAATTCGAATTC"), 2)
+        # R is complemented to Y, so RY is its own reverse complement
+        matcher = DnaMatcher("RY", both_strands=True)
+        self.assertEqual(matcher.search_text("ACGT"), [(0, "+"), (2, "+")])
+
+    def test_iupac_complements(self):
+        matcher = DnaMatcher("RAA", both_strands=True)  # reverse TTY
+        self.assertEqual(matcher.search_text("GAATTCTTT"),
+                         [(0, "+"), (3, "-"), (6, "-")])
+
+    def test_random_sequences(self):
+        rng = random.Random(25)
+        for block_size in (4, 8, dnamatcher.BLOCK_SIZE):
+            for _ in range(100):
+                sequence = _random_sequence(rng, rng.randint(0, 80))
+                pattern = _random_pattern(rng, rng.randint(1, 8))
+                if rng.random() < 0.3:  # palindromic
+                    pattern += reverse_complement(pattern.upper())
+                expected = _reference_strands(pattern, sequence)
+                with self.subTest(pattern=pattern, sequence=sequence,
+                                  block_size=block_size), \
+                        mock.patch.object(dnamatcher, "BLOCK_SIZE",
+                                          block_size):
+                    matcher = DnaMatcher(pattern, both_strands=True)
+                    self.assertEqual(matcher.search_text(sequence), expected)
+                    self.assertEqual(matcher.count(sequence), len(expected))
+                    self.assertEqual(matcher.search_text(sequence, 3),
+                                     expected[:3])
+
+    def test_search_fasta(self):
+        file = os.path.join("testdata", "records.fasta")
+        for pattern in ("ACG", "GAATTC", "TTAA", "RYA"):
+            expected = [(name, _reference_strands(pattern, sequence))
+                        for name, sequence in RECORDS]
+            with self.subTest(pattern=pattern):
+                self.assertEqual(
+                    DnaMatcher(pattern, both_strands=True).search_fasta(
+                        file),
+                    [(name, hits) for name, hits in expected if hits])
+
+
+class FastaTest(unittest.TestCase):
+    """FASTA records are read and searched one after the other."""
+
+    def setUp(self):
+        self.file = os.path.join("testdata", "records.fasta")
+
+    def test_read_fasta(self):
+        self.assertEqual([(name, str(sequence))
+                          for name, sequence in read_fasta(self.file)],
+                         RECORDS)
+
+    def test_search_fasta(self):
+        for pattern in ("ACGT", "GATTACA", "NNN", "RY", "GGATCC"):
+            expected = [(name, _reference(pattern, sequence))
+                        for name, sequence in RECORDS]
+            with self.subTest(pattern=pattern):
+                self.assertEqual(DnaMatcher(pattern).search_fasta(self.file),
+                                 [(name, positions)
+                                  for name, positions in expected
+                                  if positions])
+                self.assertEqual(
+                    DnaMatcher(pattern).search_fasta(self.file, 1),
+                    [(name, positions[:1])
+                     for name, positions in expected if positions])
+
+    def test_invalid_files_raise_value_error(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file = os.path.join(tmp_dir, "invalid.fasta")
+            for text in ("ACGT\n>chr1\nACGT\n", ">chr1\nACGT\nAC GT\n"):
+                with open(file, 'w') as write_f:
+                    write_f.write(text)
+                with self.subTest(text=text), \
+                        self.assertRaises(ValueError):
+                    DnaMatcher("ACGT").search_fasta(file)
+
+
+if __name__ == "__main__":
+    unittest.main()
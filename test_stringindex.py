@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+
+# Thomas N. T. Pham (nhpham@uni-potsdam.de)
+# 12-Apr-2021
+# Python 3.7
+# Windows 10
+"""Tests of the trigram index and the Bloom filters."""
+
+import os
+import random
+import tempfile
+import unittest
+from unittest import mock
+
+import stringindex
+from stringindex import BLOOM_DIR, INDEX_DIR, BloomFilterCache, StringIndex
+from stringmatcher import MultiStringMatcher, StringMatcher
+
+
+class StringIndexTest(unittest.TestCase):
+    """Updates of a StringIndex."""
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.dir = tmp_dir.name
+
+    def write(self, file, text):
+        with open(os.path.join(self.dir, file), 'w',
+                  encoding="utf-8") as write_f:
+            write_f.write(text)
+
+    def test_open_index_survives_updates(self):
+        for i in range(3):
+            self.write(f"f{i}.txt", f"hello world {i}\n")
+        StringIndex.build(self.dir)
+        opened = StringIndex(self.dir)
+        for k in range(12):  # replaces and merges all segments
+            self.write(f"f{k % 3}.txt", f"hello there {k} world\n")
+            StringIndex(self.dir).update()
+        sm = StringMatcher("there")
+        self.assertEqual(opened.candidates(sm),
+                         ["f0.txt", "f1.txt", "f2.txt"])
+        self.assertEqual(opened.search(sm),
+                         StringIndex(self.dir).search(sm))
+
+    def test_random_updates(self):
+        rng = random.Random(20)
+        words = ["hello", "world", "there", "index", "merge", "abc", "xy"]
+        for k in range(20):  # adds, rewrites and removes files
+            for _ in range(rng.randint(1, 3)):
+                file = f"f{rng.randrange(8)}.txt"
+                if os.path.exists(os.path.join(self.dir, file)) and \
+                        rng.random() < 0.3:
+                    os.remove(os.path.join(self.dir, file))
+                else:
+                    self.write(file, '\n'.join(
+                        ' '.join(rng.choices(words, k=rng.randint(0, 5)))
+                        for _ in range(rng.randint(1, 4))))
+            if k:
+                StringIndex(self.dir).update()
+            else:
+                StringIndex.build(self.dir)
+            index = StringIndex(self.dir)
+            queries = [StringMatcher(rng.choice(words)),
+                       StringMatcher(rng.choice(words)[1:4]),
+                       StringMatcher("o w"),
+                       MultiStringMatcher(rng.sample(words, 2))]
+            for matcher in queries:
+                with self.subTest(update=k, matcher=matcher):
+                    expected = matcher.search_dir(self.dir)
+                    found = [file for file in index.candidates(matcher)
+                             if file in expected]
+                    self.assertEqual(found, sorted(expected))
+                    self.assertEqual(index.search(matcher), expected)
+
+    def test_missing_segment_raises_value_error(self):
+        self.write("a.txt", "hello world\n")
+        index = StringIndex.build(self.dir)
+        index_dir = os.path.join(self.dir, INDEX_DIR)
+        for name in os.listdir(index_dir):
+            if name != "manifest.bin":
+                os.remove(os.path.join(index_dir, name))
+        with self.assertRaises(ValueError):
+            index.candidates(StringMatcher("hello"))
+
+
+class BloomFilterCacheTest(unittest.TestCase):
+    """Files are skipped by their Bloom filters without missing an
+    occurrence."""
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.dir = tmp_dir.name
+        self.write("a.txt", "hello world\n")
+        self.write("b.txt", "goodbye moon\n")
+        self.write("c.txt", "")
+
+    def write(self, file, text):
+        with open(os.path.join(self.dir, file), 'w',
+                  encoding="utf-8") as write_f:
+            write_f.write(text)
+
+    def sidecar(self, file):
+        return os.path.join(self.dir, BLOOM_DIR, file + ".bloom")
+
+    def test_negative_files_are_skipped(self):
+        cache = BloomFilterCache(self.dir)
+        sm = StringMatcher("Hello", case=False)
+        self.assertEqual(cache.candidates(sm), ["a.txt"])
+        self.assertEqual(cache.search(sm), sm.search_dir(self.dir))
+        stats = cache.stats
+        self.assertEqual((stats["skipped"], stats["searched"]), (2, 1))
+        self.assertEqual(stats["false_positives"], 0)
+        # too short for trigrams, so no file is skipped
+        self.assertEqual(cache.candidates(StringMatcher("lo")),
+                         ["a.txt", "b.txt", "c.txt"])
+
+    def test_false_positives(self):
+        # all trigrams of 'lo wor' occur, but not the string itself
+        self.write("d.txt", "lo wow, world\n")
+        cache = BloomFilterCache(self.dir)
+        sm = StringMatcher("lo wor")
+        self.assertEqual(cache.candidates(sm), ["a.txt", "d.txt"])
+        self.assertEqual(cache.search(sm), sm.search_dir(self.dir))
+        self.assertEqual(cache.stats["false_positives"], 1)
+        with mock.patch.object(stringindex, "_bloom_contains",
+                               return_value=True):
+            msm = MultiStringMatcher(["moon", "world"])
+            self.assertEqual(cache.search(msm), msm.search_dir(self.dir))
+            self.assertEqual(cache.stats["searched"], 4)
+            self.assertEqual(cache.stats["false_positives"], 1)  # c.txt
+
+    def test_missing_or_stale_sidecars(self):
+        cache = BloomFilterCache(self.dir)
+        sm = StringMatcher("moon")
+        self.assertEqual(cache.candidates(sm), ["b.txt"])
+        os.remove(self.sidecar("b.txt"))
+        self.assertEqual(cache.search(sm), sm.search_dir(self.dir))
+        self.assertTrue(os.path.exists(self.sidecar("b.txt")))
+        # same size, later modification time
+        mtime_ns = os.stat(os.path.join(self.dir, "a.txt")).st_mtime_ns
+        self.write("a.txt", "hello moon!\n")
+        os.utime(os.path.join(self.dir, "a.txt"),
+                 ns=(mtime_ns + 10 ** 9, mtime_ns + 10 ** 9))
+        self.write("c.txt", "full moon\n")
+        with open(self.sidecar("b.txt"), 'wb') as write_f:
+            write_f.write(b"STRB\x01")  # truncated
+        self.assertEqual(cache.candidates(sm), ["a.txt", "b.txt", "c.txt"])
+        self.assertEqual(cache.search(sm), sm.search_dir(self.dir))
+        # sidecars of removed files are deleted
+        os.remove(os.path.join(self.dir, "c.txt"))
+        self.assertEqual(cache.search(sm), sm.search_dir(self.dir))
+        self.assertFalse(os.path.exists(self.sidecar("c.txt")))
+
+
+if __name__ == "__main__":
+    unittest.main()
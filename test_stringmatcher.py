@@ -0,0 +1,685 @@
+# -*- coding: utf-8 -*-
+
+# Thomas N. T. Pham (nhpham@uni-potsdam.de)
+# 12-Apr-2021
+# Python 3.7
+# Windows 10
+"""Tests of the string matching tool."""
+
+import os
+import random
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import stringmatcher
+from stringmatcher import ALGORITHMS, MultiStringMatcher, StringMatcher
+
+
+def _engine_results(matcher, text):
+    """Searches a text with every algorithm of a matcher."""
+    return {name: getattr(matcher, method)(text)
+            for name, method in ALGORITHMS.items()}
+
+
+class EngineEquivalenceTest(unittest.TestCase):
+    """All algorithms find the same occurrences."""
+
+    def assert_engines_agree(self, pattern, text, expected, **options):
+        sm = StringMatcher(pattern, **options)
+        for name, result in _engine_results(sm, text).items():
+            with self.subTest(pattern=pattern, text=text, engine=name):
+                self.assertEqual(result, expected)
+        with self.subTest(pattern=pattern, text=text, engine="auto"):
+            auto = StringMatcher(pattern, algorithm="auto", **options)
+            self.assertEqual(auto.search_text(text), expected)
+
+    def test_case_insensitive_greek_sigma(self):
+        # the final sigma rule of str.lower must not apply
+        self.assert_engines_agree("σ", "ΟΔΟΣ", [3], case=False)
+        self.assert_engines_agree("ς", "ΟΔΟΣ", [], case=False)
+        self.assert_engines_agree("ς", "οδος", [3], case=False)
+        self.assert_engines_agree("οσ", "ΟΣ Α", [0], case=False)
+        self.assert_engines_agree("σς", "ΣΣ σς", [3], case=False)
+
+    def test_case_insensitive_dotted_capital_i(self):
+        # 'İ' is lowered to 2 characters, so it is kept as it is
+        self.assert_engines_agree("i", "İxi", [2], case=False)
+        self.assert_engines_agree("x", "İİxX", [2, 3], case=False)
+        self.assert_engines_agree("İx", "aİXİx", [1, 3], case=False)
+
+    def test_case_insensitive_special_variants(self):
+        # variants that are neither the uppercase nor the titlecase form
+        self.assert_engines_agree("k\u03c9", "K\u2126 k\u03c9 \u212a\u03a9",
+                                  [0, 3, 6], case=False)
+        self.assert_engines_agree("\xdf\xe5", "\u1e9e\u212b SS\xc5",
+                                  [0], case=False)
+        self.assert_engines_agree("\u01c6", "\u01c4\u01c5\u01c6",
+                                  [0, 1, 2], case=False)
+
+
+class BytesPatternTest(unittest.TestCase):
+    """Bytes patterns are case-insensitive for ASCII letters, but
+    cannot be normalized or case folded."""
+
+    def test_str_options_raise_value_error(self):
+        for options in (dict(casefold=True), dict(normalize="NFC"),
+                        dict(normalize="NFKC", casefold=True)):
+            with self.subTest(**options):
+                with self.assertRaises(ValueError):
+                    StringMatcher(b"ab", **options)
+                with self.assertRaises(ValueError):
+                    StringMatcher.compile(b"ab", **options)
+                with self.assertRaises(ValueError):
+                    MultiStringMatcher(["ab", b"ab"], **options)
+
+    def test_case_insensitive_bytes(self):
+        text = b"xAbab\xc4\xe4B"
+        self.assertEqual(StringMatcher(b"ab", case=False).search_text(text),
+                         [1, 3])
+        msm = MultiStringMatcher([b"ab", b"b", b"\xe4"], case=False)
+        self.assertEqual(msm.search_text(text),
+                         [(0, 1), (1, 2), (0, 3), (1, 4), (2, 6), (1, 7)])
+
+
+class DumpLoadTest(unittest.TestCase):
+    """Dumped matchers are loaded with the same tables and results, and
+    invalid files raise a ValueError."""
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.file = os.path.join(tmp_dir.name, "pattern.bin")
+
+    def dumped(self, matcher):
+        with open(self.file, 'wb') as write_f:
+            matcher.dump(write_f)
+        with open(self.file, 'rb') as read_f:
+            return StringMatcher.load(read_f)
+
+    def test_round_trip(self):
+        text = ("Der Kelvin-Stra\xdfe \u212aELVIN STRASSE \ufb01x e\u0301"
+                " \xe9 fix kelvin abcabcab")
+        for pattern, options in (("kelvin", dict()),
+                                 ("kelvin", dict(case=False)),
+                                 ("strasse", dict(casefold=True)),
+                                 ("\xe9", dict(normalize="NFC")),
+                                 ("fix", dict(normalize="NFKC",
+                                              casefold=True)),
+                                 ("abcab", dict(algorithm="auto")),
+                                 ("abcab", dict(algorithm="twoway")),
+                                 ("Kelvin", dict(algorithm="auto",
+                                                 case=False))):
+            sm = StringMatcher(pattern, **options)
+            loaded = self.dumped(sm)
+            with self.subTest(pattern=pattern, **options):
+                self.assertEqual(loaded.__dict__, sm.__dict__)
+                self.assertEqual(loaded.search_text(text),
+                                 sm.search_text(text))
+                self.assertEqual(loaded.engine, sm.engine)
+                self.assertEqual(_engine_results(loaded, text),
+                                 _engine_results(sm, text))
+
+    def test_round_trip_bytes(self):
+        text = b"\x00ab\xffABab\x00abab"
+        for options in (dict(), dict(case=False),
+                        dict(algorithm="auto")):
+            sm = StringMatcher(b"ab\x00ab", **options)
+            loaded = self.dumped(sm)
+            with self.subTest(**options):
+                self.assertEqual(loaded.__dict__, sm.__dict__)
+                self.assertEqual(_engine_results(loaded, text),
+                                 _engine_results(sm, text))
+                self.assertEqual(loaded.search_text(text),
+                                 sm.search_text(text))
+
+    def test_invalid_files_raise_value_error(self):
+        with open(self.file, 'wb') as write_f:
+            StringMatcher("Kelvin", case=False).dump(write_f)
+        with open(self.file, 'rb') as read_f:
+            data = read_f.read()
+        invalid = [data[:size] for size in range(len(data))]  # truncated
+        invalid += [b"STRX" + data[4:],  # magic
+                    data[:4] + b"\x09\x00" + data[6:],  # version
+                    data[:8] + b"\x07" + data[9:],  # form
+                    bytes(range(256)) * 4]
+        engine = data.index(b"bm")  # length-prefixed engine name
+        invalid.append(data[:engine] + b"xy" + data[engine+2:])
+        for blob in invalid:
+            with open(self.file, 'wb') as write_f:
+                write_f.write(blob)
+            with self.subTest(blob=blob[:24]), \
+                    open(self.file, 'rb') as read_f, \
+                    self.assertRaises(ValueError):
+                StringMatcher.load(read_f)
+
+
+class CompileCacheTest(unittest.TestCase):
+    """compile shares the tables of equal patterns and options and
+    evicts the least recently used patterns first."""
+
+    def setUp(self):
+        StringMatcher.set_cache_size()
+        self.addCleanup(StringMatcher.set_cache_size)
+
+    def assert_cache(self, hits, misses, currsize):
+        info = StringMatcher.cache_info()
+        self.assertEqual((info.hits, info.misses, info.currsize),
+                         (hits, misses, currsize))
+
+    def test_hits_on_equal_keys(self):
+        text = "Abc abc ABC \xdf SS"
+        first = StringMatcher.compile("abc")
+        second = StringMatcher.compile("abc", algorithm="twoway")
+        self.assert_cache(1, 1, 1)
+        self.assertIs(second._bad_char_heuristic,
+                      first._bad_char_heuristic)
+        self.assertEqual(second.engine, "twoway")
+        self.assertEqual(first.search_text(text),
+                         StringMatcher("abc").search_text(text))
+        # other options and bytes are other keys
+        StringMatcher.compile("abc", case=False)
+        StringMatcher.compile(b"abc")
+        StringMatcher.compile("ss", casefold=True)
+        StringMatcher.compile("abc", normalize="NFC")
+        self.assert_cache(1, 5, 5)
+        matcher = StringMatcher.compile("ss", casefold=True)
+        self.assert_cache(2, 5, 5)
+        self.assertEqual(matcher.search_text(text),
+                         StringMatcher("ss", casefold=True).search_text(
+                             text))
+
+    def test_lru_eviction(self):
+        StringMatcher.set_cache_size(2)
+        self.assertEqual(StringMatcher.cache_info().maxsize, 2)
+        StringMatcher.compile("a")
+        StringMatcher.compile("b")
+        StringMatcher.compile("a")  # b is the least recently used now
+        StringMatcher.compile("c")
+        self.assert_cache(1, 3, 2)
+        StringMatcher.compile("a")
+        StringMatcher.compile("c")
+        self.assert_cache(3, 3, 2)
+        StringMatcher.compile("b")  # evicts a
+        StringMatcher.compile("a")
+        self.assert_cache(3, 5, 2)
+
+    def test_set_cache_size(self):
+        StringMatcher.compile("a")
+        StringMatcher.set_cache_size(None)  # clears the cache
+        self.assert_cache(0, 0, 0)
+        self.assertIsNone(StringMatcher.cache_info().maxsize)
+        for i in range(100):
+            StringMatcher.compile(str(i))
+        self.assert_cache(0, 100, 100)
+        StringMatcher.purge()
+        self.assert_cache(0, 0, 0)
+        StringMatcher.set_cache_size()
+        self.assertEqual(StringMatcher.cache_info().maxsize,
+                         stringmatcher.CACHE_SIZE)
+
+
+class AutoSelectionTest(unittest.TestCase):
+    """The 'auto' algorithm delegates to the built-in search only if it
+    does not have to fold the text."""
+
+    def assert_engine(self, pattern, text, engine, **options):
+        sm = StringMatcher(pattern, algorithm="auto", **options)
+        naive = StringMatcher(pattern, algorithm="naive", **options)
+        with self.subTest(pattern=pattern, engine=engine, **options):
+            self.assertEqual(sm.search_text(text), naive.search_text(text))
+            self.assertEqual(sm.engine, engine)
+
+    def test_case_sensitive_search_is_builtin(self):
+        self.assert_engine("abc", "xxabcabc", "builtin")
+        self.assert_engine(b"abc", b"xxabcabc", "builtin")
+        self.assert_engine("STRASSE", "Stra\xdfe", "builtin", casefold=True)
+
+    def test_case_insensitive_search_by_statistics(self):
+        dna = "ACGTTGCA" * 200
+        english = "The quick brown fox jumps over the lazy dog. " * 40
+        self.assert_engine("a", dna, "naive", case=False)
+        self.assert_engine("acgt", dna, "naive", case=False)
+        self.assert_engine("acgttgcaac", dna, "sunday", case=False)
+        self.assert_engine("01" * 8, "0110" * 300, "bm", case=False)
+        self.assert_engine("lazy dog", english, "sunday", case=False)
+        self.assert_engine(b"lazy dog", english.encode(), "sunday",
+                           case=False)
+
+    def test_case_insensitive_search_does_not_fold_the_text(self):
+        text = "The quick brown fox jumps over the lazy DOG. " * 100
+        with mock.patch.object(stringmatcher, "_fold_case",
+                               wraps=stringmatcher._fold_case) as fold:
+            sm = StringMatcher("dog", algorithm="auto", case=False)
+            self.assertEqual(len(sm.search_text(text)), 100)
+            self.assertEqual(len(sm.search_text(text)), 100)
+        # only the pattern and the sample of the first text
+        self.assertTrue(all(len(call[0][0]) <= 1024
+                            for call in fold.call_args_list))
+
+
+def _random_string(rng, alphabet, length):
+    """Draws a random string of the characters of an alphabet."""
+    return ''.join(rng.choice(alphabet) for _ in range(length))
+
+
+def _periodic_string(rng, alphabet, length):
+    """Draws a repetition of a short random string with a few random
+    mutations, i.e. a string with many shifts by its period."""
+    period = _random_string(rng, alphabet, rng.randint(1, 3))
+    chars = list((period * length)[:length])
+    for _ in range(rng.randint(0, 2)):
+        if chars:
+            chars[rng.randrange(len(chars))] = rng.choice(alphabet)
+    return ''.join(chars)
+
+
+class RandomizedEquivalenceTest(unittest.TestCase):
+    """The algorithms find the same occurrences as the naive algorithm
+    in random and periodic texts."""
+
+    def assert_engine_as_naive(self, method, pattern, text, **options):
+        sm = StringMatcher(pattern, **options)
+        with self.subTest(engine=method, pattern=pattern, text=text,
+                          **options):
+            self.assertEqual(getattr(sm, method)(text), sm.naive(text))
+
+    def test_good_suffix_rule(self):
+        rng = random.Random(1)
+        for alphabet in ("ab", "abc", "abcdefgh", "aAbB\xdf"):
+            for _ in range(200):
+                pattern = _random_string(rng, alphabet, rng.randint(1, 8))
+                text = _random_string(rng, alphabet, rng.randint(0, 60))
+                self.assert_engine_as_naive("boyer_moore", pattern, text)
+                self.assert_engine_as_naive("boyer_moore", pattern, text,
+                                            case=False)
+                self.assert_engine_as_naive("boyer_moore",
+                                            pattern.encode("utf-8"),
+                                            text.encode("utf-8"))
+
+    def test_galil_rule(self):
+        # periodic patterns in periodic texts shift by their period
+        rng = random.Random(16)
+        for alphabet in ("ab", "abc"):
+            for _ in range(200):
+                pattern = _periodic_string(rng, alphabet, rng.randint(1, 12))
+                text = _periodic_string(rng, alphabet, rng.randint(0, 80))
+                self.assert_engine_as_naive("boyer_moore", pattern, text)
+                self.assert_engine_as_naive("boyer_moore", pattern, text,
+                                            case=False)
+                self.assert_engine_as_naive("boyer_moore",
+                                            pattern.encode("utf-8"),
+                                            text.encode("utf-8"))
+
+    def test_two_way(self):
+        rng = random.Random(15)
+        for alphabet in ("ab", "abc", "abcdefgh"):
+            for _ in range(150):
+                for draw in (_random_string, _periodic_string):
+                    pattern = draw(rng, alphabet, rng.randint(1, 12))
+                    text = draw(rng, alphabet, rng.randint(0, 80))
+                    self.assert_engine_as_naive("two_way", pattern, text)
+                    self.assert_engine_as_naive("two_way", pattern, text,
+                                                case=False)
+                    self.assert_engine_as_naive("two_way",
+                                                pattern.encode("utf-8"),
+                                                text.encode("utf-8"))
+
+    def test_multiple_patterns(self):
+        rng = random.Random(4)
+        for alphabet in ("ab", "abc", "abcdefgh", "aAbB\xdf"):
+            for _ in range(150):
+                patterns = sorted({_random_string(rng, alphabet,
+                                                  rng.randint(1, 6))
+                                   for _ in range(rng.randint(1, 6))})
+                text = _random_string(rng, alphabet, rng.randint(0, 60))
+                for case in (True, False):
+                    expected = sorted(
+                        (i, pattern_id)
+                        for pattern_id, pattern in enumerate(patterns)
+                        for i in StringMatcher(pattern, case=case).naive(
+                            text))
+                    with self.subTest(patterns=patterns, text=text,
+                                      case=case):
+                        msm = MultiStringMatcher(patterns, case=case)
+                        self.assertEqual(
+                            msm.search_text(text),
+                            [(pattern_id, i) for i, pattern_id in expected])
+
+
+class CanonicalStreamTest(unittest.TestCase):
+    """Streaming with normalization or case folding finds the same
+    occurrences as reading the file line by line, also if chunks end
+    between a character and its combining marks."""
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.file = os.path.join(tmp_dir.name, "text.txt")
+
+    def assert_stream_as_lines(self, matcher, text):
+        with open(self.file, 'w', encoding="utf-8") as write_f:
+            write_f.write(text)
+        expected = matcher.search_file(self.file)
+        for chunk_size in (1, 2, 3, 4, 7):
+            with self.subTest(text=text, chunk_size=chunk_size), \
+                    mock.patch.object(stringmatcher, "CHUNK_SIZE",
+                                      chunk_size):
+                self.assertEqual(matcher.search_file(self.file,
+                                                     stream=True),
+                                 expected)
+
+    def test_decomposed_accent_at_chunk_border(self):
+        text = "abce\u0301"
+        for pattern, expected in (("e", []), ("\xe9", [(1, [3])])):
+            sm = StringMatcher(pattern, normalize="NFC")
+            with mock.patch.object(stringmatcher, "CHUNK_SIZE", 4):
+                with open(self.file, 'w', encoding="utf-8") as write_f:
+                    write_f.write(text)
+                self.assertEqual(sm.search_file(self.file, stream=True),
+                                 expected)
+            self.assert_stream_as_lines(sm, text)
+
+    def test_random_texts(self):
+        rng = random.Random(7)
+        alphabet = ["a", "e", "\u0301", "\u0308", "\xe9", "\xdf", "s", "S",
+                    " ", "\n", "\ufb01", "i", "\u1100", "\u1161"]
+        for _ in range(60):
+            text = ''.join(rng.choice(alphabet) for _ in range(20))
+            patterns = [''.join(rng.choice(alphabet[:-5])
+                                for _ in range(rng.randint(1, 3)))
+                        for _ in range(2)]
+            for options in (dict(normalize="NFC"),
+                            dict(normalize="NFKC", casefold=True),
+                            dict(casefold=True)):
+                self.assert_stream_as_lines(
+                    StringMatcher(patterns[0], **options), text)
+                self.assert_stream_as_lines(
+                    MultiStringMatcher(patterns, **options), text)
+
+
+def _line_findings(text, indices):
+    """Maps indices of a text to line numbers and positions in the line,
+    like search_file."""
+    findings = []
+    for i in indices:
+        line = text.count("\n", 0, i) + 1
+        position = i - text.rfind("\n", 0, i) - 1
+        if findings and findings[-1][0] == line:
+            findings[-1][1].append(position)
+        else:
+            findings.append((line, [position]))
+    return findings
+
+
+class StreamTest(unittest.TestCase):
+    """Streaming finds occurrences across chunk and line borders and
+    agrees with reading the file line by line."""
+
+    TEXT = ("abc abcabc\nab\ncabc\n\n\xe9t\xe9 abc\u6100\u0100abc\n"
+            "abcab\ncab\n")
+    ENCODINGS = ("utf-8", "utf-16", "utf-16-le", "utf-8-sig", "utf-32",
+                 "latin-1")
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.dir = tmp_dir.name
+        self.file = os.path.join(tmp_dir.name, "text.txt")
+
+    def write(self, text, encoding="utf-8", file=None):
+        with open(file or self.file, 'w', encoding=encoding,
+                  newline="") as write_f:
+            write_f.write(text)
+
+    def test_chunk_borders(self):
+        self.write(self.TEXT)
+        for pattern in ("abc", "ab\nc", "c\n\n\xe9", "\n", "bcab"):
+            sm = StringMatcher(pattern)
+            expected = _line_findings(self.TEXT, sm.naive(self.TEXT))
+            for chunk_size in (1, 2, 3, 5, 8, 64):
+                with self.subTest(pattern=pattern, chunk_size=chunk_size), \
+                        mock.patch.object(stringmatcher, "CHUNK_SIZE",
+                                          chunk_size):
+                    self.assertEqual(sm.search_file(self.file, stream=True),
+                                     expected)
+                    self.assertEqual(
+                        sm.search_file(self.file, stream=True,
+                                       max_matches=2),
+                        _line_findings(self.TEXT, sm.naive(self.TEXT)[:2]))
+
+    def test_multiple_patterns(self):
+        self.write(self.TEXT)
+        patterns = ["abc", "b\nc", "cab", "\xe9t\xe9"]
+        msm = MultiStringMatcher(patterns)
+        expected = msm.search_file(self.file, stream=True)
+        self.assertTrue(any(finding[1] == 1
+                            for _, line_findings in expected
+                            for finding in line_findings))
+        for chunk_size in (1, 2, 3, 5):
+            with self.subTest(chunk_size=chunk_size), \
+                    mock.patch.object(stringmatcher, "CHUNK_SIZE",
+                                      chunk_size):
+                self.assertEqual(msm.search_file(self.file, stream=True),
+                                 expected)
+
+    def test_as_search_file(self):
+        for encoding in self.ENCODINGS:
+            text = self.TEXT if encoding != "latin-1" else \
+                self.TEXT.replace("\u6100\u0100", "")
+            self.write(text, encoding)
+            for pattern in ("abc", "\xe9t\xe9", "\u0100a", "cab"):
+                sm = StringMatcher(pattern)
+                expected = sm.search_file(self.file, encoding)
+                self.assertEqual(expected,
+                                 _line_findings(text, sm.naive(text)))
+                for chunk_size in (3, 7, stringmatcher.CHUNK_SIZE):
+                    with self.subTest(encoding=encoding, pattern=pattern,
+                                      chunk_size=chunk_size), \
+                            mock.patch.object(stringmatcher, "CHUNK_SIZE",
+                                              chunk_size):
+                        self.assertEqual(
+                            sm.search_file(self.file, encoding,
+                                           stream=True),
+                            expected)
+
+    def test_parallel_dir(self):
+        for i in range(6):
+            self.write(self.TEXT * (i + 1),
+                       file=os.path.join(self.dir, f"f{i}.txt"))
+        for pattern in ("abc", "ab\nc"):
+            sm = StringMatcher(pattern)
+            for stream in (False, True):
+                expected = sm.search_dir(self.dir, stream=stream)
+                with self.subTest(pattern=pattern, stream=stream):
+                    self.assertEqual(sm.search_dir(self.dir, stream=stream,
+                                                   workers=2),
+                                     expected)
+        msm = MultiStringMatcher(["abc", "ab\nc"])
+        self.assertEqual(msm.search_dir(self.dir, stream=True, workers=2),
+                         msm.search_dir(self.dir, stream=True))
+
+
+class MemoryMapTest(unittest.TestCase):
+    """The memory-mapped search finds the same occurrences as reading
+    the decoded file."""
+
+    # '\u6100\u0100' contains the UTF-16-LE code unit of 'a' at an odd
+    # byte offset, which is no occurrence
+    TEXT = ("na\xefve caf\xe9 na\n\u6100\u0100a na\xefve\nx"
+            " na\xefvena\xefve\n\nna\xefve")
+    ENCODINGS = ("utf-8", "utf-16", "utf-16-le", "utf-8-sig", "utf-32")
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.file = os.path.join(tmp_dir.name, "text.txt")
+
+    def write(self, encoding):
+        with open(self.file, 'w', encoding=encoding,
+                  newline="") as write_f:
+            write_f.write(self.TEXT)
+
+    def test_as_search_file(self):
+        for encoding in self.ENCODINGS:
+            self.write(encoding)
+            for pattern in ("na\xefve", "a", "\u0100a", "e\nx"):
+                sm = StringMatcher(pattern)
+                expected = sm.search_file(self.file, encoding, stream=True)
+                with self.subTest(encoding=encoding, pattern=pattern):
+                    self.assertEqual(
+                        sm.search_file_mmap(self.file, encoding,
+                                            resolve_lines=True),
+                        expected)
+                    if "\n" not in pattern:
+                        self.assertEqual(sm.search_file(self.file,
+                                                        encoding),
+                                         expected)
+                    # byte offsets, including the byte order mark
+                    self.assertEqual(
+                        sm.search_file_mmap(self.file, encoding),
+                        [len(self.TEXT[:i].encode(encoding))
+                         for i in sm.naive(self.TEXT)])
+                    for algorithm in ALGORITHMS:
+                        self.assertEqual(
+                            sm.search_file_mmap(self.file, encoding,
+                                                algorithm=algorithm,
+                                                resolve_lines=True),
+                            expected)
+
+    def test_max_matches(self):
+        for encoding in self.ENCODINGS:
+            self.write(encoding)
+            sm = StringMatcher("na\xefve")
+            offsets = sm.search_file_mmap(self.file, encoding)
+            for max_matches in (0, 1, 2, 10):
+                with self.subTest(encoding=encoding,
+                                  max_matches=max_matches):
+                    self.assertEqual(
+                        sm.search_file_mmap(self.file, encoding,
+                                            max_matches=max_matches),
+                        offsets[:max_matches])
+                    self.assertEqual(
+                        sm.search_file_mmap(self.file, encoding,
+                                            resolve_lines=True,
+                                            max_matches=max_matches),
+                        sm.search_file(self.file, encoding, stream=True,
+                                       max_matches=max_matches))
+
+    def test_bytes_and_empty_files(self):
+        self.write("utf-16-le")
+        sm = StringMatcher("na\xefve".encode("utf-16-le"))
+        self.assertEqual(sm.search_file_mmap(self.file),
+                         [len(self.TEXT[:i].encode("utf-16-le"))
+                          for i in StringMatcher("na\xefve").naive(
+                              self.TEXT)])
+        with open(self.file, 'w'):
+            pass
+        self.assertEqual(StringMatcher("a").search_file_mmap(self.file), [])
+
+    def test_rejected_modes(self):
+        self.write("utf-8")
+        for options in (dict(case=False), dict(casefold=True),
+                        dict(normalize="NFC")):
+            sm = StringMatcher("na\xefve", **options)
+            with self.subTest(**options):
+                with self.assertRaises(ValueError):
+                    sm.search_file_mmap(self.file)
+                with self.assertRaises(ValueError):
+                    sm.search_file_parallel(self.file, workers=1)
+
+
+class ParallelFileTest(unittest.TestCase):
+    """Searching a file in byte ranges finds the same occurrences as
+    search_file, also across the borders of the ranges."""
+
+    TEXT = MemoryMapTest.TEXT * 3
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.file = os.path.join(tmp_dir.name, "text.txt")
+
+    def write(self, encoding):
+        with open(self.file, 'w', encoding=encoding,
+                  newline="") as write_f:
+            write_f.write(self.TEXT)
+
+    @staticmethod
+    def small_ranges(count=None):
+        """Replaces the byte ranges by ranges of a few bytes, or a
+        single code unit if count is None."""
+        byte_ranges = stringmatcher._byte_ranges
+
+        def split(start, end, unit, default_count):
+            return byte_ranges(start, end, unit,
+                               count or end - start, min_size=1)
+        return mock.patch.object(stringmatcher, "_byte_ranges", split)
+
+    def test_as_search_file(self):
+        for encoding in MemoryMapTest.ENCODINGS:
+            self.write(encoding)
+            for pattern in ("na\xefve", "\u0100a", "e\nx"):
+                sm = StringMatcher(pattern)
+                expected = sm.search_file(self.file, encoding, stream=True)
+                for count in (None, 5):
+                    with self.subTest(encoding=encoding, pattern=pattern,
+                                      count=count), \
+                            self.small_ranges(count):
+                        self.assertEqual(
+                            sm.search_file_parallel(self.file, encoding,
+                                                    workers=2),
+                            expected)
+                        self.assertEqual(
+                            sm.search_file_parallel(self.file, encoding,
+                                                    workers=2,
+                                                    max_matches=4),
+                            sm.search_file(self.file, encoding,
+                                           stream=True, max_matches=4))
+        sm = StringMatcher("na\xefve")  # default byte ranges
+        self.assertEqual(sm.search_file_parallel(self.file, "utf-32"),
+                         sm.search_file(self.file, "utf-32"))
+
+    def test_stops_early(self):
+        self.write("utf-8")
+        submitted = []
+
+        class Executor(ThreadPoolExecutor):
+            def submit(self, *args):
+                submitted.append(args[1])
+                return super().submit(*args)
+
+        sm = StringMatcher("na\xefve")
+        with self.small_ranges(), \
+                mock.patch.object(stringmatcher, "ProcessPoolExecutor",
+                                  Executor):
+            self.assertEqual(sm.search_file_parallel(self.file, workers=1,
+                                                     max_matches=1),
+                             [(1, [0])])
+        self.assertEqual(len(submitted), 3)
+
+
+class DeprecatedNaiveTest(unittest.TestCase):
+    """The naive flag of search_file and search_dir still works."""
+
+    def test_naive_flag(self):
+        sm = StringMatcher("evaluation")
+        file = os.path.join("testdata", "essay1.txt")
+        expected = sm.search_file(file, algorithm="naive")
+        self.assertTrue(expected)
+        with self.assertWarns(DeprecationWarning):
+            self.assertEqual(sm.search_file(file, "utf-8", True), expected)
+        with self.assertWarns(DeprecationWarning):
+            self.assertEqual(sm.search_file(file, naive=True), expected)
+        self.assertEqual(sm.search_file(file, naive=False), expected)
+        with self.assertWarns(DeprecationWarning):
+            self.assertEqual(sm.search_dir("testdata", "utf-8", True),
+                             sm.search_dir("testdata", algorithm="naive"))
+        with self.assertWarns(DeprecationWarning), \
+                self.assertRaises(ValueError):
+            sm.search_file(file, naive=True, algorithm="bm")
+
+
+if __name__ == "__main__":
+    unittest.main()
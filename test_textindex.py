@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+
+# Thomas N. T. Pham (nhpham@uni-potsdam.de)
+# 12-Apr-2021
+# Python 3.7
+# Windows 10
+"""Tests of the suffix array index and the FM-index."""
+
+import os
+import random
+import tempfile
+import unittest
+
+from stringmatcher import StringMatcher
+from textindex import _SA_HEADER, FMIndex, SuffixArrayIndex
+
+
+def _random_text(rng, alphabet, length):
+    """Draws a random text of the characters of an alphabet, which is
+    a repetition of a short string for every other text."""
+    if rng.random() < 0.5:
+        return ''.join(rng.choice(alphabet) for _ in range(length))
+    period = ''.join(rng.choice(alphabet) for _ in range(rng.randint(1, 3)))
+    return (period * length)[:length]
+
+
+class SuffixArrayIndexTest(unittest.TestCase):
+    """The index finds the same occurrences as Boyer-Moore."""
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.file = os.path.join(tmp_dir.name, "text.sa")
+
+    def assert_index_as_boyer_moore(self, text, patterns):
+        sa = SuffixArrayIndex(text)
+        with open(self.file, 'wb') as write_f:
+            sa.dump(write_f)
+        with open(self.file, 'rb') as read_f:
+            loaded = SuffixArrayIndex.load(read_f)
+        try:
+            for pattern in patterns:
+                expected = StringMatcher(pattern).boyer_moore(text)
+                with self.subTest(text=text, pattern=pattern):
+                    self.assertEqual(sa.find_all(pattern), expected)
+                    self.assertEqual(sa.count(pattern), len(expected))
+                    self.assertEqual(loaded.find_all(pattern), expected)
+        finally:
+            loaded.close()
+
+    def test_random_texts(self):
+        rng = random.Random(22)
+        for alphabet in ("ab", "acgt", "abcdefgh", "a\xe9€\U0001f600"):
+            for _ in range(40):
+                text = _random_text(rng, alphabet, rng.randint(0, 80))
+                patterns = [_random_text(rng, alphabet, rng.randint(1, 6))
+                            for _ in range(8)]
+                patterns += [text[i:i+rng.randint(1, 8)]
+                             for i in range(0, len(text), 10)]
+                self.assert_index_as_boyer_moore(text, patterns)
+                self.assert_index_as_boyer_moore(
+                    text.encode("utf-8"),
+                    [pattern.encode("utf-8") for pattern in patterns])
+
+    def test_invalid_files_raise_value_error(self):
+        with open(self.file, 'wb') as write_f:
+            SuffixArrayIndex("banana bandana").dump(write_f)
+        with open(self.file, 'rb') as read_f:
+            data = read_f.read()
+        header = _SA_HEADER.unpack(data[:_SA_HEADER.size])
+        invalid = [data[:5], data[:-3], b"STFM" + data[4:]]
+        # unknown kind of text, item size of the arrays and length
+        for field, value in ((2, 7), (4, 3), (4, 16), (5, -1)):
+            fields = list(header)
+            fields[field] = value
+            invalid.append(_SA_HEADER.pack(*fields) +
+                           data[_SA_HEADER.size:])
+        for blob in invalid:
+            with open(self.file, 'wb') as write_f:
+                write_f.write(blob)
+            with self.subTest(blob=blob[:_SA_HEADER.size]), \
+                    open(self.file, 'rb') as read_f, \
+                    self.assertRaises(ValueError):
+                SuffixArrayIndex.load(read_f)
+
+
+class FMIndexTest(unittest.TestCase):
+    """The FM-index, also read from a file, finds the same occurrences
+    as Boyer-Moore."""
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.file = os.path.join(tmp_dir.name, "text.fm")
+
+    def dumped(self, index):
+        with open(self.file, 'wb') as write_f:
+            index.dump(write_f)
+        with open(self.file, 'rb') as read_f:
+            return FMIndex.load(read_f)
+
+    def assert_index_as_boyer_moore(self, text, patterns, **rates):
+        fm = FMIndex(text, **rates)
+        loaded = self.dumped(fm)
+        self.assertEqual(loaded.bwt, fm.bwt)
+        self.assertEqual(len(loaded), len(text))
+        for pattern in patterns:
+            expected = StringMatcher(pattern).boyer_moore(text)
+            with self.subTest(text=text, pattern=pattern, **rates):
+                self.assertEqual(fm.locate(pattern), expected)
+                self.assertEqual(fm.count(pattern), len(expected))
+                self.assertEqual(loaded.locate(pattern), expected)
+                self.assertEqual(loaded.count(pattern), len(expected))
+
+    def test_random_texts(self):
+        rng = random.Random(23)
+        for alphabet in ("ab", "acgt", "abcdefgh", "a\xe9€\U0001f600"):
+            for _ in range(30):
+                text = _random_text(rng, alphabet, rng.randint(0, 80))
+                patterns = [_random_text(rng, alphabet, rng.randint(1, 6))
+                            for _ in range(8)]
+                patterns += [text[i:i+rng.randint(1, 8)]
+                             for i in range(0, len(text), 10)]
+                rates = dict(sample_rate=rng.randint(1, 8),
+                             checkpoint_rate=rng.randint(1, 8))
+                self.assert_index_as_boyer_moore(text, patterns, **rates)
+                self.assert_index_as_boyer_moore(
+                    text.encode("utf-8"),
+                    [pattern.encode("utf-8") for pattern in patterns],
+                    **rates)
+
+    def test_invalid_files_raise_value_error(self):
+        with open(self.file, 'wb') as write_f:
+            FMIndex("banana bandana", sample_rate=2).dump(write_f)
+        with open(self.file, 'rb') as read_f:
+            data = read_f.read()
+        header = _SA_HEADER.unpack(data[:_SA_HEADER.size])
+        invalid = [data[:5], data[:40], data[:-3], b"STSA" + data[4:]]
+        for field, value in ((2, 7), (4, 3), (5, -1)):
+            fields = list(header)
+            fields[field] = value
+            invalid.append(_SA_HEADER.pack(*fields) +
+                           data[_SA_HEADER.size:])
+        for blob in invalid:
+            with open(self.file, 'wb') as write_f:
+                write_f.write(blob)
+            with self.subTest(blob=blob[:_SA_HEADER.size]), \
+                    open(self.file, 'rb') as read_f, \
+                    self.assertRaises(ValueError):
+                FMIndex.load(read_f)
+
+
+if __name__ == "__main__":
+    unittest.main()
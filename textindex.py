@@ -0,0 +1,694 @@
+# -*- coding: utf-8 -*-
+
+# Thomas N. T. Pham (nhpham@uni-potsdam.de)
+# 12-Apr-2021
+# Python 3.7
+# Windows 10
+"""Full-text indexes for repeated searches in a single large text."""
+
+import logging
+import mmap
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+
+from errors import EmptyStringException
+
+# maximum number of characters by which the suffixes are sorted at
+# first, before the number of sorted characters is doubled in each round
+_PREFIX_LENGTH = 8
+
+# binary format of SuffixArrayIndex.dump: magic, version, kind of the
+# text (0: str, 1: ASCII str, 2: bytes), byte order (0: little, 1: big),
+# item size of the arrays and length of the text
+_SA_HEADER = struct.Struct("<4sHBBBq")
+_SA_MAGIC = b"STSA"
+_SA_VERSION = 1
+
+# binary format of FMIndex.dump: the header of SuffixArrayIndex.dump
+# (with its own magic and version), followed by the sample rate, the
+# checkpoint rate, the row of the whole text, the number of distinct
+# characters and the number of samples
+_FM_HEADER = struct.Struct("<qqqqq")
+_FM_MAGIC = b"STFM"
+_FM_VERSION = 1
+
+# default number of characters of the text per suffix array sample and
+# per checkpoint of the character counts of an FMIndex
+SAMPLE_RATE = 32
+CHECKPOINT_RATE = 128
+
+
+class SuffixArrayIndex:
+    """Suffix array index of a text, for many searches in the same
+    (large) text. The suffix array lists the start indices of all
+    suffixes of the text in lexicographic order, so the occurrences of
+    a string are the adjacent suffixes starting with it, which are
+    found by binary search in O(m log n) for a string of length m and
+    a text of length n, instead of reading the whole text once per
+    search. The LCP array holds the length of the longest common prefix
+    of each suffix and its predecessor, which delimits the occurrences
+    without a second binary search.
+
+    The index is built once in O(n log n) by prefix doubling and needs
+    the text plus 8 bytes per character (16 for texts longer than 2**31
+    characters). The construction itself needs about 60 bytes per
+    character at its peak and about 10 seconds per million characters,
+    which limits it to texts of some hundred million characters. dump
+    writes the index to a file, from which load maps the text and both
+    arrays into memory without reading them.
+
+    Args:
+        text (str or bytes): Text that is indexed.
+
+    Attributes:
+        text (str or bytes): Indexed text. A memory-mapped index keeps
+            bytes and ASCII texts in the file.
+        suffix_array (array or memoryview): Start indices (int) of the
+            suffixes of the text in lexicographic order.
+        lcp (array or memoryview): Length (int) of the longest common
+            prefix of each suffix in the suffix array and its
+            predecessor (0 for the first suffix).
+    """
+    def __init__(self, text):
+        self._text = text
+        self._start = 0  # offset of the text in a memory-mapped file
+        self._encode = False  # search strings are encoded to ASCII
+        self._map = None
+        self._suffix_array = _suffix_array(text)
+        self._lcp = _lcp_array(text, self._suffix_array)
+
+    @classmethod
+    def load(cls, fp):
+        """Maps an index written by dump into memory, so that the text
+        and the arrays are read from the file on demand only.
+
+        Args:
+            fp (file): File opened for reading in binary mode.
+
+        Returns:
+            SuffixArrayIndex: Memory-mapped index.
+        """
+        index = cls.__new__(cls)
+        index._map = None
+        views = []  # released before the map is closed on errors
+        start = fp.tell()
+        try:
+            magic, version, kind, big, itemsize, n = _SA_HEADER.unpack(
+                fp.read(_SA_HEADER.size))
+            if magic != _SA_MAGIC or version != _SA_VERSION:
+                raise ValueError("unknown format")
+            if kind not in (0, 1, 2) or itemsize not in (4, 8) or n < 0:
+                raise ValueError("invalid header")
+            if big != (sys.byteorder == "big"):
+                raise ValueError("other byte order")
+            index._map = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+            text_start = start + _SA_HEADER.size
+            text_size = n if kind else 4 * n
+            if kind == 0:  # decoded, since it is not ordered by bytes
+                data = index._map[text_start:text_start+text_size]
+                index._text = data.decode("utf-32-le", "surrogatepass")
+                index._start = 0
+            else:
+                index._text = index._map
+                index._start = text_start
+            index._encode = kind == 1
+            typecode = 'i' if itemsize == 4 else 'q'
+            offset = _aligned(text_start + text_size)
+            for _ in range(2):
+                views.append(memoryview(index._map)[offset:offset+itemsize*n])
+                if len(views[-1]) != itemsize * n:
+                    raise ValueError("truncated file")
+                views.append(views[-1].cast(typecode))
+                offset += itemsize * n
+            index._suffix_array, index._lcp = views[1], views[3]
+        except (ValueError, struct.error, OSError):
+            for view in views:
+                view.release()
+            if index._map is not None:
+                index._map.close()
+            load_msg = ("Invalid file. Please load an index written by" +
+                        " SuffixArrayIndex.dump.")
+            logging.error(load_msg)
+            raise ValueError(load_msg) from None
+        return index
+
+    @property
+    def text(self):
+        """str or bytes: Indexed text."""
+        if self._map is not None and self._text is self._map:
+            text = self._map[self._start:self._start+len(self)]
+            return text.decode("ascii") if self._encode else text
+        return self._text
+
+    @property
+    def suffix_array(self):
+        """array or memoryview: Start indices of the sorted suffixes."""
+        return self._suffix_array
+
+    @property
+    def lcp(self):
+        """array or memoryview: Longest common prefixes of adjacent
+        suffixes in the suffix array.
+        """
+        return self._lcp
+
+    def __len__(self):
+        return len(self._suffix_array)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Releases the memory map of an index read by load."""
+        if self._map is not None:
+            self._suffix_array.release()
+            self._lcp.release()
+            self._map.close()
+
+    def dump(self, fp):
+        """Writes the index, i.e. the text, the suffix array and the
+        LCP array, to a file from which load maps it into memory. The
+        arrays are aligned to 8 bytes and written in the byte order of
+        this machine.
+
+        Args:
+            fp (file): File opened for writing in binary mode.
+        """
+        kind, data = _encode_text(self.text)
+        itemsize = self._suffix_array.itemsize
+        start = fp.tell()
+        fp.write(_SA_HEADER.pack(_SA_MAGIC, _SA_VERSION, kind,
+                                 sys.byteorder == "big", itemsize,
+                                 len(self)))
+        fp.write(data)
+        end = start + _SA_HEADER.size + len(data)
+        fp.write(bytes(_aligned(end) - end))
+        for values in (self._suffix_array, self._lcp):
+            fp.write(values if isinstance(values, array) else
+                     values.tobytes())
+
+    def find_all(self, pattern):
+        """Finds all occurrences of a string in the text, like
+        StringMatcher.boyer_moore of a case-sensitive matcher.
+
+        Args:
+            pattern (str or bytes): String that is searched for, of the
+                same type as the text.
+
+        Returns:
+            list: Contains the starting indices (int) of the string's
+                occurrences in ascending order.
+        """
+        low, high = self._range(pattern)
+        return sorted(self._suffix_array[low:high])
+
+    def count(self, pattern):
+        """Counts the occurrences of a string in the text.
+
+        Args:
+            pattern (str or bytes): String that is searched for.
+
+        Returns:
+            int: Number of occurrences.
+        """
+        low, high = self._range(pattern)
+        return high - low
+
+# private methods #
+    def _range(self, pattern):
+        """Determines the range of the suffix array of the suffixes
+        starting with a string, by a binary search for the first one
+        and the LCP array for the following ones.
+
+        Args:
+            pattern (str or bytes): String that is searched for.
+
+        Returns:
+            tuple: Contains the start and the end (exclusive) of the
+                range in the suffix array.
+        """
+        _check_pattern(pattern)
+        if self._encode:
+            try:
+                pattern = pattern.encode("ascii")
+            except UnicodeEncodeError:
+                return 0, 0  # no ASCII text contains it
+        text, start, suffix_array = self._text, self._start, self._suffix_array
+        n, m = len(suffix_array), len(pattern)
+        end = start + n  # the memory map continues after the text
+        low, high = 0, n
+        while low < high:
+            middle = (low + high) // 2
+            suffix = start + suffix_array[middle]
+            if text[suffix:min(suffix + m, end)] < pattern:
+                low = middle + 1
+            else:
+                high = middle
+        if low == n:
+            return low, low
+        suffix = start + suffix_array[low]
+        if text[suffix:min(suffix + m, end)] != pattern:
+            return low, low
+        high = low + 1
+        lcp = self._lcp
+        while high < len(lcp) and lcp[high] >= m:
+            high += 1
+        return low, high
+
+
+class FMIndex:
+    """FM-index of a text, a compressed alternative to SuffixArrayIndex
+    which does not even need the text itself. It consists of the
+    Burrows-Wheeler transform (BWT) of the text, i.e. the character
+    preceding each suffix in the order of the suffix array, the counts
+    of every character of the BWT up to each checkpoint, and a sample
+    of the suffix array.
+
+    count determines the range of the suffixes starting with a string
+    by backward search, character by character from its end, in O(m)
+    steps for a string of length m, each of which counts a character
+    in at most checkpoint_rate characters of the BWT. locate walks from
+    every suffix of the range to the preceding suffixes until it
+    reaches a sampled one, i.e. at most sample_rate - 1 steps per
+    occurrence. A lower sample rate locates faster, but needs more
+    memory: about 1 byte per character for the BWT of a bytes or ASCII
+    text, 4 bytes per character and checkpoint_rate characters for
+    each distinct character (e.g. 4 for DNA), and about 8 bytes per
+    sample_rate characters for the samples. The construction sorts the
+    suffixes like SuffixArrayIndex, though, and needs the same peak
+    memory of about 60 bytes per character and time of about 10
+    seconds per million characters. dump writes the index to a file,
+    from which load reads it in the time of reading the file, without
+    sorting the suffixes again.
+
+    Args:
+        text (str or bytes): Text that is indexed.
+        sample_rate (int): Number of characters of the text per sampled
+            suffix. Defaults to SAMPLE_RATE.
+        checkpoint_rate (int): Number of characters of the BWT per
+            checkpoint of the character counts. Defaults to
+            CHECKPOINT_RATE.
+
+    Attributes:
+        bwt (str or bytes): Burrows-Wheeler transform of the text. The
+            row of the whole text, which is preceded by the end of the
+            text, holds the smallest character instead.
+        primary (int): Row of the whole text in the BWT.
+        first (dict): Mapping of each character to the number of
+            suffixes starting with a smaller character (including the
+            empty suffix).
+        checkpoints (dict): Mapping of each character to an array of
+            its counts in the BWT before every checkpoint.
+        sampled_rows (array): Rows whose suffix starts at a multiple of
+            sample_rate, in ascending order.
+        samples (array): Start indices of the suffixes of the sampled
+            rows.
+    """
+    def __init__(self, text, sample_rate=SAMPLE_RATE,
+                 checkpoint_rate=CHECKPOINT_RATE):
+        if sample_rate < 1 or checkpoint_rate < 1:
+            rate_msg = "Sample and checkpoint rates must be at least 1."
+            logging.error(rate_msg)
+            raise ValueError(rate_msg)
+        n = len(text)
+        # the empty suffix comes first
+        rows = array('i' if n < 1 << 31 else 'q', [n]) + _suffix_array(text)
+        alphabet = sorted(set(text))
+        if alphabet:
+            smallest = alphabet[0]
+        else:  # any character as placeholder of the end
+            smallest = "\0" if isinstance(text, str) else 0
+        self._primary = rows.index(0)
+        if isinstance(text, str):
+            self._bwt = ''.join([text[i-1] if i else smallest
+                                 for i in rows])
+        else:
+            self._bwt = bytes([text[i-1] if i else smallest for i in rows])
+        self._first = dict()
+        total = 1  # the empty suffix
+        for char in alphabet:
+            self._first[char] = total
+            total += self._bwt.count(char) - (char == smallest)
+        self._checkpoints = dict()
+        for char in alphabet:
+            counts = array('i', [0])
+            count = 0
+            for start in range(0, n + 1, checkpoint_rate):
+                count += self._bwt.count(char, start,
+                                         start + checkpoint_rate)
+                if start <= self._primary < start + checkpoint_rate:
+                    count -= char == smallest
+                counts.append(count)
+            self._checkpoints[char] = counts
+        self._sampled_rows = array('i' if n < 1 << 31 else 'q')
+        self._samples = array(self._sampled_rows.typecode)
+        for row, i in enumerate(rows):
+            if i % sample_rate == 0 and i < n:
+                self._sampled_rows.append(row)
+                self._samples.append(i)
+        self._sample_rate = sample_rate
+        self._checkpoint_rate = checkpoint_rate
+
+    @classmethod
+    def load(cls, fp):
+        """Reads an index written by dump.
+
+        Args:
+            fp (file): File opened for reading in binary mode.
+
+        Returns:
+            FMIndex: Index read from the file.
+        """
+        index = cls.__new__(cls)
+        try:
+            magic, version, kind, big, itemsize, n = _SA_HEADER.unpack(
+                fp.read(_SA_HEADER.size))
+            (index._sample_rate, index._checkpoint_rate, index._primary,
+             size, samples) = _FM_HEADER.unpack(fp.read(_FM_HEADER.size))
+            if magic != _FM_MAGIC or version != _FM_VERSION:
+                raise ValueError("unknown format")
+            if (kind not in (0, 1, 2) or itemsize not in (4, 8) or
+                    n < 0 or index._sample_rate < 1 or
+                    index._checkpoint_rate < 1 or
+                    not 0 <= index._primary <= n or
+                    not 0 <= size <= n or not 0 <= samples <= n):
+                raise ValueError("invalid header")
+            if big != (sys.byteorder == "big"):
+                raise ValueError("other byte order")
+            data = _read_exactly(fp, (n + 1 + size) * (1 if kind else 4))
+            if kind == 0:
+                chars = data.decode("utf-32-le", "surrogatepass")
+            else:
+                chars = data.decode("ascii") if kind == 1 else data
+            index._bwt = chars[:n+1]
+            alphabet = list(chars[n+1:])
+            if alphabet != sorted(set(alphabet)):
+                raise ValueError("invalid alphabet")
+            _read_exactly(fp, _aligned(fp.tell()) - fp.tell())
+            checkpoints = (n + index._checkpoint_rate) // (
+                index._checkpoint_rate) + 1
+            index._checkpoints = dict()
+            index._first = dict()
+            total = 1  # the empty suffix
+            for char in alphabet:
+                counts = array('i')
+                counts.frombytes(
+                    _read_exactly(fp, counts.itemsize * checkpoints))
+                index._checkpoints[char] = counts
+                index._first[char] = total
+                total += counts[-1]
+            typecode = 'i' if itemsize == 4 else 'q'
+            index._sampled_rows = array(typecode)
+            index._sampled_rows.frombytes(
+                _read_exactly(fp, itemsize * samples))
+            index._samples = array(typecode)
+            index._samples.frombytes(_read_exactly(fp, itemsize * samples))
+        except (ValueError, struct.error, OSError):
+            load_msg = ("Invalid file. Please load an index written by" +
+                        " FMIndex.dump.")
+            logging.error(load_msg)
+            raise ValueError(load_msg) from None
+        return index
+
+    @property
+    def bwt(self):
+        """str or bytes: Burrows-Wheeler transform of the text."""
+        return self._bwt
+
+    @property
+    def sample_rate(self):
+        """int: Number of characters of the text per sample."""
+        return self._sample_rate
+
+    @property
+    def checkpoint_rate(self):
+        """int: Number of characters of the BWT per checkpoint."""
+        return self._checkpoint_rate
+
+    @property
+    def nbytes(self):
+        """int: Memory (in bytes) of the BWT, the checkpoints and the
+        samples.
+        """
+        return (sys.getsizeof(self._bwt) +
+                sum(counts.itemsize * len(counts)
+                    for counts in self._checkpoints.values()) +
+                self._samples.itemsize * (len(self._samples) +
+                                          len(self._sampled_rows)))
+
+    def __len__(self):
+        return len(self._bwt) - 1
+
+    def dump(self, fp):
+        """Writes the index, i.e. the BWT, the checkpoints and the
+        samples, to a file from which load reads it. The arrays are
+        aligned to 8 bytes and written in the byte order of this
+        machine.
+
+        Args:
+            fp (file): File opened for writing in binary mode.
+        """
+        alphabet = sorted(self._first)
+        if isinstance(self._bwt, str):
+            kind, data = _encode_text(self._bwt + ''.join(alphabet))
+        else:
+            kind, data = _encode_text(self._bwt + bytes(alphabet))
+        itemsize = self._samples.itemsize
+        start = fp.tell()
+        fp.write(_SA_HEADER.pack(_FM_MAGIC, _FM_VERSION, kind,
+                                 sys.byteorder == "big", itemsize,
+                                 len(self)))
+        fp.write(_FM_HEADER.pack(self._sample_rate, self._checkpoint_rate,
+                                 self._primary, len(alphabet),
+                                 len(self._samples)))
+        fp.write(data)
+        end = start + _SA_HEADER.size + _FM_HEADER.size + len(data)
+        fp.write(bytes(_aligned(end) - end))
+        for char in alphabet:
+            fp.write(self._checkpoints[char])
+        fp.write(self._sampled_rows)
+        fp.write(self._samples)
+
+    def count(self, pattern):
+        """Counts the occurrences of a string in the text.
+
+        Args:
+            pattern (str or bytes): String that is searched for, of the
+                same type as the text.
+
+        Returns:
+            int: Number of occurrences.
+        """
+        low, high = self._range(pattern)
+        return high - low
+
+    def locate(self, pattern):
+        """Finds all occurrences of a string in the text, like
+        StringMatcher.boyer_moore of a case-sensitive matcher.
+
+        Args:
+            pattern (str or bytes): String that is searched for, of the
+                same type as the text.
+
+        Returns:
+            list: Contains the starting indices (int) of the string's
+                occurrences in ascending order.
+        """
+        low, high = self._range(pattern)
+        bwt, first, rank = self._bwt, self._first, self._rank
+        sampled_rows, samples = self._sampled_rows, self._samples
+        indices = []
+        for row in range(low, high):
+            steps = 0
+            sample = bisect_left(sampled_rows, row)
+            while sample == len(sampled_rows) or sampled_rows[sample] != row:
+                char = bwt[row]  # precedes the suffix of the row
+                row = first[char] + rank(char, row)
+                steps += 1
+                sample = bisect_left(sampled_rows, row)
+            indices.append(samples[sample] + steps)
+        return sorted(indices)
+
+# private methods #
+    def _rank(self, char, row):
+        """Counts a character in the BWT before a row, starting from the
+        preceding checkpoint.
+        """
+        checkpoint = row // self._checkpoint_rate
+        start = checkpoint * self._checkpoint_rate
+        count = (self._checkpoints[char][checkpoint] +
+                 self._bwt.count(char, start, row))
+        if start <= self._primary < row and char == self._bwt[self._primary]:
+            count -= 1  # placeholder of the end of the text
+        return count
+
+    def _range(self, pattern):
+        """Determines the range of the rows whose suffixes start with a
+        string by backward search.
+
+        Args:
+            pattern (str or bytes): String that is searched for.
+
+        Returns:
+            tuple: Contains the start and the end (exclusive) of the
+                range of rows.
+        """
+        _check_pattern(pattern)
+        low, high = 0, len(self._bwt)
+        for char in reversed(pattern):
+            if char not in self._first:
+                return 0, 0
+            low = self._first[char] + self._rank(char, low)
+            high = self._first[char] + self._rank(char, high)
+            if low >= high:
+                return 0, 0
+        return low, high
+
+
+def _check_pattern(pattern):
+    """Raises an EmptyStringException for empty search strings."""
+    if len(pattern) == 0:
+        raise EmptyStringException("Invalid search string. Empty" +
+                                   " strings are everywhere." +
+                                   " Please try something with" +
+                                   " characters.")
+
+
+def _encode_text(text):
+    """Encodes a text for dump.
+
+    Args:
+        text (str or bytes): Text that is encoded.
+
+    Returns:
+        tuple: Contains the kind of the text (0: str, 1: ASCII str,
+            2: bytes) and its bytes (ASCII or UTF-32-LE for str).
+    """
+    if isinstance(text, str):
+        kind = 1 if text.isascii() else 0
+        return kind, (text.encode("ascii") if kind else
+                      text.encode("utf-32-le", "surrogatepass"))
+    return 2, bytes(text)
+
+
+def _read_exactly(fp, size):
+    """Reads a number of bytes from a file and raises a ValueError if
+    the file ends before.
+    """
+    data = fp.read(size)
+    if len(data) != size:
+        raise ValueError("truncated file")
+    return data
+
+
+def _suffix_array(text):
+    """Sorts the suffixes of a text by prefix doubling: the suffixes
+    are sorted by their first (up to _PREFIX_LENGTH) characters, and
+    then by the ranks of their first k and following k characters,
+    which doubles the number of sorted characters k in each round until
+    all ranks differ. The ranks and sort keys are kept in arrays, so
+    that the sort itself takes most of the memory.
+
+    Args:
+        text (str or bytes): Text whose suffixes are sorted.
+
+    Returns:
+        array: Contains the start indices (int) of the sorted suffixes.
+    """
+    n = len(text)
+    typecode = 'i' if n < 1 << 31 else 'q'
+    codes = {char: code
+             for code, char in enumerate(sorted(set(text)), start=1)}
+    # the first k characters as digits of an integer, followed by 0
+    # digits at the end of the text, which sort shorter suffixes first
+    base = len(codes) + 1
+    k = 1
+    while k < _PREFIX_LENGTH and base ** (k + 1) < 1 << 63:
+        k += 1
+    high = base ** (k - 1)
+    keys = array('q', bytes(8 * n))
+    key = 0
+    for i in range(n - 1, -1, -1):
+        key = codes[text[i]] * high + key // base
+        keys[i] = key
+    suffix_array, rank = _sort_suffixes(keys, typecode)
+    while n and rank[suffix_array[-1]] < n - 1:  # ranks not all distinct
+        following = rank[k:] + array(typecode, [-1]) * min(k, n)
+        pairs = (first * (n + 1) + second + 1
+                 for first, second in zip(rank, following))
+        keys = array('q', pairs) if n < 1 << 31 else list(pairs)
+        del following, rank
+        suffix_array, rank = _sort_suffixes(keys, typecode)
+        k *= 2
+    return suffix_array
+
+
+def _sort_suffixes(keys, typecode):
+    """Sorts the suffixes by their sort keys and ranks them, so that
+    suffixes with equal keys have the same rank.
+
+    Args:
+        keys (array or list): Sort key (int) of each suffix.
+        typecode (str): Typecode of the returned arrays.
+
+    Returns:
+        tuple: Contains the start indices of the sorted suffixes and
+            the rank of each suffix (both array).
+    """
+    n = len(keys)
+    # sorting plain integers needs neither key objects nor a key
+    # function, and the start index breaks ties
+    order = [key * n + i for i, key in enumerate(keys)]
+    order.sort()
+    suffix_array = array(typecode, (combined % n for combined in order))
+    del order
+    rank = array(typecode, bytes(suffix_array.itemsize * n))
+    for j in range(1, n):
+        i, previous = suffix_array[j], suffix_array[j-1]
+        rank[i] = rank[previous] + (keys[i] != keys[previous])
+    return suffix_array, rank
+
+
+def _lcp_array(text, suffix_array):
+    """Computes the longest common prefixes of adjacent suffixes in the
+    suffix array in linear time (Kasai et al.), since the common prefix
+    of the suffix starting at i + 1 and its predecessor is at most one
+    shorter than the one of the suffix starting at i.
+
+    Args:
+        text (str or bytes): Indexed text.
+        suffix_array (array): Start indices (int) of the sorted
+            suffixes.
+
+    Returns:
+        array: Contains the length (int) of the longest common prefix
+            of each suffix in the suffix array and its predecessor.
+    """
+    n = len(text)
+    rank = array(suffix_array.typecode, bytes(suffix_array.itemsize * n))
+    for j, i in enumerate(suffix_array):
+        rank[i] = j
+    lcp = array(suffix_array.typecode, bytes(suffix_array.itemsize * n))
+    h = 0
+    for i in range(n):
+        if rank[i] == 0:
+            h = 0
+            continue
+        previous = suffix_array[rank[i] - 1]
+        while (i + h < n and previous + h < n and
+               text[i+h] == text[previous+h]):
+            h += 1
+        lcp[rank[i]] = h
+        if h > 0:
+            h -= 1
+    return lcp
+
+
+def _aligned(offset, alignment=8):
+    """Rounds an offset up to a multiple of the alignment."""
+    return -(-offset // alignment) * alignment